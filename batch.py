@@ -0,0 +1,119 @@
+"""
+Listing Magic - Batch Mode
+
+Headless generation for a whole portfolio from a CSV/JSONL manifest:
+
+    python batch.py listings.csv --output output --workers 4
+    python batch.py listings.csv --stages listing,features,reso,video
+    python batch.py listings.csv --stages video --video-profiles landscape,reels,square
+    python batch.py listings.csv --fake-server      # offline dry run over HTTP
+    python batch.py listings.csv --provider local   # offline, in-process model stand-in
+    python batch.py listings.csv --provider-batch   # provider batch jobs (cheaper, slower)
+
+Rerunning the same command resumes: stages already finished for unchanged
+inputs are skipped (see the per-listing checkpoint.json files).
+"""
+
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+from listing_magic.services import (
+    run_batch,
+    configure_client_pool,
+    MediaRegistry,
+    InlineUploader,
+    FakeModelServer,
+    BatchBackend,
+    LocalBatchSimulator,
+    get_key_pool,
+    get_provider,
+    configure_provider,
+    RENDER_PROFILES,
+    DEFAULT_VIDEO_PROFILES
+)
+from listing_magic.services.batch_runner import STAGES, DEFAULT_STAGES, DEFAULT_WORKERS, DEFAULT_BATCH_BACKEND_WORKERS
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate listing content for every property in a manifest.")
+    parser.add_argument('manifest', help="CSV or JSONL manifest of listings")
+    parser.add_argument('--output', default='output', help="Artifact directory (default: output)")
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES),
+                        help=f"Comma-separated stages from {', '.join(STAGES)} (default: {','.join(DEFAULT_STAGES)})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"Listings processed concurrently (default: {DEFAULT_WORKERS}, "
+                             f"or {DEFAULT_BATCH_BACKEND_WORKERS} with --provider-batch)")
+    parser.add_argument('--video-profiles', default=','.join(DEFAULT_VIDEO_PROFILES),
+                        help=f"Comma-separated video formats from {', '.join(RENDER_PROFILES)} "
+                             f"(default: {','.join(DEFAULT_VIDEO_PROFILES)})")
+    parser.add_argument('--limit', type=int, default=None, help="Only process the first N listings")
+    parser.add_argument('--force', action='store_true', help="Ignore checkpoints and the response cache")
+    parser.add_argument('--fake-server', action='store_true',
+                        help="Run against a local fake model server (no API key or network needed)")
+    parser.add_argument('--provider', choices=['gemini', 'local'], default=None,
+                        help="Model provider (default: LISTING_MAGIC_PROVIDER or gemini); "
+                             "'local' answers in-process with placeholder output")
+    parser.add_argument('--provider-batch', action='store_true',
+                        help="Send model calls as provider batch jobs instead of interactive requests")
+    parser.add_argument('--api-base-url', default=None, help="Override the model API base URL")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+
+    if args.provider:
+        configure_provider(args.provider)
+    provider = get_provider()
+
+    fake_server = None
+    if args.fake_server:
+        fake_server = FakeModelServer().start()
+        configure_client_pool(base_url=fake_server.url)
+        os.environ.setdefault("GOOGLE_API_KEY", "fake-key")
+        print(f"[batch] Using fake model server at {fake_server.url}")
+    elif args.api_base_url:
+        configure_client_pool(base_url=args.api_base_url)
+
+    if provider.uses_api_keys and not len(get_key_pool()):
+        print("GOOGLE_API_KEY (or GOOGLE_API_KEYS) not found in environment", file=sys.stderr)
+        return 2
+
+    # Photos are sent inline to the fake server (it has no file upload endpoint)
+    media = MediaRegistry(uploader=InlineUploader()) if fake_server else MediaRegistry()
+    batch_backend = None
+    if args.provider_batch:
+        # The fake server has no batch API; simulate the job lifecycle locally
+        if fake_server:
+            batch_backend = BatchBackend(batches=LocalBatchSimulator(), linger_seconds=1, poll_seconds=0.5)
+        elif not provider.uses_api_keys:
+            batch_backend = BatchBackend(linger_seconds=1, poll_seconds=0.5)
+        else:
+            batch_backend = BatchBackend()
+    try:
+        summary = run_batch(
+            args.manifest,
+            args.output,
+            stages=stages,
+            workers=args.workers,
+            force=args.force,
+            media=media,
+            limit=args.limit,
+            batch_backend=batch_backend,
+            video_profiles=args.video_profiles
+        )
+    finally:
+        media.close()
+        if fake_server is not None:
+            fake_server.stop()
+
+    print(f"[batch] Done: {summary['done']} succeeded, {summary['failed']} failed. Artifacts in {args.output}/")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
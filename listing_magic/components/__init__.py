@@ -3,11 +3,14 @@
 from .sidebar import render_sidebar
 from .upload_area import render_upload_area
 from .status_dashboard import render_status_dashboard
-from .result_cards import render_result_cards
+from .result_cards import render_result_cards, render_streaming_card
+from .admin_panel import render_admin_panel
 
 __all__ = [
     'render_sidebar',
     'render_upload_area',
     'render_status_dashboard',
-    'render_result_cards'
+    'render_result_cards',
+    'render_streaming_card',
+    'render_admin_panel'
 ]
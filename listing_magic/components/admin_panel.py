@@ -0,0 +1,79 @@
+"""
+Admin Panel Component
+
+Renders the hidden admin page (open the app with ?admin=1) showing model
+call telemetry: per-service latency percentiles, tokens and cost, recent
+calls, response cache statistics, circuit breaker states, rate limiter
+queues and API key health.
+"""
+
+import streamlit as st
+
+
+def render_admin_panel(telemetry_buffer, cache_stats=None, breakers=None, limiter_stats=None, key_stats=None):
+    """
+    Render the admin page
+
+    Args:
+        telemetry_buffer: RingBufferSink holding recent call records
+        cache_stats: Optional dict from ResponseCache.stats()
+        breakers: Optional list of CircuitBreaker objects
+        limiter_stats: Optional dict from RateLimiter.stats()
+        key_stats: Optional list from KeyPool.stats()
+    """
+    st.markdown("## 🛠️ Admin · Model Call Telemetry")
+
+    if st.button("🔄 Refresh"):
+        st.rerun()
+
+    records = telemetry_buffer.records()
+    summary = telemetry_buffer.summary()
+
+    if not records:
+        st.info("No model calls recorded yet.")
+    else:
+        # Cache hits and calls coalesced into an identical one cost nothing
+        calls = [r for r in records if not r['cache_hit'] and not r['coalesced']]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Calls", len(records))
+        with col2:
+            st.metric("Cache Hits / Shared", len(records) - len(calls))
+        with col3:
+            st.metric("Tokens", f"{sum((r['prompt_tokens'] or 0) + (r['output_tokens'] or 0) for r in calls):,}")
+        with col4:
+            st.metric("Est. Cost", f"${sum(r['cost_usd'] or 0 for r in calls):.4f}")
+
+        st.markdown("### Per Service")
+        st.dataframe(summary, use_container_width=True)
+
+        st.markdown("### Recent Calls")
+        st.dataframe(list(reversed(records[-100:])), use_container_width=True)
+
+    if cache_stats is not None:
+        st.markdown("### Response Cache")
+        st.json(cache_stats)
+
+    if breakers:
+        st.markdown("### Circuit Breakers")
+        st.dataframe(
+            [{'model': b.name, 'state': b.state, 'consecutive_failures': b.failures} for b in breakers],
+            use_container_width=True
+        )
+
+    if limiter_stats is not None:
+        limits = limiter_stats['limits']
+        st.markdown("### Rate Limiter")
+        st.caption(
+            f"Backend: {limiter_stats['backend']} · per model: {limits['rpm']:g} RPM, "
+            f"{limits['tpm']:,.0f} TPM, {limits['concurrency']} concurrent"
+        )
+        if limiter_stats['models']:
+            st.dataframe(
+                [{'model': model, **stats} for model, stats in sorted(limiter_stats['models'].items())],
+                use_container_width=True
+            )
+
+    if key_stats:
+        st.markdown("### API Keys")
+        st.dataframe(key_stats, use_container_width=True)
@@ -25,6 +25,41 @@ def format_content_to_html(content, placeholder_text):
     return f'<p>{content}</p>'
 
 
+def get_card_html(header, html_content):
+    """
+    Build the HTML for a premium result card
+
+    Args:
+        header: Card header text
+        html_content: Pre-formatted HTML body
+
+    Returns:
+        str: Card HTML
+    """
+    return f"""
+        <div class="result-card">
+            <div class="card-header">{header}</div>
+            <div>{html_content}</div>
+        </div>
+        """
+
+
+def render_streaming_card(placeholder, header, content):
+    """
+    Paint a partially generated result card into a placeholder
+
+    Called repeatedly while text streams in; each call replaces the previous
+    paint. A cursor marks that generation is still in progress.
+
+    Args:
+        placeholder: Streamlit container from st.empty()
+        header: Card header text
+        content: Text generated so far
+    """
+    html_content = format_content_to_html(content + " ▌", "")
+    placeholder.markdown(get_card_html(header, html_content), unsafe_allow_html=True)
+
+
 def render_result_cards():
     """
     Render all result cards for generated content
@@ -42,12 +77,7 @@ def render_result_cards():
         features_content = st.session_state.features_sheet
         html_content = format_content_to_html(features_content, "Generate a features sheet to see it here.")
 
-        st.markdown(f"""
-        <div class="result-card">
-            <div class="card-header">Property Features Sheet</div>
-            <div>{html_content}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(get_card_html("Property Features Sheet", html_content), unsafe_allow_html=True)
 
         st.markdown("<br>", unsafe_allow_html=True)  # Add spacing
 
@@ -59,17 +89,18 @@ def render_result_cards():
         listing_content = st.session_state.listing_text if st.session_state.listing_text else "Generate a listing to see it here."
         html_content = format_content_to_html(listing_content, "Generate a listing to see it here.")
 
-        st.markdown(f"""
-        <div class="result-card">
-            <div class="card-header">Listing Description</div>
-            <div>{html_content}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(get_card_html("Listing Description", html_content), unsafe_allow_html=True)
 
     with col2:
         # Video Section at the top of right column
         video_path = st.session_state.generated_video_path
-        if video_path and os.path.exists(video_path):
+        video_paths = st.session_state.get('generated_video_paths', {})
+        if len(video_paths) > 1 and all(os.path.exists(path) for path in video_paths.values()):
+            # One tab per rendered format
+            for tab, path in zip(st.tabs([name.title() for name in video_paths]), video_paths.values()):
+                with tab:
+                    st.video(path)
+        elif video_path and os.path.exists(video_path):
             st.video(video_path)
         elif video_path:
             # Path exists in session but file is missing
@@ -79,9 +110,4 @@ def render_result_cards():
         script_content = st.session_state.video_script if st.session_state.video_script else "Generate a script to see it here."
         html_content = format_content_to_html(script_content, "Generate a script to see it here.")
 
-        st.markdown(f"""
-        <div class="result-card">
-            <div class="card-header">Video Script</div>
-            <div>{html_content}</div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(get_card_html("Video Script", html_content), unsafe_allow_html=True)
@@ -5,13 +5,13 @@ Renders the photo upload area with embedded thumbnail preview.
 """
 
 import streamlit as st
-from PIL import Image, ImageOps
 
 # Import from our utils
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from utils.image_processor import image_to_base64
+from utils.renditions import get_renditions
 
 
 def render_upload_area():
@@ -22,8 +22,10 @@ def render_upload_area():
         list: List of uploaded files or None if no files uploaded
 
     Side effects:
-        - Updates st.session_state.processed_images with EXIF-corrected images
+        - Updates st.session_state.processed_images with model-input renditions
+        - Updates st.session_state.video_images with full-quality video renditions
         - Updates st.session_state.cached_image_html with rendered thumbnail HTML
+        - Releases uploaded files of replaced photos from st.session_state.media_registry
     """
 
     # Create a container for the upload area
@@ -38,27 +40,21 @@ def render_upload_area():
         )
 
         if uploaded_files:
-            # Load and cache images
-            images_changed = not st.session_state.processed_images or len(st.session_state.processed_images) != len(uploaded_files)
+            # Renditions are cached by file content hash, so this is cheap on reruns
+            renditions = [get_renditions(file.getvalue()) for file in uploaded_files]
+            upload_hashes = [r['hash'] for r in renditions]
+            images_changed = upload_hashes != st.session_state.get('upload_hashes')
 
             if images_changed:
-                # Load images with EXIF correction AND resize for API efficiency
-                processed = []
-                for file in uploaded_files:
-                    img = Image.open(file)
-                    img = ImageOps.exif_transpose(img)
-
-                    # PERFORMANCE FIX: Resize large images to max 512px width
-                    # Smaller images = faster API upload and processing
-                    max_width = 512
-                    if img.width > max_width:
-                        ratio = max_width / img.width
-                        new_height = int(img.height * ratio)
-                        img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-                    processed.append(img)
-
-                st.session_state.processed_images = processed
+                # Model renditions fit the provider's image tiles (fewer billed tokens);
+                # video renditions keep full quality for 1080p frames
+                st.session_state.processed_images = [r['model'] for r in renditions]
+                st.session_state.video_images = [r['video'] for r in renditions]
+                st.session_state.upload_hashes = upload_hashes
+
+                # Replaced photos won't be sent again; delete their uploaded files
+                if 'media_registry' in st.session_state:
+                    st.session_state.media_registry.release(keep=st.session_state.processed_images)
 
                 # Convert images to base64 for embedding (only when images change)
                 img_html_list = []
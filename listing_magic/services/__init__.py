@@ -3,25 +3,211 @@
 from .video_service import (
     generate_video,
     generate_video_with_voiceover,
+    generate_video_formats,
     extract_narration_from_script
 )
 
+from .render_profiles import (
+    RENDER_PROFILES,
+    DEFAULT_VIDEO_PROFILES
+)
+
 from .reso_service import (
     generate_reso_data,
+    generate_reso_data_async,
     generate_listing_ids
 )
 
 from .gemini_service import (
     generate_listing_content,
-    generate_features_sheet
+    generate_features_sheet,
+    generate_listing_content_async,
+    generate_features_sheet_async,
+    stream_listing_content,
+    stream_features_sheet
+)
+
+from .photo_facts import (
+    analyze_photos,
+    analyze_photos_async
+)
+
+from .combined_service import (
+    generate_all_content,
+    generate_all_content_async
+)
+
+from .orchestrator import (
+    run_concurrently,
+    run_in_parallel,
+    generate_followups,
+    generate_followups_async
+)
+
+from .async_runtime import run_sync
+
+from .client_pool import (
+    get_client,
+    configure_client_pool,
+    reset_client_pool
+)
+
+from .response_cache import (
+    ResponseCache,
+    get_response_cache
+)
+
+from .render_cache import (
+    RenderCache,
+    get_render_cache
+)
+
+from .media_registry import (
+    MediaRegistry,
+    GeminiFilesUploader,
+    InlineUploader,
+    ProviderUploader
+)
+
+from .resilience import (
+    CircuitOpenError,
+    configure_resilience,
+    get_circuit_breaker,
+    list_circuit_breakers
 )
 
+from .telemetry import (
+    RingBufferSink,
+    JsonlSink,
+    add_sink,
+    remove_sink,
+    get_ring_buffer
+)
+
+from .context_cache import (
+    ContextCache,
+    get_context_cache
+)
+
+from .artifact_store import ArtifactStore
+
+from .batch_runner import (
+    load_manifest,
+    run_listing,
+    run_batch
+)
+
+from .batch_backend import (
+    BatchBackend,
+    BatchRequestError,
+    LocalBatchSimulator,
+    use_batch_backend
+)
+
+from .rate_limiter import (
+    RateLimiter,
+    MemoryStore,
+    SqliteStore,
+    get_rate_limiter,
+    configure_rate_limiter,
+    set_session,
+    session_scope
+)
+
+from .key_pool import (
+    KeyPool,
+    get_key_pool,
+    load_api_keys
+)
+
+from .providers import (
+    GeminiProvider,
+    LocalProvider,
+    get_provider,
+    configure_provider
+)
+
+from .model_router import (
+    MODEL_TIERS,
+    configure_routing,
+    get_routing,
+    collect_routes
+)
+
+from .fake_server import FakeModelServer
+
 __all__ = [
     'generate_video',
     'generate_video_with_voiceover',
+    'generate_video_formats',
+    'RENDER_PROFILES',
+    'DEFAULT_VIDEO_PROFILES',
     'extract_narration_from_script',
     'generate_reso_data',
+    'generate_reso_data_async',
     'generate_listing_ids',
     'generate_listing_content',
-    'generate_features_sheet'
+    'generate_features_sheet',
+    'generate_listing_content_async',
+    'generate_features_sheet_async',
+    'stream_listing_content',
+    'stream_features_sheet',
+    'analyze_photos',
+    'analyze_photos_async',
+    'generate_all_content',
+    'generate_all_content_async',
+    'run_concurrently',
+    'run_in_parallel',
+    'generate_followups',
+    'generate_followups_async',
+    'run_sync',
+    'get_client',
+    'configure_client_pool',
+    'reset_client_pool',
+    'ResponseCache',
+    'get_response_cache',
+    'RenderCache',
+    'get_render_cache',
+    'MediaRegistry',
+    'GeminiFilesUploader',
+    'InlineUploader',
+    'ProviderUploader',
+    'CircuitOpenError',
+    'configure_resilience',
+    'get_circuit_breaker',
+    'list_circuit_breakers',
+    'RingBufferSink',
+    'JsonlSink',
+    'add_sink',
+    'remove_sink',
+    'get_ring_buffer',
+    'ContextCache',
+    'get_context_cache',
+    'ArtifactStore',
+    'load_manifest',
+    'run_listing',
+    'run_batch',
+    'BatchBackend',
+    'BatchRequestError',
+    'LocalBatchSimulator',
+    'use_batch_backend',
+    'RateLimiter',
+    'MemoryStore',
+    'SqliteStore',
+    'get_rate_limiter',
+    'configure_rate_limiter',
+    'set_session',
+    'session_scope',
+    'KeyPool',
+    'get_key_pool',
+    'load_api_keys',
+    'GeminiProvider',
+    'LocalProvider',
+    'get_provider',
+    'configure_provider',
+    'MODEL_TIERS',
+    'configure_routing',
+    'get_routing',
+    'collect_routes',
+    'FakeModelServer'
 ]
@@ -0,0 +1,176 @@
+"""
+Artifact Store Service
+
+Stores generated artifacts per listing on disk, one directory per listing:
+
+    <root>/<listing_id>/listing.md
+    <root>/<listing_id>/video_script.md
+    <root>/<listing_id>/features.md
+    <root>/<listing_id>/reso.json
+    <root>/<listing_id>/property_tour.mp4
+    <root>/<listing_id>/checkpoint.json
+
+checkpoint.json records which stages finished for which inputs, so batch
+runs can resume after a crash without redoing finished work. All writes
+are atomic (temp file + rename).
+"""
+
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from datetime import datetime, timezone
+
+
+# Artifact name -> file name
+ARTIFACT_FILES = {
+    'listing_description': 'listing.md',
+    'video_script': 'video_script.md',
+    'features_sheet': 'features.md',
+    'reso_data': 'reso.json'
+}
+
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def listing_slug(text):
+    """
+    Make a filesystem-safe listing ID from free text (e.g. an address)
+
+    Args:
+        text: Source text
+
+    Returns:
+        str: Lowercase slug such as '123-main-st-boston-ma'
+    """
+    slug = re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+    return slug[:80] or 'listing'
+
+
+class ArtifactStore:
+    """Per-listing artifact directories with stage checkpoints"""
+
+    def __init__(self, root):
+        """
+        Args:
+            root: Output directory (created if missing)
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def listing_dir(self, listing_id):
+        """Directory for a listing's artifacts (created if missing)"""
+        path = self.root / listing_id
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def save(self, listing_id, name, value):
+        """
+        Save an artifact
+
+        Args:
+            listing_id: Listing ID
+            name: Artifact name (a key of ARTIFACT_FILES)
+            value: Text, or a JSON-serializable object for .json artifacts
+
+        Returns:
+            str: Path of the written file
+        """
+        path = self.listing_dir(listing_id) / ARTIFACT_FILES[name]
+        data = json.dumps(value, indent=2) if path.suffix == '.json' else value
+        _write_atomic(path, data)
+        return str(path)
+
+    def load(self, listing_id, name):
+        """
+        Load an artifact
+
+        Returns:
+            The text or decoded JSON, or None if it doesn't exist
+        """
+        path = self.root / listing_id / ARTIFACT_FILES[name]
+        if not path.exists():
+            return None
+        text = path.read_text(encoding='utf-8')
+        return json.loads(text) if path.suffix == '.json' else text
+
+    def checkpoint(self, listing_id):
+        """
+        Read a listing's checkpoint
+
+        Returns:
+            dict: {'input_hash', 'stages', 'status', 'error'}; empty stages
+                when the listing hasn't been processed
+        """
+        path = self.root / listing_id / CHECKPOINT_FILE
+        if path.exists():
+            try:
+                return json.loads(path.read_text(encoding='utf-8'))
+            except json.JSONDecodeError:
+                print(f"Warning: Ignoring corrupt checkpoint {path}")
+        return {'input_hash': None, 'stages': {}, 'status': 'pending', 'error': None}
+
+    def completed_stages(self, listing_id, input_hash):
+        """
+        Stages already finished for the same inputs
+
+        Args:
+            listing_id: Listing ID
+            input_hash: Hash of the listing's current inputs
+
+        Returns:
+            set: Stage names; empty if the inputs changed since
+        """
+        checkpoint = self.checkpoint(listing_id)
+        if checkpoint['input_hash'] != input_hash:
+            return set()
+        return set(checkpoint['stages'])
+
+    def mark_stage(self, listing_id, stage, input_hash, **details):
+        """
+        Record a finished stage
+
+        Args:
+            listing_id: Listing ID
+            stage: Stage name
+            input_hash: Hash of the inputs the stage ran with
+            **details: Extra values stored with the stage (e.g. a video path)
+        """
+        with self._lock:
+            checkpoint = self.checkpoint(listing_id)
+            if checkpoint['input_hash'] != input_hash:
+                checkpoint = {'input_hash': input_hash, 'stages': {}, 'status': 'running', 'error': None}
+            checkpoint['stages'][stage] = {'completed_at': _now(), **details}
+            self._write_checkpoint(listing_id, checkpoint)
+
+    def mark_status(self, listing_id, status, input_hash, error=None):
+        """
+        Record a listing's overall status ('running', 'done' or 'failed')
+        """
+        with self._lock:
+            checkpoint = self.checkpoint(listing_id)
+            if checkpoint['input_hash'] != input_hash:
+                checkpoint = {'input_hash': input_hash, 'stages': {}, 'status': status, 'error': None}
+            checkpoint['status'] = status
+            checkpoint['error'] = error
+            checkpoint['updated_at'] = _now()
+            self._write_checkpoint(listing_id, checkpoint)
+
+    def _write_checkpoint(self, listing_id, checkpoint):
+        _write_atomic(self.listing_dir(listing_id) / CHECKPOINT_FILE, json.dumps(checkpoint, indent=2))
+
+    def __repr__(self):
+        return f"ArtifactStore(root='{self.root}')"
+
+
+def _write_atomic(path, text):
+    """Write text to path via a temp file and rename"""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,101 @@
+"""
+Async Runtime Service
+
+Runs a single, process-wide asyncio event loop on a background thread.
+All async model calls execute on this loop, so the shared async connection
+pool stays bound to one loop and is reused across Streamlit sessions.
+Synchronous callers submit coroutines with run_sync(); the caller's context
+variables (e.g. the active batch backend) carry over to the coroutine.
+"""
+
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+
+
+def get_event_loop():
+    """
+    Get the service event loop, starting its thread on first use
+
+    Returns:
+        asyncio.AbstractEventLoop: The running background loop
+    """
+    global _loop, _thread
+
+    with _lock:
+        if _loop is None or not _thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_loop.run_forever,
+                name="listing-magic-async",
+                daemon=True
+            )
+            _thread.start()
+        return _loop
+
+
+def loop_running():
+    """Return True if the service event loop has been started and is alive"""
+    return _thread is not None and _thread.is_alive()
+
+
+def in_service_loop():
+    """Return True when called from the service event loop thread"""
+    return _thread is not None and threading.current_thread() is _thread
+
+
+def run_sync(coro, timeout=None):
+    """
+    Run a coroutine on the service loop and block until it finishes
+
+    Args:
+        coro: Coroutine to run
+        timeout: Optional seconds to wait before cancelling it
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        RuntimeError: If called from the service loop itself (await instead)
+        TimeoutError: If the timeout expires (the coroutine is cancelled)
+    """
+    if in_service_loop():
+        coro.close()
+        raise RuntimeError("run_sync() called from the service event loop; await the coroutine instead")
+
+    future = asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), get_event_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Operation timed out after {timeout}s")
+    except BaseException:
+        # Caller interrupted (e.g. Streamlit stopped the script): cancel the work
+        future.cancel()
+        raise
+
+
+def submit(coro):
+    """
+    Schedule a coroutine on the service loop without waiting
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        concurrent.futures.Future: Future for the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+async def _in_context(coro, context):
+    """Await a coroutine with the context variables of the submitting thread"""
+    for var, value in context.items():
+        var.set(value)
+    return await coro
@@ -0,0 +1,272 @@
+"""
+Batch Backend Service
+
+Routes model calls through provider batch jobs instead of interactive
+generate_content calls, for bulk work that doesn't need interactive latency
+(batch pricing, separate rate limits).
+
+While a backend is active (see use_batch_backend), model_gateway hands each
+request to it instead of calling the API. Requests are grouped per model
+and API key (a job can only use files and caches of its key's project) and
+submitted as one batch job when max_batch_size requests are waiting or
+linger_seconds after the first one arrived. Jobs are polled on the service
+event loop, and every caller's await resumes with its own response, so the
+rest of the path (parsing, schema repair, response cache, artifact store)
+is the same as for interactive calls.
+
+LocalBatchSimulator stands in for client.batches in tests and offline runs:
+jobs go through QUEUED -> RUNNING -> SUCCEEDED on a timer and answer with
+placeholder responses.
+"""
+
+import os
+import time
+import uuid
+import random
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from google.genai import types
+
+from .providers import get_provider, resolve_api_key
+from .fake_server import local_response_text
+
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("LISTING_MAGIC_BATCH_MAX_REQUESTS", "100"))
+DEFAULT_LINGER_SECONDS = float(os.getenv("LISTING_MAGIC_BATCH_LINGER_SECONDS", "10"))
+DEFAULT_POLL_SECONDS = float(os.getenv("LISTING_MAGIC_BATCH_POLL_SECONDS", "30"))
+
+SUCCEEDED_STATES = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_PARTIALLY_SUCCEEDED'}
+TERMINAL_STATES = SUCCEEDED_STATES | {'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+
+_active_backend = contextvars.ContextVar('listing_magic_batch_backend', default=None)
+
+
+class BatchRequestError(RuntimeError):
+    """A request in a batch job (or the whole job) failed"""
+
+
+class BatchBackend:
+    """Packs model requests into provider batch jobs and fans results back"""
+
+    def __init__(self, batches=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE, linger_seconds=DEFAULT_LINGER_SECONDS, poll_seconds=DEFAULT_POLL_SECONDS):
+        """
+        Args:
+            batches: Object with the client.batches interface (create/get);
+                defaults to the active provider's batches API
+            max_batch_size: Submit a job once this many requests are waiting
+            linger_seconds: Submit a job this long after its first request
+            poll_seconds: Interval between job status checks
+        """
+        self._batches = batches
+        self.max_batch_size = max_batch_size
+        self.linger_seconds = linger_seconds
+        self.poll_seconds = poll_seconds
+        self.jobs = []
+        self._pending = {}
+        self._timers = {}
+        self._tasks = set()
+
+    def batches(self, api_key=None):
+        """Batches API to submit and poll a job with (the provider's, for the given key, by default)"""
+        return self._batches if self._batches is not None else get_provider().batches(api_key)
+
+    async def submit(self, service, model, contents, config=None):
+        """
+        Queue one request and wait for its response
+
+        Must be awaited on the service event loop.
+
+        Args:
+            service: Name of the calling service (for logging)
+            model: Model name
+            contents: Request contents (prompt and image parts)
+            config: Optional types.GenerateContentConfig
+
+        Returns:
+            types.GenerateContentResponse: The request's response
+
+        Raises:
+            BatchRequestError: If the request or its job failed
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request = types.InlinedRequest(contents=contents, config=config, metadata={'service': service})
+
+        group = (model, resolve_api_key())
+        pending = self._pending.setdefault(group, [])
+        pending.append((request, future))
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.linger_seconds, self._flush, group)
+
+        return await future
+
+    def summary(self):
+        """
+        Get the jobs submitted so far
+
+        Returns:
+            list: Dicts with job name, model, request count, state and seconds taken
+        """
+        return [dict(job) for job in self.jobs]
+
+    def _flush(self, group):
+        """Submit everything waiting for a (model, key) group as one job"""
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(group, [])
+        if items:
+            task = asyncio.ensure_future(self._run_job(*group, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_job(self, model, api_key, items):
+        """Create a job, poll it to completion and resolve each caller's future"""
+        batches = self.batches(api_key)
+        job_info = {'name': None, 'model': model, 'requests': len(items), 'state': 'SUBMITTING', 'seconds': None}
+        self.jobs.append(job_info)
+        started = time.monotonic()
+        try:
+            job = await asyncio.to_thread(
+                batches.create,
+                model=model,
+                src=[request for request, _ in items],
+                config=types.CreateBatchJobConfig(display_name=f"listing-magic-{uuid.uuid4().hex[:8]}")
+            )
+            job_info['name'] = job.name
+            print(f"[batch-backend] Submitted {job.name}: {len(items)} requests for {model}")
+
+            while _state(job) not in TERMINAL_STATES:
+                job_info['state'] = _state(job)
+                await asyncio.sleep(self.poll_seconds)
+                job = await asyncio.to_thread(batches.get, name=job.name)
+
+            job_info['state'] = _state(job)
+            job_info['seconds'] = round(time.monotonic() - started, 1)
+            print(f"[batch-backend] {job.name} finished: {job_info['state']} in {job_info['seconds']}s")
+
+            if job_info['state'] not in SUCCEEDED_STATES:
+                raise BatchRequestError(f"Batch job {job.name} ended in {job_info['state']}: {job.error}")
+
+            responses = (job.dest.inlined_responses if job.dest else None) or []
+            for index, (_, future) in enumerate(items):
+                if future.done():
+                    continue
+                if index >= len(responses):
+                    future.set_exception(BatchRequestError(f"Batch job {job.name} returned no response for request {index}"))
+                elif responses[index].error is not None or responses[index].response is None:
+                    future.set_exception(BatchRequestError(f"Batch request {index} of {job.name} failed: {responses[index].error}"))
+                else:
+                    future.set_result(responses[index].response)
+        except Exception as e:
+            job_info['state'] = job_info['state'] if job_info['state'] in TERMINAL_STATES else 'ERROR'
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, BatchRequestError) else BatchRequestError(f"Batch job failed: {e}"))
+
+
+class LocalBatchSimulator:
+    """Stand-in for client.batches that simulates the batch job lifecycle"""
+
+    def __init__(self, queue_seconds=1.0, run_seconds=2.0, error_rate=0.0, responder=None):
+        """
+        Args:
+            queue_seconds: Time a job stays QUEUED
+            run_seconds: Time a job stays RUNNING before it succeeds
+            error_rate: Probability that an individual request fails
+            responder: Optional callable(model, request) -> response text
+                (default: schema-valid placeholder JSON, or fixed text)
+        """
+        self.queue_seconds = queue_seconds
+        self.run_seconds = run_seconds
+        self.error_rate = error_rate
+        self.responder = responder or _placeholder_text
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, model, src, config=None):
+        name = f"batches/local-{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._jobs[name] = {'model': model, 'requests': list(src), 'created': time.monotonic(), 'responses': None}
+        return self.get(name=name)
+
+    def get(self, name):
+        with self._lock:
+            job = self._jobs[name]
+            elapsed = time.monotonic() - job['created']
+            if elapsed < self.queue_seconds:
+                state = 'JOB_STATE_QUEUED'
+            elif elapsed < self.queue_seconds + self.run_seconds:
+                state = 'JOB_STATE_RUNNING'
+            else:
+                state = 'JOB_STATE_SUCCEEDED'
+                if job['responses'] is None:
+                    job['responses'] = [self._respond(job['model'], request) for request in job['requests']]
+
+        dest = types.BatchJobDestination(inlined_responses=job['responses']) if job['responses'] is not None else None
+        return types.BatchJob(name=name, model=job['model'], state=state, dest=dest)
+
+    def cancel(self, name):
+        with self._lock:
+            self._jobs.pop(name, None)
+
+    def _respond(self, model, request):
+        if self.error_rate and random.random() < self.error_rate:
+            return types.InlinedResponse(error=types.JobError(code=500, message="Injected fault"))
+        text = self.responder(model, request)
+        return types.InlinedResponse(response=types.GenerateContentResponse(
+            candidates=[types.Candidate(
+                content=types.Content(role='model', parts=[types.Part(text=text)]),
+                finish_reason='STOP'
+            )],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=0,
+                candidates_token_count=len(text.split())
+            )
+        ))
+
+
+def get_batch_backend():
+    """
+    Get the batch backend active in the current context
+
+    Returns:
+        BatchBackend: Active backend, or None for interactive calls
+    """
+    return _active_backend.get()
+
+
+@contextmanager
+def use_batch_backend(backend):
+    """
+    Route model calls made in this context through a batch backend
+
+    Args:
+        backend: BatchBackend
+
+    Yields:
+        BatchBackend: The same backend
+    """
+    token = _active_backend.set(backend)
+    try:
+        yield backend
+    finally:
+        _active_backend.reset(token)
+
+
+def _state(job):
+    """Job state name as a string"""
+    state = job.state
+    return getattr(state, 'name', None) or str(state)
+
+
+def _placeholder_text(model, request):
+    """Placeholder reply: schema-valid JSON when a response schema is set"""
+    contents = request.contents if isinstance(request.contents, list) else [request.contents]
+    prompt = '\n'.join(item if isinstance(item, str) else item.text or '' for item in contents if isinstance(item, (str, types.Part)))
+    return local_response_text(request.config.response_json_schema if request.config is not None else None, prompt)
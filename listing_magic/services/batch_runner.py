@@ -0,0 +1,384 @@
+"""
+Batch Runner Service
+
+Headless generation for whole portfolios. Reads a CSV or JSONL manifest
+(one listing per row/line), runs the listing, features, RESO and optional
+video stages for every listing on a bounded thread pool, and writes the
+artifacts to an ArtifactStore. Finished stages are checkpointed per
+listing, so a rerun after a crash skips everything already done for the
+same inputs.
+
+With a BatchBackend, the model calls of all listings are packed into
+provider batch jobs instead of being sent one by one (see batch_backend).
+
+Manifest columns/keys (only address, city, state and photos are required):
+
+    id, address, city, state, zip, price, beds_baths, sqft, property_type,
+    additional_details, word_count, photos
+
+photos is a folder of .jpg/.jpeg/.png files, relative to the manifest.
+"""
+
+import os
+import csv
+import json
+import hashlib
+import threading
+import traceback
+import contextvars
+from pathlib import Path
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .async_runtime import run_sync
+from .artifact_store import ArtifactStore, listing_slug
+from .batch_backend import get_batch_backend, use_batch_backend
+from .rate_limiter import session_scope
+from .model_router import collect_routes
+from .gemini_service import generate_listing_content, generate_features_sheet_async
+from .orchestrator import run_concurrently, DEFAULT_TASK_TIMEOUT
+from .reso_service import generate_reso_data_async
+from .render_profiles import DEFAULT_VIDEO_PROFILES, parse_profiles
+from .video_service import generate_video_formats
+
+# Import from our utils
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.file_manager import FileManager
+from utils.renditions import get_renditions, decode_photo, file_content_hash, make_video_rendition
+
+
+STAGES = ('listing', 'features', 'reso', 'video')
+DEFAULT_STAGES = ('listing', 'features', 'reso')
+DEFAULT_WORKERS = int(os.getenv("LISTING_MAGIC_BATCH_WORKERS", "4"))
+# With a batch backend, workers mostly wait on jobs; more of them means fuller
+# jobs, but each holds its listing's decoded photos until its calls return
+DEFAULT_BATCH_BACKEND_WORKERS = int(os.getenv("LISTING_MAGIC_BATCH_BACKEND_WORKERS", "64"))
+# Listings rendering a video at once (each holds full-size frames and keeps the cores busy)
+DEFAULT_VIDEO_WORKERS = int(os.getenv("LISTING_MAGIC_BATCH_VIDEO_WORKERS", "2"))
+PHOTO_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+MANIFEST_FIELDS = [
+    'id', 'address', 'city', 'state', 'zip', 'price', 'beds_baths', 'sqft',
+    'property_type', 'additional_details', 'word_count', 'photos'
+]
+
+
+def load_manifest(path):
+    """
+    Load and normalize a CSV or JSONL manifest
+
+    Args:
+        path: Manifest path (.csv, or .jsonl/.json lines)
+
+    Returns:
+        list: Listing dicts with every MANIFEST_FIELDS key, unique 'id'
+            values and 'photos' resolved to an absolute folder
+
+    Raises:
+        ValueError: On a missing required field or duplicate listing ID
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    entries = []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        row = {key.strip().lower(): value for key, value in row.items() if key}
+        entry = {field: str(row.get(field) or '').strip() for field in MANIFEST_FIELDS}
+
+        missing = [field for field in ('address', 'city', 'state', 'photos') if not entry[field]]
+        if missing:
+            raise ValueError(f"Manifest row {number}: missing {', '.join(missing)}")
+
+        entry['id'] = listing_slug(entry['id'] or f"{entry['address']} {entry['city']} {entry['state']} {entry['zip']}")
+        if entry['id'] in seen:
+            raise ValueError(f"Manifest row {number}: duplicate listing id '{entry['id']}'")
+        seen.add(entry['id'])
+
+        entry['property_type'] = entry['property_type'] or 'Single Family Home'
+        entry['word_count'] = int(entry['word_count'] or 250)
+        entry['photos'] = str((path.parent / entry['photos']).resolve())
+        entries.append(entry)
+    return entries
+
+
+def list_listing_photos(folder):
+    """
+    Photo files of a listing
+
+    Args:
+        folder: Photo folder
+
+    Returns:
+        list: Paths in file name order (empty if the folder is missing)
+    """
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    return sorted(p for p in folder.iterdir() if p.suffix.lower() in PHOTO_EXTENSIONS)
+
+
+def load_listing_photos(files):
+    """
+    Load a listing's photos as model renditions
+
+    Args:
+        files: Photo paths from list_listing_photos()
+
+    Returns:
+        list: PIL Images, in file order
+    """
+    return [get_renditions(p.read_bytes(), video=False)['model'] for p in files]
+
+
+def load_video_photos(files):
+    """
+    Load a listing's photos as video renditions
+
+    Built fresh rather than kept in the shared rendition cache, so a
+    batch doesn't retain full-size images of every listing it rendered.
+
+    Args:
+        files: Photo paths from list_listing_photos()
+
+    Returns:
+        list: PIL Images, in file order
+    """
+    return [make_video_rendition(decode_photo(p.read_bytes())) for p in files]
+
+
+def listing_input_hash(entry, photo_hashes):
+    """Hash of everything a listing's artifacts depend on"""
+    inputs = {key: value for key, value in entry.items() if key != 'photos'}
+    inputs['photos'] = photo_hashes
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def run_listing(entry, store, stages=DEFAULT_STAGES, media=None, force=False, video_profiles=None):
+    """
+    Run the requested stages for one listing, skipping checkpointed ones
+
+    Args:
+        entry: Normalized manifest entry (see load_manifest)
+        store: ArtifactStore
+        stages: Stage names to run
+        media: Optional MediaRegistry for reusing uploaded photo references
+        force: If True, ignore checkpoints and bypass the response cache
+        video_profiles: Render profiles of the video stage (default:
+            LISTING_MAGIC_VIDEO_PROFILES)
+
+    Returns:
+        dict: {'id', 'status', 'ran', 'skipped', 'error'}
+    """
+    listing_id = entry['id']
+    video_profiles = parse_profiles(video_profiles or DEFAULT_VIDEO_PROFILES)
+    # Hash the files first; photos are only decoded for stages that will run
+    files = list_listing_photos(entry['photos'])
+    photo_hashes = [file_content_hash(p.read_bytes()) for p in files]
+    input_hash = listing_input_hash(entry, photo_hashes)
+    done = set() if force else store.completed_stages(listing_id, input_hash)
+    # A finished video stage only counts if it rendered every requested format
+    if 'video' in done and not set(video_profiles) <= set(store.checkpoint(listing_id)['stages']['video'].get('paths', {})):
+        done.discard('video')
+    ran, skipped = [], [stage for stage in stages if stage in done]
+
+    if not files:
+        error = f"No photos found in {entry['photos']}"
+        store.mark_status(listing_id, 'failed', input_hash, error=error)
+        return {'id': listing_id, 'status': 'failed', 'ran': ran, 'skipped': skipped, 'error': error}
+
+    if len(skipped) == len(stages):
+        store.mark_status(listing_id, 'done', input_hash)
+        return {'id': listing_id, 'status': 'done', 'ran': ran, 'skipped': skipped, 'error': None}
+
+    store.mark_status(listing_id, 'running', input_hash)
+    text_stages = [stage for stage in ('listing', 'features', 'reso') if stage in stages and stage not in done]
+    images = load_listing_photos(files) if text_stages else []
+
+    # Same fallbacks as the interactive app
+    addr_display = entry['address'] or 'Unknown Address'
+    price_display = entry['price'] or 'Price Upon Request'
+    beds_display = entry['beds_baths'] or 'Contact for Details'
+
+    try:
+        if 'listing' in stages and 'listing' not in done:
+            with collect_routes() as routes:
+                listing_desc, video_script = generate_listing_content(
+                    images, addr_display, price_display, beds_display, entry['property_type'],
+                    entry['additional_details'], entry['word_count'],
+                    use_cache=not force, media=media
+                )
+            store.save(listing_id, 'listing_description', listing_desc)
+            store.save(listing_id, 'video_script', video_script)
+            store.mark_stage(listing_id, 'listing', input_hash, **_served_by(routes, 'listing'))
+            ran.append('listing')
+
+        pending = [stage for stage in ('features', 'reso') if stage in stages and stage not in done]
+        if pending:
+            listing_desc = store.load(listing_id, 'listing_description')
+            if listing_desc is None:
+                raise RuntimeError("Listing description missing; run the listing stage first")
+            ran.extend(_run_followups(entry, store, pending, images, listing_desc, input_hash, media, force))
+
+        if 'video' in stages and 'video' not in done:
+            video_script = store.load(listing_id, 'video_script')
+            if video_script is None:
+                raise RuntimeError("Video script missing; run the listing stage first")
+            video_paths = _run_video(entry, store, files, video_script, video_profiles)
+            store.mark_stage(listing_id, 'video', input_hash, path=next(iter(video_paths.values())), paths=video_paths)
+            ran.append('video')
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        store.mark_status(listing_id, 'failed', input_hash, error=error)
+        return {'id': listing_id, 'status': 'failed', 'ran': ran, 'skipped': skipped, 'error': error}
+
+    store.mark_status(listing_id, 'done', input_hash)
+    return {'id': listing_id, 'status': 'done', 'ran': ran, 'skipped': skipped, 'error': None}
+
+
+def run_batch(manifest_path, output_dir, stages=DEFAULT_STAGES, workers=None, force=False, media=None, limit=None, batch_backend=None, video_profiles=None):
+    """
+    Run every listing of a manifest and write a batch summary
+
+    Listings run concurrently on a bounded thread pool; within a listing,
+    features and RESO run concurrently once the listing text exists. A
+    failing listing is recorded and doesn't stop the others.
+
+    Args:
+        manifest_path: CSV or JSONL manifest
+        output_dir: Artifact store root
+        stages: Stage names to run (subset of STAGES)
+        workers: Number of listings processed at the same time (default
+            LISTING_MAGIC_BATCH_WORKERS, or 256 with a batch backend)
+        force: If True, ignore checkpoints and bypass the response cache
+        media: Optional MediaRegistry for reusing uploaded photo references
+        limit: Optional maximum number of listings to process
+        batch_backend: Optional BatchBackend; model calls then go through
+            provider batch jobs
+        video_profiles: Render profiles of the video stage (default:
+            LISTING_MAGIC_VIDEO_PROFILES)
+
+    Returns:
+        dict: Summary with per-listing results and done/failed counts
+            (also written to <output_dir>/batch_summary.json)
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    video_profiles = parse_profiles(video_profiles or DEFAULT_VIDEO_PROFILES)
+
+    entries = load_manifest(manifest_path)[:limit]
+    store = ArtifactStore(output_dir)
+    started = datetime.now(timezone.utc)
+    results = []
+    if workers is None:
+        workers = DEFAULT_BATCH_BACKEND_WORKERS if batch_backend is not None else DEFAULT_WORKERS
+    workers = max(1, min(workers, len(entries) or 1))
+
+    print(f"[batch] {len(entries)} listings, stages: {', '.join(stages)}, workers: {workers}")
+    # All listings queue as one session, so a batch run gets a fair share of the
+    # rate limit rather than crowding out interactive sessions sharing it
+    with use_batch_backend(batch_backend), session_scope('batch'), ThreadPoolExecutor(max_workers=workers, thread_name_prefix="listing-magic-batch") as pool:
+        # Each listing runs in a copy of this context, so the batch backend follows it
+        futures = {
+            pool.submit(contextvars.copy_context().run, _run_listing_safely, entry, store, stages, media, force, video_profiles): entry
+            for entry in entries
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            detail = result['error'] or f"ran {', '.join(result['ran']) or 'nothing'}, skipped {', '.join(result['skipped']) or 'nothing'}"
+            print(f"[batch] {len(results)}/{len(entries)} {result['id']}: {result['status']} ({detail})")
+
+    order = {entry['id']: index for index, entry in enumerate(entries)}
+    results.sort(key=lambda result: order[result['id']])
+    summary = {
+        'manifest': str(Path(manifest_path).resolve()),
+        'started_at': started.isoformat(),
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'stages': list(stages),
+        'batch_jobs': batch_backend.summary() if batch_backend is not None else [],
+        'done': sum(result['status'] == 'done' for result in results),
+        'failed': sum(result['status'] == 'failed' for result in results),
+        'listings': results
+    }
+    with open(store.root / 'batch_summary.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def _run_listing_safely(entry, store, stages, media, force, video_profiles):
+    """run_listing() that reports unexpected errors as a failed result"""
+    try:
+        return run_listing(entry, store, stages=stages, media=media, force=force, video_profiles=video_profiles)
+    except Exception as e:
+        traceback.print_exc()
+        return {'id': entry['id'], 'status': 'failed', 'ran': [], 'skipped': [], 'error': f"{type(e).__name__}: {e}"}
+
+
+def _run_followups(entry, store, pending, images, listing_desc, input_hash, media, force):
+    """Run the pending features/RESO stages concurrently and store the results"""
+    addr_display = entry['address'] or 'Unknown Address'
+    price_display = entry['price'] or 'Price Upon Request'
+    beds_display = entry['beds_baths'] or 'Contact for Details'
+
+    tasks = {}
+    if 'features' in pending:
+        tasks['features'] = generate_features_sheet_async(
+            images, addr_display, price_display, beds_display, entry['property_type'],
+            entry['additional_details'], use_cache=not force, media=media
+        )
+    if 'reso' in pending:
+        tasks['reso'] = generate_reso_data_async(
+            images, entry['address'], entry['city'], entry['state'], entry['zip'],
+            entry['price'], entry['beds_baths'], entry['sqft'], entry['additional_details'],
+            listing_desc, entry['property_type'], use_cache=not force, media=media
+        )
+
+    # Batch jobs can take far longer than interactive calls
+    timeout = None if get_batch_backend() is not None else DEFAULT_TASK_TIMEOUT
+    with collect_routes() as routes:
+        results, errors = run_sync(run_concurrently(tasks, timeout=timeout))
+
+    # Keep whatever succeeded so a rerun only repeats the failed stage
+    ran = []
+    if 'features' in results:
+        store.save(entry['id'], 'features_sheet', results['features'])
+        store.mark_stage(entry['id'], 'features', input_hash, **_served_by(routes, 'features'))
+        ran.append('features')
+    if 'reso' in results:
+        store.save(entry['id'], 'reso_data', results['reso'])
+        store.mark_stage(entry['id'], 'reso', input_hash, **_served_by(routes, 'reso'))
+        ran.append('reso')
+    if errors:
+        stage, error = next(iter(errors.items()))
+        raise RuntimeError(f"{stage} stage failed: {type(error).__name__}: {error}")
+    return ran
+
+
+def _served_by(routes, artifact):
+    """Checkpoint details naming the tier and model that produced an artifact"""
+    route = next((r for r in reversed(routes) if artifact in r['artifacts']), None)
+    if route is None:
+        return {}
+    return {'tier': route['tier'], 'model': route['model'], 'fell_back': route['fell_back']}
+
+
+def _run_video(entry, store, files, video_script, video_profiles):
+    """Render the listing's video tour in each format into its artifact directory"""
+    if len(files) < 2:
+        raise RuntimeError("At least 2 photos are needed for a video tour")
+    file_manager = FileManager(session_id=entry['id'], root=store.root)
+    # Full-size renditions exist only while a listing holds a video slot
+    with _video_slots:
+        video_images = load_video_photos(files)
+        return generate_video_formats(video_images, video_script, file_manager, profiles=video_profiles)
+
+
+_video_slots = threading.BoundedSemaphore(max(1, DEFAULT_VIDEO_WORKERS))
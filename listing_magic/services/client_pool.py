@@ -0,0 +1,173 @@
+"""
+Client Pool Service
+
+Provides a single, process-wide Gemini client shared by every service call.
+The client sits on top of one keep-alive HTTP connection pool (plus an async
+pool for client.aio calls), so concurrent Streamlit sessions reuse warm TLS
+connections instead of paying for client setup and a fresh handshake on
+every button click. With several API keys (see key_pool) there is one
+client per key, all sharing the same connection pools.
+"""
+
+import os
+import atexit
+import threading
+
+import httpx
+from google import genai
+from google.genai import types
+
+from .async_runtime import submit, loop_running
+from .key_pool import get_key_pool, current_api_key
+from .telemetry import on_request, on_response, on_request_async, on_response_async
+
+
+# Pool defaults (overridable via environment or configure_client_pool)
+DEFAULT_POOL_SIZE = int(os.getenv("LISTING_MAGIC_POOL_SIZE", "20"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.getenv("LISTING_MAGIC_KEEPALIVE_SECONDS", "120"))
+DEFAULT_TIMEOUT = float(os.getenv("LISTING_MAGIC_HTTP_TIMEOUT_SECONDS", "300"))
+
+_lock = threading.Lock()
+_clients = {}
+_http_options = None
+_http_client = None
+_async_http_client = None
+_settings = {
+    'pool_size': DEFAULT_POOL_SIZE,
+    'keepalive_expiry': DEFAULT_KEEPALIVE_EXPIRY,
+    'timeout': DEFAULT_TIMEOUT,
+    'transport': None,
+    'base_url': os.getenv("LISTING_MAGIC_API_BASE_URL") or None
+}
+
+
+def configure_client_pool(pool_size=None, keepalive_expiry=None, timeout=None, transport=None, base_url=None):
+    """
+    Configure the shared connection pool
+
+    The current clients (if any) are closed and rebuilt lazily on the next
+    call to get_client(). Closing the shared HTTP pools aborts any request
+    still using them, so call this only at startup, before any requests
+    start (as batch.py does when pointing at a fake server).
+
+    Args:
+        pool_size: Maximum number of concurrent connections in the pool
+        keepalive_expiry: Seconds an idle connection is kept alive for reuse
+        timeout: Per-request HTTP timeout in seconds
+        transport: Optional httpx transport (e.g. httpx.MockTransport) used
+            in place of the network, for tests and local stand-ins. Used for
+            both the sync and async pools, so it must support both.
+        base_url: Optional API base URL (e.g. a local fake server)
+    """
+    with _lock:
+        if pool_size is not None:
+            _settings['pool_size'] = pool_size
+        if keepalive_expiry is not None:
+            _settings['keepalive_expiry'] = keepalive_expiry
+        if timeout is not None:
+            _settings['timeout'] = timeout
+        if transport is not None:
+            _settings['transport'] = transport
+        if base_url is not None:
+            _settings['base_url'] = base_url
+        _close_locked()
+
+
+def get_client(api_key=None):
+    """
+    Get the shared Gemini client for an API key, creating it on first use
+
+    Args:
+        api_key: Optional key; by default the key leased in the current
+            context (see KeyPool.lease), else the pool's least-loaded key
+
+    Returns:
+        genai.Client: Thread-safe client bound to the shared connection pool
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    global _http_options
+
+    if api_key is None:
+        api_key = current_api_key() or get_key_pool().choose()
+
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            if _http_options is None:
+                _http_options = _build_http_options()
+            client = genai.Client(api_key=api_key, http_options=_http_options)
+            _clients[api_key] = client
+        return client
+
+
+def reset_client_pool():
+    """
+    Close the shared clients and their connections (rebuilt on next use)
+
+    Requests still in flight on the closed pools fail, so this is for
+    shutdown and for use between runs, not while calls are running.
+    """
+    with _lock:
+        _close_locked()
+
+
+def _build_http_options():
+    """Build HttpOptions wrapping shared keep-alive httpx clients"""
+    global _http_client, _async_http_client
+
+    limits = httpx.Limits(
+        max_connections=_settings['pool_size'],
+        max_keepalive_connections=_settings['pool_size'],
+        keepalive_expiry=_settings['keepalive_expiry']
+    )
+    client_args = {
+        'limits': limits,
+        'timeout': _settings['timeout']
+    }
+    if _settings['transport'] is not None:
+        client_args['transport'] = _settings['transport']
+
+    # Hooks feed payload size and time-to-first-byte into call telemetry
+    _http_client = httpx.Client(
+        event_hooks={'request': [on_request], 'response': [on_response]},
+        **client_args
+    )
+    # Async pool connections bind to the service event loop (see async_runtime)
+    _async_http_client = httpx.AsyncClient(
+        event_hooks={'request': [on_request_async], 'response': [on_response_async]},
+        **client_args
+    )
+
+    options = {
+        'httpx_client': _http_client,
+        'httpx_async_client': _async_http_client
+    }
+    if _settings['base_url']:
+        options['base_url'] = _settings['base_url']
+    return types.HttpOptions(**options)
+
+
+def _close_locked():
+    """Close the current clients and HTTP pools. Caller must hold _lock."""
+    global _http_options, _http_client, _async_http_client
+
+    if _http_client is not None:
+        try:
+            _http_client.close()
+        except Exception as e:
+            print(f"Warning: Could not close HTTP connection pool: {e}")
+    if _async_http_client is not None and loop_running():
+        try:
+            # Must close on the loop that owns its connections
+            submit(_async_http_client.aclose())
+        except Exception as e:
+            print(f"Warning: Could not close async HTTP connection pool: {e}")
+    _clients.clear()
+    _http_options = None
+    _http_client = None
+    _async_http_client = None
+
+
+atexit.register(reset_client_pool)
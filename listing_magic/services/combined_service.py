@@ -0,0 +1,121 @@
+"""
+Combined Generation Service
+
+Generates every text artifact for a property in a single call: listing
+description, video script, features sheet and RESO data. This replaces
+three round trips with one structured-output request; the photos are
+described by their photo facts (see photo_facts).
+"""
+
+import re
+
+from .async_runtime import run_sync
+from .model_router import generate_routed_async
+from .photo_facts import attach_photo_facts_async
+from .prompts import build_combined_suffix
+from .reso_service import build_reso_record
+from .schemas import COMBINED_SCHEMA
+from .structured_output import generate_structured_async
+
+
+def generate_all_content(images, addr, city, state, zip_code, price, beds_baths, sqft, property_type, additional_details, word_count, use_cache=True, media=None):
+    """
+    Generate listing, script, features sheet and RESO data in one model call
+
+    Blocking wrapper around generate_all_content_async().
+
+    Returns:
+        dict: Keys 'listing_description', 'video_script', 'features_sheet'
+            and 'reso_data'
+    """
+    return run_sync(generate_all_content_async(
+        images, addr, city, state, zip_code, price, beds_baths, sqft,
+        property_type, additional_details, word_count,
+        use_cache=use_cache, media=media
+    ))
+
+
+async def generate_all_content_async(images, addr, city, state, zip_code, price, beds_baths, sqft, property_type, additional_details, word_count, use_cache=True, media=None):
+    """
+    Generate listing, script, features sheet and RESO data in one model call (async)
+
+    Args:
+        images: List of PIL Image objects
+        addr: Street address
+        city: City
+        state: State
+        zip_code: ZIP code (may be empty)
+        price: Asking price string
+        beds_baths: Beds/baths string
+        sqft: Square footage string (may be empty)
+        property_type: Type of property (Single Family Home, Condo, etc.)
+        additional_details: Additional property details to highlight
+        word_count: Target word count for listing description
+        use_cache: If False, bypass the response cache lookup
+        media: Optional MediaRegistry for reusing uploaded photo references
+
+    Returns:
+        dict: Keys 'listing_description', 'video_script', 'features_sheet'
+            and 'reso_data'
+    """
+
+    # Handle empty data gracefully
+    addr_display = addr if addr else 'Unknown Address'
+    price_display = price if price else 'Price Upon Request'
+    beds_display = beds_baths if beds_baths else 'Contact for Details'
+
+    full_address = f"{addr_display}, {city}, {state}"
+    if zip_code and zip_code.strip():
+        full_address += f" {zip_code}"
+
+    # Per-property suffix; the shared instructions come from the context cache
+    prompt = build_combined_suffix(full_address, price_display, beds_display, sqft, property_type, additional_details, word_count)
+    prompt, call_images = await attach_photo_facts_async(prompt, images, use_cache=use_cache, media=media)
+
+    # One call for every artifact, so it runs on the most demanding artifact's tier
+    data = await generate_routed_async(
+        ('listing', 'script', 'features', 'reso'),
+        prompt,
+        call_images,
+        lambda model: generate_structured_async(
+            'combined',
+            prompt,
+            call_images,
+            COMBINED_SCHEMA,
+            use_cache=use_cache,
+            media=media,
+            model=model,
+            shared_prefix=True
+        )
+    )
+
+    return _normalize_combined(data, addr, city, state, zip_code)
+
+
+def _normalize_combined(data, addr, city, state, zip_code):
+    """
+    Normalize a validated combined reply into the final artifacts
+
+    Args:
+        data: Dict matching COMBINED_SCHEMA
+        addr: Street address
+        city: City
+        state: State
+        zip_code: ZIP code
+
+    Returns:
+        dict: Normalized artifacts (see generate_all_content)
+    """
+    # Normalize all consecutive newlines (2 or more) to exactly 2 newlines
+    listing_desc = re.sub(r'\n\n+', '\n\n', data['listing_description'] or 'No description generated.')
+    video_script = re.sub(r'\n\n+', '\n\n', data['video_script'] or 'No script generated.')
+    features_text = re.sub(r'\n\n+', '\n\n', data['features_sheet'].strip())
+
+    reso_data = build_reso_record(data['reso'], addr, city, state, zip_code, listing_desc)
+
+    return {
+        'listing_description': listing_desc,
+        'video_script': video_script,
+        'features_sheet': features_text,
+        'reso_data': reso_data
+    }
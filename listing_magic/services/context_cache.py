@@ -0,0 +1,206 @@
+"""
+Context Cache Service
+
+Registers the shared prompt prefix (see prompts) with Gemini's explicit
+context cache and attaches the reference to every generation config, so
+the prefix is billed at the cached-token rate instead of being prefilled
+on each request. There is one entry per model and API key, refreshed
+before it expires.
+
+When the provider cache can't be used (backend 'local', no provider
+support, model or prefix size not eligible, or an API error), the prefix
+is sent as the system instruction instead: same prompt, no discount.
+"""
+
+import os
+import time
+import atexit
+import threading
+
+from google.genai import types
+
+from .providers import get_provider, resolve_api_key
+from .prompts import SHARED_PREFIX, prefix_version
+
+
+# 'provider' (explicit cache, falling back to local) or 'local'
+DEFAULT_BACKEND = os.getenv("LISTING_MAGIC_CONTEXT_CACHE", "provider")
+DEFAULT_TTL = int(os.getenv("LISTING_MAGIC_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+# Refresh entries that expire within this many seconds
+REFRESH_MARGIN = 300
+# After a failed create, use the local stand-in for this long before retrying
+RETRY_AFTER = 900
+
+
+class ContextCache:
+    """Provider context cache entries for the shared prompt prefix, per model"""
+
+    def __init__(self, backend=None, ttl_seconds=DEFAULT_TTL):
+        """
+        Args:
+            backend: 'provider' or 'local' (default LISTING_MAGIC_CONTEXT_CACHE)
+            ttl_seconds: Lifetime of provider cache entries
+        """
+        self.backend = backend or DEFAULT_BACKEND
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._failed_until = {}
+        # Guards the tables only; provider calls hold the slot's lock instead
+        self._lock = threading.Lock()
+        self._slot_locks = {}
+
+    def apply(self, model, config=None):
+        """
+        Attach the shared prefix to a generation config
+
+        Blocking (may create or refresh a provider cache entry); call from a
+        worker thread in async code.
+
+        Args:
+            model: Model name
+            config: Optional types.GenerateContentConfig of the request
+
+        Returns:
+            types.GenerateContentConfig: Copy with cached_content set, or with
+                the prefix as system_instruction when the provider cache is
+                not available
+        """
+        config = config or types.GenerateContentConfig()
+        name = self.cache_name(model)
+        if name is not None:
+            return config.model_copy(update={'cached_content': name})
+        return config.model_copy(update={'system_instruction': SHARED_PREFIX})
+
+    def cache_name(self, model):
+        """
+        Get a live provider cache entry for the prefix, creating or refreshing it
+
+        Provider calls run outside the shared lock, one at a time per model
+        and key. While one is in flight, other requests for that model and
+        key use the still-live entry, or the local stand-in, instead of
+        waiting.
+
+        Args:
+            model: Model name
+
+        Returns:
+            str: Cached content resource name for the leased (or least-loaded)
+                key, or None to use the local stand-in
+        """
+        if self.backend != 'provider' or not get_provider().supports_context_cache:
+            return None
+
+        version = prefix_version()
+        api_key = resolve_api_key()
+        slot = (model, api_key)
+        with self._lock:
+            entry, state = self._lookup_locked(slot, version)
+            if state in ('fresh', 'failed'):
+                return entry['name'] if entry else None
+            slot_lock = self._slot_locks.setdefault(slot, threading.Lock())
+
+        if not slot_lock.acquire(blocking=False):
+            # Another request is creating or refreshing this entry
+            return entry['name'] if state == 'refresh' else None
+        try:
+            with self._lock:
+                entry, state = self._lookup_locked(slot, version)
+            if state in ('fresh', 'failed'):
+                return entry['name'] if entry else None
+            try:
+                entry = self._create(model, version, api_key) if state == 'missing' else self._refresh(entry)
+            except Exception as e:
+                print(f"[context-cache] Using local prefix for {model}: {e}")
+                with self._lock:
+                    self._entries.pop(slot, None)
+                    self._failed_until[slot] = time.monotonic() + RETRY_AFTER
+                return None
+            with self._lock:
+                self._entries[slot] = entry
+            return entry['name']
+        finally:
+            slot_lock.release()
+
+    def close(self):
+        """Delete provider cache entries created by this process"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            try:
+                get_provider().caches(entry['api_key']).delete(name=entry['name'])
+            except Exception as e:
+                print(f"Warning: Could not delete context cache {entry['name']}: {e}")
+
+    def _lookup_locked(self, slot, version):
+        """
+        Entry for a slot and what it needs. Caller must hold _lock.
+
+        Returns:
+            tuple: (entry or None, state): 'fresh', 'refresh' (live but
+                expiring soon), 'missing' (absent, expired or for an older
+                prefix) or 'failed' (a recent create failed)
+        """
+        now = time.monotonic()
+        if self._failed_until.get(slot, 0) > now:
+            return None, 'failed'
+        entry = self._entries.get(slot)
+        if entry is None or entry['version'] != version or entry['expires'] <= now:
+            return None, 'missing'
+        if entry['expires'] - now < REFRESH_MARGIN:
+            return entry, 'refresh'
+        return entry, 'fresh'
+
+    def _create(self, model, version, api_key):
+        """Create a cache entry for the current prefix (provider call; no lock held)"""
+        cached = get_provider().caches(api_key).create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"listing-magic-prefix-{version}",
+                system_instruction=SHARED_PREFIX,
+                ttl=f"{self.ttl_seconds}s"
+            )
+        )
+        print(f"[context-cache] Created {cached.name} for {model} (prefix {version})")
+        return {
+            'name': cached.name,
+            'version': version,
+            'api_key': api_key,
+            'expires': time.monotonic() + self.ttl_seconds
+        }
+
+    def _refresh(self, entry):
+        """Extend a cache entry's TTL (provider call; no lock held)"""
+        get_provider().caches(entry['api_key']).update(
+            name=entry['name'],
+            config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+        )
+        return dict(entry, expires=time.monotonic() + self.ttl_seconds)
+
+
+_context_cache = None
+_context_cache_lock = threading.Lock()
+
+
+def get_context_cache():
+    """
+    Get the process-wide context cache
+
+    Returns:
+        ContextCache: Shared instance
+    """
+    global _context_cache
+
+    with _context_cache_lock:
+        if _context_cache is None:
+            _context_cache = ContextCache()
+        return _context_cache
+
+
+def _close_context_cache():
+    """Delete this process's provider cache entries on exit"""
+    if _context_cache is not None:
+        _context_cache.close()
+
+
+atexit.register(_close_context_cache)
@@ -0,0 +1,311 @@
+"""
+Fake Model Server
+
+A local HTTP stand-in for the Gemini generateContent endpoints, used to
+exercise the resilience policy (and anything else that talks to the model)
+without network access or API spend. It injects configurable latency and
+errors:
+
+    server = FakeModelServer(latency=0.2, error_rate=0.1).start()
+    configure_client_pool(base_url=server.url)
+    ...
+    server.stop()
+
+Faults can also be scripted per request with server.script(...), e.g.
+[('error', 503), ('delay', 5), None] makes the first request fail, the
+second hang for 5 seconds and the third succeed.
+
+Requests with a JSON response schema get a placeholder object that
+satisfies the schema, so whole pipelines can run offline. countTokens
+returns an estimate.
+
+It can also run standalone, for pointing other processes at it through
+LISTING_MAGIC_API_BASE_URL:
+
+    python -m listing_magic.services.fake_server --port 8765 --latency 0.5
+"""
+
+import re
+import sys
+import json
+import argparse
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_RESPONSE_TEXT = "This is a fake response."
+_MODEL_PATH = re.compile(r'/v1\w*/models/([^/:]+):(generateContent|streamGenerateContent|countTokens)')
+# Tokens per image tile and characters per text token, for countTokens
+_IMAGE_TOKENS = 258
+_CHARS_PER_TOKEN = 4
+# Photo count line of the photo analysis prompt (see prompts.build_photos_suffix)
+_PHOTO_COUNT_PATTERN = re.compile(r'Photos provided: (\d+)')
+
+
+class FakeModelServer:
+    """Threaded local server speaking a minimal subset of the Gemini REST API"""
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, error_status=503, responder=None, host='127.0.0.1', port=0):
+        """
+        Configure the server (call start() to begin serving)
+
+        Args:
+            latency: Base delay before every response, in seconds
+            latency_jitter: Extra uniformly random delay, in seconds
+            error_rate: Probability of failing a request with error_status
+            error_status: HTTP status used for random errors
+            responder: Optional callable(model, request_json) -> response text
+                (default: schema-valid placeholder JSON, or fixed text)
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responder = responder or default_responder
+        self.requests = []
+        self._script = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass to configure_client_pool(base_url=...)"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def script(self, faults):
+        """
+        Queue per-request faults, consumed in order before random faults apply
+
+        Args:
+            faults: List of ('error', status), ('delay', seconds) or None (no fault)
+        """
+        with self._lock:
+            self._script.extend(faults)
+
+    def start(self):
+        """Start serving on a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-model-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_fault(self):
+        """Pick the fault for the next request: scripted first, then random"""
+        with self._lock:
+            if self._script:
+                return self._script.pop(0)
+        if self.error_rate and random.random() < self.error_rate:
+            return ('error', self.error_status)
+        return None
+
+
+def _make_handler(server):
+    """Build the request handler class bound to a FakeModelServer"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            match = _MODEL_PATH.search(self.path)
+            if not match:
+                return self._send_json(404, _error_body(404, f"Unknown path {self.path}"))
+
+            model, method = match.groups()
+            request = json.loads(body or b'{}')
+            with server._lock:
+                server.requests.append({'model': model, 'method': method, 'api_key': self.headers.get('x-goog-api-key'), 'time': time.time()})
+
+            fault = server._next_fault()
+            delay = server.latency + random.uniform(0, server.latency_jitter)
+            if fault and fault[0] == 'delay':
+                delay += fault[1]
+            if delay:
+                time.sleep(delay)
+            if fault and fault[0] == 'error':
+                return self._send_json(fault[1], _error_body(fault[1], "Injected fault"))
+
+            if method == 'countTokens':
+                return self._send_json(200, {'totalTokens': _count_tokens(request)})
+
+            text = server.responder(model, request)
+            if method == 'generateContent':
+                return self._send_json(200, _candidate(text))
+            self._send_stream(text)
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self._write(data)
+
+        def _send_stream(self, text):
+            # Server-sent events, a few chunks per response
+            size = max(1, len(text) // 4)
+            events = b''.join(
+                f"data: {json.dumps(_candidate(text[i:i + size]))}\r\n\r\n".encode()
+                for i in range(0, len(text), size)
+            )
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Content-Length', str(len(events)))
+            self.end_headers()
+            self._write(events)
+
+        def _write(self, data):
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client gave up (deadline or losing hedge); expected
+                pass
+
+    return Handler
+
+
+def default_responder(model, request):
+    """Placeholder reply: schema-valid JSON when a response schema is set"""
+    prompt = '\n'.join(
+        part['text'] for content in request.get('contents') or [] for part in content.get('parts') or [] if 'text' in part
+    )
+    return local_response_text((request.get('generationConfig') or {}).get('responseJsonSchema'), prompt)
+
+
+def local_response_text(schema=None, prompt=''):
+    """
+    Placeholder response text shared by the local stand-ins
+
+    Args:
+        schema: Optional JSON response schema
+        prompt: Request text; a "Photos provided: N" line sizes arrays of
+            objects to N entries (one per photo), so a photo analysis
+            describes every photo
+
+    Returns:
+        str: JSON satisfying the schema, or fixed text without one
+    """
+    if schema:
+        match = _PHOTO_COUNT_PATTERN.search(prompt or '')
+        return json.dumps(sample_from_schema(schema, count=int(match.group(1)) if match else 1))
+    return DEFAULT_RESPONSE_TEXT
+
+
+def sample_from_schema(schema, name='value', count=1, index=1):
+    """
+    Build a minimal value that satisfies a JSON schema
+
+    Args:
+        schema: JSON schema dict
+        name: Property name (used in placeholder strings)
+        count: Number of entries in arrays of objects
+        index: 1-based position in the enclosing array (used for integers)
+
+    Returns:
+        Placeholder value
+    """
+    if 'enum' in schema:
+        return schema['enum'][0]
+    types = schema.get('type', 'string')
+    types = [types] if isinstance(types, str) else types
+    kind = next((t for t in types if t != 'null'), 'null')
+
+    if kind == 'object':
+        return {key: sample_from_schema(sub, key, count, index) for key, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        if 'items' not in schema:
+            return []
+        items = schema['items']
+        size = count if items.get('type') == 'object' else 1
+        return [sample_from_schema(items, name, count, position) for position in range(1, size + 1)]
+    if kind in ('integer', 'number'):
+        return index
+    if kind == 'boolean':
+        return False
+    if kind == 'null':
+        return None
+    return f"Sample {name}"
+
+
+def _candidate(text):
+    """generateContent response body carrying text"""
+    return {
+        'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': text}]},
+            'finishReason': 'STOP',
+            'index': 0
+        }],
+        'usageMetadata': {'promptTokenCount': 0, 'candidatesTokenCount': len(text.split())}
+    }
+
+
+def _count_tokens(request):
+    """Estimated input tokens of a countTokens request"""
+    total = 0
+    for content in request.get('contents') or []:
+        for part in content.get('parts') or []:
+            if 'text' in part:
+                total += len(part['text']) // _CHARS_PER_TOKEN
+            elif 'inlineData' in part or 'fileData' in part:
+                total += _IMAGE_TOKENS
+    return total
+
+
+def _error_body(status, message):
+    """Google API error body"""
+    return {'error': {'code': status, 'message': message, 'status': 'UNAVAILABLE' if status >= 500 else 'ERROR'}}
+
+
+def main(argv=None):
+    """Serve until interrupted"""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Gemini generateContent API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Base response delay in seconds")
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help="Extra random delay in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument('--error-status', type=int, default=503, help="HTTP status of injected failures")
+    args = parser.parse_args(argv)
+
+    server = FakeModelServer(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        host=args.host,
+        port=args.port
+    ).start()
+    print(f"Fake model server listening on {server.url} (set LISTING_MAGIC_API_BASE_URL={server.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,19 +2,58 @@
 Gemini Service
 
 Handles all AI content generation using Google Gemini API including
-listing descriptions, video scripts, and features sheets.
+listing descriptions, video scripts, and features sheets. The photos are
+described by the shared photo facts pass (see photo_facts), so these are
+text-only calls.
 """
 
-import os
-import json
 import re
-from google import genai
 
-
-def generate_listing_content(images, addr_display, price_display, beds_display, property_type, additional_details, word_count):
+from .async_runtime import run_sync
+from .model_gateway import generate_text_async, stream_text, map_stream
+from .model_router import generate_routed_async, route_model
+from .photo_facts import attach_photo_facts_async
+from .prompts import build_listing_suffix, build_features_suffix
+from .schemas import LISTING_SCHEMA
+from .structured_output import (
+    IncompleteResponseError,
+    structured_config,
+    parse_structured,
+    generate_structured_async,
+    complete_missing_fields_async
+)
+
+# Import from our utils
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.stream_assembler import IncrementalJSONAssembler
+from utils.photo_selector import select_diverse_photos
+
+
+# The listing call writes both the description and the video script
+LISTING_ARTIFACTS = ('listing', 'script')
+
+
+def generate_listing_content(images, addr_display, price_display, beds_display, property_type, additional_details, word_count, use_cache=True, media=None):
     """
     Generate listing description and video script using Gemini
 
+    Blocking wrapper around generate_listing_content_async().
+
+    Returns:
+        tuple: (listing_description, video_script)
+    """
+    return run_sync(generate_listing_content_async(
+        images, addr_display, price_display, beds_display, property_type,
+        additional_details, word_count, use_cache=use_cache, media=media
+    ))
+
+
+async def generate_listing_content_async(images, addr_display, price_display, beds_display, property_type, additional_details, word_count, use_cache=True, media=None):
+    """
+    Generate listing description and video script using Gemini (async)
+
     Args:
         images: List of PIL Image objects
         addr_display: Formatted address string
@@ -23,63 +62,104 @@ def generate_listing_content(images, addr_display, price_display, beds_display,
         property_type: Type of property (Single Family Home, Condo, etc.)
         additional_details: Additional property details to highlight
         word_count: Target word count for listing description
+        use_cache: If False, bypass the response cache lookup
+        media: Optional MediaRegistry for reusing uploaded photo references
 
     Returns:
         tuple: (listing_description, video_script)
     """
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment")
-
-    client = genai.Client(api_key=api_key)
-
-    # Construct prompt with actual values
-    prompt = f"""
-    You are a top-tier luxury real estate copywriter. Here are photos of {addr_display}, a {property_type} listed for {price_display}. The property has {beds_display}.
-
-    {f"IMPORTANT DETAILS TO HIGHLIGHT: {additional_details}" if additional_details else ""}
-
-    CRITICAL LEGAL CONSTRAINT: You must strictly adhere to the U.S. Fair Housing Act.
-    NEVER mention race, religion, gender, disability, or familial status.
-    DO NOT use phrases like "perfect for families", "great for kids", "bachelor pad", "walking distance to church", or "gentlemen's farm".
-
-    Focus strictly on the physical features, architectural style, and lifestyle amenities.
+    # Per-property suffix; the shared instructions come from the context cache
+    prompt = build_listing_suffix(addr_display, price_display, beds_display, property_type, additional_details, word_count)
+
+    # Describe a few diverse, representative photos rather than the first three
+    limited_images = select_diverse_photos(images)
+    prompt, call_images = await attach_photo_facts_async(prompt, images, limited_images, use_cache=use_cache, media=media)
+
+    # Call Gemini API with the listing schema (served from the response cache when possible);
+    # the model tier comes from the listing and script routing policies
+    data = await generate_routed_async(
+        LISTING_ARTIFACTS,
+        prompt,
+        call_images,
+        lambda model: generate_structured_async(
+            'listing',
+            prompt,
+            call_images,
+            LISTING_SCHEMA,
+            use_cache=use_cache,
+            media=media,
+            model=model,
+            shared_prefix=True
+        )
+    )
 
-    Output Requirements:
-    Provide the output in JSON format with two keys: "listing_description" and "video_script".
-    The values should be plain text (no HTML tags).
-    Format the output in clean Markdown. Ensure there is a double newline between every paragraph for proper spacing.
+    return _normalize_listing(data)
 
-    Listing Description: Write a {word_count}-word engaging, professional listing description tailored for a {property_type}. Use the provided address ({addr_display}) and price ({price_display}) in the first paragraph. Do not use placeholders like [Address] or [Price]. Highlight features appropriate for this property type as seen in the photos (e.g., natural light, flooring, appliances, common areas, etc.).
 
-    Social Media Video Script: Create a structured script for a 60-second video tour (Instagram Reel/TikTok style) that emphasizes the unique selling points of a {property_type}. Match specific voiceover lines to specific photo filenames provided.
+def stream_listing_content(images, addr_display, price_display, beds_display, property_type, additional_details, word_count, use_cache=True, media=None):
     """
+    Stream listing description and video script as they are generated
 
-    # PERFORMANCE FIX: Limit to 3 images for fastest response
-    # Testing with minimal images to debug slow generation
-    limited_images = images[:3]
-    print(f"Sending {len(limited_images)} images to API...")
-    contents = [prompt] + limited_images
-
-    # Call Gemini API
-    response = client.models.generate_content(
-        model='gemini-3-pro-preview',
-        contents=contents
-    )
+    Same arguments as generate_listing_content_async(). Yields partial results so
+    the UI can paint text token-by-token; the last item is the final,
+    normalized result with 'done' set to True.
 
-    # Parse JSON and clean up response
-    text = response.text
-    if "```json" in text:
-        text = text.split("```json")[1].split("```")[0]
-    elif "```" in text:
-        text = text.split("```")[1].split("```")[0]
+    Yields:
+        dict: Keys 'listing_description', 'video_script' and 'done'
+    """
+    prompt = build_listing_suffix(addr_display, price_display, beds_display, property_type, additional_details, word_count)
+    limited_images = select_diverse_photos(images)
+    prompt, call_images = run_sync(attach_photo_facts_async(prompt, images, limited_images, use_cache=use_cache, media=media))
+    model = route_model(LISTING_ARTIFACTS, prompt, call_images)
+    assembler = IncrementalJSONAssembler()
+
+    def partial(delta):
+        fields = assembler.feed(delta)
+        return {
+            'listing_description': fields.get('listing_description', ''),
+            'video_script': fields.get('video_script', ''),
+            'done': False
+        }
+
+    try:
+        data = yield from map_stream(
+            stream_text(
+                'listing',
+                prompt,
+                call_images,
+                parse=lambda text: parse_structured(text, LISTING_SCHEMA),
+                model=model,
+                use_cache=use_cache,
+                media=media,
+                config=structured_config(LISTING_SCHEMA),
+                shared_prefix=True
+            ),
+            partial
+        )
+    except IncompleteResponseError as error:
+        # Re-request only the fields the stream got wrong
+        data = run_sync(complete_missing_fields_async(
+            'listing', prompt, call_images, error, media=media, model=model, shared_prefix=True
+        ))
+
+    listing_desc, video_script = _normalize_listing(data)
+
+    yield {'listing_description': listing_desc, 'video_script': video_script, 'done': True}
+
+
+def _normalize_listing(data):
+    """
+    Normalize a validated listing/script reply
 
-    data = json.loads(text)
+    Args:
+        data: Dict matching LISTING_SCHEMA
 
-    # Post-processing for spacing - ensure consistent double newlines between paragraphs
-    listing_desc = data.get('listing_description', 'No description generated.')
-    video_script = data.get('video_script', 'No script generated.')
+    Returns:
+        tuple: (listing_description, video_script)
+    """
+    listing_desc = data['listing_description'] or 'No description generated.'
+    video_script = data['video_script'] or 'No script generated.'
 
     # Use regex to normalize all consecutive newlines (2 or more) to exactly 2 newlines
     # This ensures consistent spacing regardless of how the AI formatted the text
@@ -89,10 +169,25 @@ def generate_listing_content(images, addr_display, price_display, beds_display,
     return listing_desc, video_script
 
 
-def generate_features_sheet(images, addr_display, price_display, beds_display, property_type, additional_details):
+def generate_features_sheet(images, addr_display, price_display, beds_display, property_type, additional_details, use_cache=True, media=None):
     """
     Generate detailed property features sheet using Gemini
 
+    Blocking wrapper around generate_features_sheet_async().
+
+    Returns:
+        str: Formatted features sheet text
+    """
+    return run_sync(generate_features_sheet_async(
+        images, addr_display, price_display, beds_display, property_type,
+        additional_details, use_cache=use_cache, media=media
+    ))
+
+
+async def generate_features_sheet_async(images, addr_display, price_display, beds_display, property_type, additional_details, use_cache=True, media=None):
+    """
+    Generate detailed property features sheet using Gemini (async)
+
     Args:
         images: List of PIL Image objects
         addr_display: Formatted address string
@@ -100,64 +195,88 @@ def generate_features_sheet(images, addr_display, price_display, beds_display, p
         beds_display: Formatted beds/baths string
         property_type: Type of property (Single Family Home, Condo, etc.)
         additional_details: Additional property details to highlight
+        use_cache: If False, bypass the response cache lookup
+        media: Optional MediaRegistry for reusing uploaded photo references
 
     Returns:
         str: Formatted features sheet text
     """
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment")
-
-    client = genai.Client(api_key=api_key)
-
-    # Construct features sheet prompt
-    prompt = f"""
-    You are a luxury real estate copywriter creating a detailed Property Features Sheet for potential buyers.
-
-    Property Type: {property_type}
-    Property: {addr_display}, listed for {price_display}, {beds_display}
+    # Per-property suffix; the shared instructions come from the context cache
+    prompt = build_features_suffix(addr_display, price_display, beds_display, property_type, additional_details)
+
+    # Describe a few diverse, representative photos rather than the first three
+    limited_images = select_diverse_photos(images)
+    prompt, call_images = await attach_photo_facts_async(prompt, images, limited_images, use_cache=use_cache, media=media)
+
+    # Call Gemini API (served from the response cache when possible) on the features tier
+    return await generate_routed_async(
+        ('features',),
+        prompt,
+        call_images,
+        lambda model: generate_text_async(
+            'features',
+            prompt,
+            call_images,
+            parse=_parse_features_response,
+            model=model,
+            use_cache=use_cache,
+            media=media,
+            shared_prefix=True
+        )
+    )
 
-    {f"IMPORTANT DETAILS TO HIGHLIGHT: {additional_details}" if additional_details else ""}
 
-    Create a comprehensive Property Features Sheet (300-500 words) tailored for a {property_type} that includes:
+def stream_features_sheet(images, addr_display, price_display, beds_display, property_type, additional_details, use_cache=True, media=None):
+    """
+    Stream the features sheet as it is generated
 
-    1. An engaging, descriptive title for the property (not just the address)
-    2. Detailed descriptions of each room and living space appropriate for this property type
-    3. Unique features, architectural details, and character elements
-    4. Recent updates and improvements
-    5. Outdoor spaces, parking, and storage areas (if applicable to this property type)
-    6. Use descriptive, marketing-focused language that appeals to buyers interested in a {property_type}
+    Same arguments as generate_features_sheet_async(). Yields the text generated
+    so far; the last item is the final, normalized result with 'done' set
+    to True.
 
-    CRITICAL LEGAL CONSTRAINT: You must strictly adhere to the U.S. Fair Housing Act.
-    NEVER mention race, religion, gender, disability, or familial status.
-    DO NOT use phrases like "perfect for families", "great for kids", "bachelor pad", "walking distance to church", or "gentlemen's farm".
+    Yields:
+        dict: Keys 'features_sheet' and 'done'
+    """
+    prompt = build_features_suffix(addr_display, price_display, beds_display, property_type, additional_details)
+    limited_images = select_diverse_photos(images)
+    prompt, call_images = run_sync(attach_photo_facts_async(prompt, images, limited_images, use_cache=use_cache, media=media))
+    model = route_model(('features',), prompt, call_images)
+    received = []
+
+    def partial(delta):
+        received.append(delta)
+        return {'features_sheet': ''.join(received), 'done': False}
+
+    features_text = yield from map_stream(
+        stream_text(
+            'features',
+            prompt,
+            call_images,
+            parse=_parse_features_response,
+            model=model,
+            use_cache=use_cache,
+            media=media,
+            shared_prefix=True
+        ),
+        partial
+    )
 
-    Focus strictly on the physical features, architectural style, and lifestyle amenities.
+    yield {'features_sheet': features_text, 'done': True}
 
-    Format the output with:
-    - A compelling title on the first line
-    - Well-structured paragraphs with double newlines between them
-    - Descriptive, engaging language
-    - 300-500 words total
 
-    Output ONLY the features sheet text, no JSON or additional formatting.
+def _parse_features_response(text):
     """
+    Normalize the features sheet reply
 
-    # PERFORMANCE FIX: Limit to 3 images for fastest response
-    # Testing with minimal images to debug slow generation
-    limited_images = images[:3]
-    print(f"Sending {len(limited_images)} images to API...")
-    contents = [prompt] + limited_images
-
-    # Call Gemini API
-    response = client.models.generate_content(
-        model='gemini-3-pro-preview',
-        contents=contents
-    )
+    Args:
+        text: Raw model response text
 
+    Returns:
+        str: Features sheet text with consistent paragraph spacing
+    """
     # Get and normalize the response
-    features_text = response.text.strip()
+    features_text = text.strip()
 
     # Normalize spacing
     features_text = re.sub(r'\n\n+', '\n\n', features_text)
@@ -0,0 +1,263 @@
+"""
+Key Pool Service
+
+Spreads model calls over several API keys (GOOGLE_API_KEYS, comma
+separated, plus GOOGLE_API_KEY) so aggregate throughput isn't capped by one
+key's quota. Keys only add quota when they belong to different projects.
+
+Each call leases the least-loaded healthy key: fewest calls in flight, then
+fewest requests in the last minute. A key that fails with a quota error
+(429) or an auth error (401/403) is quarantined until a cooldown expires;
+retries then go to another key. If every key is quarantined, the one that
+recovers first is used rather than failing outright.
+
+Per-key usage (calls, errors, tokens, requests in the last minute and the
+headroom left under LISTING_MAGIC_KEY_RPM) is exposed through stats().
+Keys are re-read from the environment when it changes, so a .env loaded
+after import (or a rotated key) is picked up.
+"""
+
+import os
+import re
+import time
+import hashlib
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+from google.genai import errors
+
+
+# Quarantine after a quota error
+DEFAULT_COOLDOWN = float(os.getenv("LISTING_MAGIC_KEY_COOLDOWN_SECONDS", "60"))
+# Quarantine after an auth error (revoked or restricted key)
+DEFAULT_AUTH_COOLDOWN = float(os.getenv("LISTING_MAGIC_KEY_AUTH_COOLDOWN_SECONDS", "900"))
+# Requests per minute one key allows, for headroom reporting (0 if unknown)
+DEFAULT_KEY_RPM = float(os.getenv("LISTING_MAGIC_KEY_RPM", "0"))
+
+QUOTA_STATUS_CODES = {429}
+AUTH_STATUS_CODES = {401, 403}
+
+_current_key = contextvars.ContextVar('listing_magic_api_key', default=None)
+
+
+def load_api_keys():
+    """
+    Read API keys from the environment
+
+    Returns:
+        list: Unique keys from GOOGLE_API_KEYS and GOOGLE_API_KEY, in order
+    """
+    keys = re.split(r'[\s,]+', os.getenv("GOOGLE_API_KEYS", ""))
+    keys.append(os.getenv("GOOGLE_API_KEY", ""))
+    return list(dict.fromkeys(key.strip() for key in keys if key.strip()))
+
+
+def key_label(api_key):
+    """Short, non-secret label for a key (for logs and the admin page)"""
+    return f"key-{hashlib.sha256(api_key.encode()).hexdigest()[:8]}"
+
+
+class KeyPool:
+    """Least-loaded routing over API keys with quarantine on quota/auth errors"""
+
+    def __init__(self, keys=None, cooldown_seconds=DEFAULT_COOLDOWN, auth_cooldown_seconds=DEFAULT_AUTH_COOLDOWN, key_rpm=DEFAULT_KEY_RPM):
+        """
+        Args:
+            keys: API keys (default: load_api_keys())
+            cooldown_seconds: Quarantine after a quota error
+            auth_cooldown_seconds: Quarantine after an auth error
+            key_rpm: Per-key requests per minute, for headroom (0 if unknown)
+        """
+        self.cooldown_seconds = cooldown_seconds
+        self.auth_cooldown_seconds = auth_cooldown_seconds
+        self.key_rpm = key_rpm
+        self._state = {}
+        self._lock = threading.Lock()
+        self.set_keys(load_api_keys() if keys is None else keys)
+
+    @property
+    def keys(self):
+        with self._lock:
+            return list(self._state)
+
+    def __len__(self):
+        return len(self._state)
+
+    def set_keys(self, keys):
+        """
+        Replace the pool's keys, keeping the usage state of keys that stay
+        """
+        with self._lock:
+            self._state = {key: self._state.get(key) or _new_state() for key in keys}
+
+    def choose(self):
+        """
+        Pick the key for the next call without leasing it
+
+        Returns:
+            str: API key
+
+        Raises:
+            ValueError: If no key is configured
+        """
+        with self._lock:
+            return self._choose_locked(time.monotonic())
+
+    @contextmanager
+    def lease(self):
+        """
+        Lease the least-loaded healthy key for one call
+
+        get_client() returns the leased key's client inside the block.
+        Quota and auth errors raised in the block quarantine the key.
+
+        Yields:
+            str: API key
+
+        Raises:
+            ValueError: If no key is configured
+        """
+        now = time.monotonic()
+        with self._lock:
+            api_key = self._choose_locked(now)
+            state = self._state[api_key]
+            state['in_flight'] += 1
+            state['calls'] += 1
+            state['recent'].append(now)
+
+        token = _current_key.set(api_key)
+        try:
+            yield api_key
+        except Exception as e:
+            self.report_error(api_key, e)
+            raise
+        finally:
+            _current_key.reset(token)
+            with self._lock:
+                if api_key in self._state:
+                    self._state[api_key]['in_flight'] -= 1
+
+    def report_error(self, api_key, error):
+        """
+        Count a failed call; quarantine the key on quota or auth errors
+
+        Args:
+            api_key: Key the call used
+            error: Exception raised by the call
+        """
+        code = error.code if isinstance(error, errors.APIError) else None
+        if code in QUOTA_STATUS_CODES:
+            cooldown = self.cooldown_seconds
+        elif code in AUTH_STATUS_CODES:
+            cooldown = self.auth_cooldown_seconds
+        else:
+            cooldown = None
+
+        with self._lock:
+            state = self._state.get(api_key)
+            if state is None:
+                return
+            state['errors'] += 1
+            state['last_error'] = f"{type(error).__name__}: {error}"[:200]
+            if cooldown is not None:
+                state['quarantined_until'] = time.monotonic() + cooldown
+        if cooldown is not None and len(self) > 1:
+            print(f"[key-pool] Quarantined {key_label(api_key)} for {cooldown:g}s after HTTP {code}")
+
+    def record_tokens(self, api_key, tokens):
+        """Add billed tokens to a key's usage"""
+        with self._lock:
+            if api_key in self._state and tokens:
+                self._state[api_key]['tokens'] += tokens
+
+    def stats(self):
+        """
+        Per-key usage and health
+
+        Returns:
+            list: One dict per key with its label, health, calls in flight,
+                calls, errors, tokens, requests in the last minute, headroom
+                under key_rpm and remaining quarantine seconds
+        """
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for api_key, state in self._state.items():
+                recent = _recent_requests(state, now)
+                quarantine = max(0.0, state['quarantined_until'] - now)
+                rows.append({
+                    'key': key_label(api_key),
+                    'healthy': quarantine == 0,
+                    'in_flight': state['in_flight'],
+                    'calls': state['calls'],
+                    'errors': state['errors'],
+                    'tokens': state['tokens'],
+                    'requests_last_minute': recent,
+                    'rpm_headroom': max(0, self.key_rpm - recent) if self.key_rpm else None,
+                    'quarantined_for_s': round(quarantine, 1),
+                    'last_error': state['last_error']
+                })
+        return rows
+
+    def _choose_locked(self, now):
+        """Least-loaded healthy key, else the first to leave quarantine. Caller must hold _lock."""
+        if not self._state:
+            raise ValueError("GOOGLE_API_KEY not found in environment")
+        healthy = [key for key, state in self._state.items() if state['quarantined_until'] <= now]
+        if not healthy:
+            return min(self._state, key=lambda key: self._state[key]['quarantined_until'])
+        return min(healthy, key=lambda key: (self._state[key]['in_flight'], _recent_requests(self._state[key], now)))
+
+
+def _new_state():
+    return {
+        'in_flight': 0,
+        'calls': 0,
+        'errors': 0,
+        'tokens': 0,
+        'recent': deque(),
+        'quarantined_until': 0.0,
+        'last_error': None
+    }
+
+
+def _recent_requests(state, now):
+    """Requests started in the last minute (drops older timestamps)"""
+    recent = state['recent']
+    while recent and recent[0] < now - 60:
+        recent.popleft()
+    return len(recent)
+
+
+_key_pool = None
+_key_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """
+    Get the process-wide key pool, synced with the environment
+
+    Returns:
+        KeyPool: Shared instance
+    """
+    global _key_pool
+
+    keys = load_api_keys()
+    with _key_pool_lock:
+        if _key_pool is None:
+            _key_pool = KeyPool(keys)
+        elif _key_pool.keys != keys:
+            _key_pool.set_keys(keys)
+        return _key_pool
+
+
+def current_api_key():
+    """
+    Get the key leased in the current context
+
+    Returns:
+        str: API key, or None outside a lease
+    """
+    return _current_key.get()
@@ -0,0 +1,223 @@
+"""
+Media Registry Service
+
+Session-scoped registry that uploads each processed photo once and hands
+out reusable file references, so the listing, features and RESO calls
+don't re-serialize and re-upload the same images on every request.
+
+Uploads go through the active provider (the Gemini Files API by default).
+Uploaded files belong to the uploading API key's project, so with several
+keys (see key_pool) a photo is uploaded once per key it is sent with.
+InlineUploader is a local stand-in that keeps the encoded bytes in memory,
+for tests and for offline use.
+
+Uploaded files are deleted when their photos are replaced (release()),
+when the registry is closed or garbage-collected with its session, and at
+process exit.
+"""
+
+import io
+import os
+import time
+import weakref
+import threading
+
+from google.genai import types
+
+from .providers import GeminiProvider, get_provider, resolve_api_key
+
+# Import from our utils
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.image_processor import image_content_hash
+
+
+# Gemini keeps uploaded files for 48 hours; refresh a little before that
+DEFAULT_HANDLE_TTL_SECONDS = 47 * 3600
+
+# 'files' (upload through the provider) or 'inline' (local stand-in)
+DEFAULT_MEDIA_BACKEND = os.getenv("LISTING_MAGIC_MEDIA_BACKEND", "files")
+
+
+def encode_image(img, quality=90):
+    """
+    Encode a PIL image as JPEG bytes for upload
+
+    Args:
+        img: PIL Image object
+        quality: JPEG quality (1-95)
+
+    Returns:
+        bytes: JPEG-encoded image data
+    """
+    buffered = io.BytesIO()
+    img.convert('RGB').save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+class ProviderUploader:
+    """Uploads media through the active provider (see providers)"""
+
+    @property
+    def per_key(self):
+        # Files are only visible to the uploading key's project
+        return get_provider().uses_api_keys
+
+    def upload(self, data, mime_type, display_name, api_key=None):
+        """
+        Upload bytes and return a (part, remote_name) pair
+
+        Args:
+            data: Encoded file bytes
+            mime_type: MIME type of the data
+            display_name: Human-readable name shown in the Files API
+            api_key: Key to upload with (default: see get_client())
+
+        Returns:
+            tuple: (types.Part referencing the file, remote file name)
+        """
+        return get_provider().upload(data, mime_type, display_name, api_key=api_key)
+
+    def delete(self, remote_name, api_key=None):
+        """Delete a previously uploaded file"""
+        get_provider().delete_upload(remote_name, api_key=api_key)
+
+
+class GeminiFilesUploader(ProviderUploader):
+    """Uploads media through the Gemini Files API, whatever the active provider"""
+
+    per_key = True
+
+    def upload(self, data, mime_type, display_name, api_key=None):
+        """See ProviderUploader.upload()"""
+        return GeminiProvider().upload(data, mime_type, display_name, api_key=api_key)
+
+    def delete(self, remote_name, api_key=None):
+        """Delete a previously uploaded file"""
+        GeminiProvider().delete_upload(remote_name, api_key=api_key)
+
+
+class InlineUploader:
+    """Local stand-in that keeps encoded media inline instead of uploading"""
+
+    per_key = False
+
+    def upload(self, data, mime_type, display_name, api_key=None):
+        """Return an inline part for the data (no network)"""
+        return types.Part.from_bytes(data=data, mime_type=mime_type), None
+
+    def delete(self, remote_name, api_key=None):
+        """Nothing to delete for inline media"""
+        pass
+
+
+class MediaRegistry:
+    """Uploads each image once per session and reuses the file reference"""
+
+    def __init__(self, uploader=None, ttl_seconds=DEFAULT_HANDLE_TTL_SECONDS):
+        """
+        Initialize an empty registry
+
+        Args:
+            uploader: Upload backend (default: chosen by LISTING_MAGIC_MEDIA_BACKEND)
+            ttl_seconds: How long a handle stays valid before re-uploading
+        """
+        if uploader is None:
+            uploader = InlineUploader() if DEFAULT_MEDIA_BACKEND == 'inline' else ProviderUploader()
+        self.uploader = uploader
+        self.ttl_seconds = ttl_seconds
+        self._handles = {}
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.reuses = 0
+        # Deletes the uploads once the session drops the registry, or at exit
+        self._finalizer = weakref.finalize(self, _delete_uploads, self.uploader, self._handles, self._lock)
+
+    def resolve(self, images):
+        """
+        Get model-ready parts for a list of images, uploading only new ones
+
+        Args:
+            images: List of PIL Image objects
+
+        Returns:
+            list: types.Part references, in the same order as images
+        """
+        return [self._resolve_one(img) for img in images]
+
+    def _resolve_one(self, img):
+        content_hash = image_content_hash(img)
+        api_key = resolve_api_key() if getattr(self.uploader, 'per_key', False) else None
+        handle_key = (content_hash, api_key)
+
+        with self._lock:
+            handle = self._handles.get(handle_key)
+            if handle and time.time() < handle['expires_at']:
+                self.reuses += 1
+                return handle['part']
+
+        data = encode_image(img)
+        part, remote_name = self.uploader.upload(data, 'image/jpeg', f"photo-{content_hash[:16]}", api_key=api_key)
+
+        with self._lock:
+            self._handles[handle_key] = {
+                'part': part,
+                'remote_name': remote_name,
+                'api_key': api_key,
+                'size': len(data),
+                'expires_at': time.time() + self.ttl_seconds
+            }
+            self.uploads += 1
+        return part
+
+    def release(self, keep=()):
+        """
+        Delete the uploads of images that are no longer needed
+
+        Args:
+            keep: PIL Image objects whose uploads stay (e.g. the session's
+                current photos); every other handle is expired and deleted
+
+        Returns:
+            int: Number of handles released
+        """
+        keep_hashes = {image_content_hash(img) for img in keep}
+        with self._lock:
+            stale = [key for key in self._handles if key[0] not in keep_hashes]
+            handles = [self._handles.pop(key) for key in stale]
+        _delete_handles(self.uploader, handles)
+        return len(handles)
+
+    def close(self):
+        """
+        Expire all handles and delete uploaded files
+
+        Called when the session ends (also runs when the registry is
+        garbage-collected). Errors are reported but not raised.
+        """
+        self._finalizer()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __repr__(self):
+        return f"MediaRegistry(handles={len(self._handles)}, uploads={self.uploads}, reuses={self.reuses})"
+
+
+def _delete_uploads(uploader, handles, lock):
+    """Expire every handle in a registry's table and delete the files (finalizer)"""
+    with lock:
+        removed = list(handles.values())
+        handles.clear()
+    _delete_handles(uploader, removed)
+
+
+def _delete_handles(uploader, handles):
+    """Delete uploaded files, reporting errors without raising"""
+    for handle in handles:
+        if handle['remote_name']:
+            try:
+                uploader.delete(handle['remote_name'], api_key=handle['api_key'])
+            except Exception as e:
+                print(f"Warning: Could not delete uploaded file {handle['remote_name']}: {e}")
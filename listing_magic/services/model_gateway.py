@@ -0,0 +1,321 @@
+"""
+Model Gateway Service
+
+Single entry point for the content services' model calls, on the active
+provider (Gemini or the local stand-in; see providers). A call is served
+from the response cache when possible, joined to an identical call
+already in flight (see single_flight), and otherwise admitted by the rate
+limiter and sent under the resilience policy, or packed into a provider
+batch job inside use_batch_backend(). Photos can go as MediaRegistry file
+references. Every call emits a telemetry record. Async, blocking and
+streaming calls are supported.
+"""
+
+import asyncio
+
+from .async_runtime import run_sync
+from .batch_backend import get_batch_backend
+from .key_pool import get_key_pool
+from .model_router import MODEL_TIERS, tier_of
+from .context_cache import get_context_cache
+from .prompts import prefix_version
+from .providers import get_provider, lease_api_key
+from .rate_limiter import get_rate_limiter, estimate_request_tokens
+from .single_flight import get_single_flight
+from .resilience import call_with_resilience, retry_stream
+from .response_cache import build_cache_key, get_response_cache
+from .telemetry import track_call, record_usage
+
+# Import from our utils
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.image_processor import image_content_hash
+
+
+DEFAULT_MODEL = MODEL_TIERS['flagship']
+
+
+async def generate_text_async(service, prompt, images, parse=None, model=DEFAULT_MODEL, use_cache=True, media=None, config=None, shared_prefix=False):
+    """
+    Generate content for a prompt and images, served from cache when possible
+
+    Runs on the service event loop; blocking work (cache I/O, uploads) is
+    pushed to worker threads so concurrent calls don't stall each other.
+
+    Args:
+        service: Name of the calling service (for logging)
+        prompt: Fully rendered prompt text
+        images: List of PIL Image objects sent with the prompt
+        parse: Optional callable applied to the response text. Only responses
+            that parse successfully are cached.
+        model: Model name
+        use_cache: If False, skip the cache lookup (the fresh response is
+            still stored)
+        media: Optional MediaRegistry used to send uploaded file references
+            instead of raw images
+        config: Optional types.GenerateContentConfig (e.g. JSON output mode)
+        shared_prefix: If True, the prompt is a per-property suffix to the
+            shared prompt prefix, which is attached from the context cache
+
+    Returns:
+        The parsed response (or raw response text when parse is None)
+    """
+    parse = parse or (lambda text: text)
+    cache = get_response_cache()
+    key = _request_key(model, prompt, images, config, shared_prefix)
+
+    with track_call(service, model, images) as record:
+        record['tier'] = tier_of(model)
+        if use_cache:
+            cached_text = await asyncio.to_thread(cache.get, key)
+            if cached_text is not None:
+                print(f"[{service}] Cache hit ({key[:12]})")
+                record['cache_hit'] = True
+                return parse(cached_text)
+
+        text, coalesced = await get_single_flight().run(
+            key, lambda: _send_async(service, model, prompt, images, media, config, shared_prefix, record)
+        )
+        if coalesced:
+            print(f"[{service}] Shared an identical in-flight request ({key[:12]})")
+            record['coalesced'] = True
+
+    result = parse(text)
+    if not coalesced:
+        await asyncio.to_thread(cache.set, key, text, model)
+    return result
+
+
+def generate_text(service, prompt, images, parse=None, model=DEFAULT_MODEL, use_cache=True, media=None, config=None, shared_prefix=False):
+    """
+    Blocking wrapper around generate_text_async() (see its arguments)
+
+    Returns:
+        The parsed response (or raw response text when parse is None)
+    """
+    return run_sync(generate_text_async(
+        service,
+        prompt,
+        images,
+        parse=parse,
+        model=model,
+        use_cache=use_cache,
+        media=media,
+        config=config,
+        shared_prefix=shared_prefix
+    ))
+
+
+def stream_text(service, prompt, images, parse=None, model=DEFAULT_MODEL, use_cache=True, media=None, config=None, shared_prefix=False):
+    """
+    Stream content for a prompt and images, served from cache when possible
+
+    A generator yielding text deltas as they arrive. On a cache hit the
+    whole cached text is yielded at once. When the stream completes, the
+    full text is parsed and cached, and the parsed result becomes the
+    generator's return value (use `result = yield from stream_text(...)`
+    or map_stream()).
+
+    Args:
+        See generate_text_async()
+
+    Yields:
+        str: Text deltas
+
+    Returns:
+        The parsed response (or raw response text when parse is None)
+    """
+    parse = parse or (lambda text: text)
+    cache = get_response_cache()
+    key = _request_key(model, prompt, images, config, shared_prefix)
+
+    with track_call(service, model, images, streamed=True) as record:
+        record['tier'] = tier_of(model)
+        if use_cache:
+            cached_text = cache.get(key)
+            if cached_text is not None:
+                print(f"[{service}] Cache hit ({key[:12]})")
+                record['cache_hit'] = True
+                yield cached_text
+                return parse(cached_text)
+
+        flight = get_single_flight()
+        call, leader = flight.join(key)
+        if not leader:
+            print(f"[{service}] Waiting for an identical in-flight request ({key[:12]})")
+            record['coalesced'] = True
+            try:
+                text = flight.wait(call)
+            finally:
+                flight.leave(key, call)
+            yield text
+            return parse(text)
+
+        chunks = []
+        try:
+            for delta in _stream_deltas(service, model, prompt, images, media, config, shared_prefix, record):
+                chunks.append(delta)
+                yield delta
+        except BaseException as e:
+            # GeneratorExit means our consumer stopped reading; waiters still need an outcome
+            flight.finish(key, call, error=e if isinstance(e, Exception) else RuntimeError("Identical streamed request was abandoned"))
+            raise
+        flight.finish(key, call, result=''.join(chunks))
+
+    text = ''.join(chunks)
+    result = parse(text)
+    cache.set(key, text, model=model)
+    return result
+
+
+def _stream_deltas(service, model, prompt, images, media, config, shared_prefix, record):
+    """
+    Stream one request from the model
+
+    Args:
+        See generate_text_async(); record is the caller's telemetry record
+
+    Yields:
+        str: Text deltas
+    """
+    provider = get_provider()
+    with lease_api_key() as api_key:
+        image_parts = media.resolve(images) if media is not None else list(images)
+
+        if shared_prefix:
+            config = get_context_cache().apply(model, config)
+
+        with get_rate_limiter().slot(model, estimate_request_tokens(prompt, images)) as lease:
+            record['queue_ms'] = lease['wait_ms']
+            print(f"[{service}] Streaming {len(images)} images to API...")
+            for chunk in retry_stream(service, model, lambda: provider.stream(
+                model,
+                [prompt] + image_parts,
+                config,
+                api_key=api_key
+            )):
+                # Usage metadata is complete on the final chunk
+                record_usage(record, chunk)
+                lease['used_tokens'] = record['prompt_tokens']
+                lease['requests'] = max(1, record['attempts'])
+                if chunk.text:
+                    yield chunk.text
+        _record_key_tokens(api_key, record)
+
+
+def _record_key_tokens(api_key, record):
+    """Add a call's billed tokens to its key's usage"""
+    if api_key is not None:
+        get_key_pool().record_tokens(api_key, (record['prompt_tokens'] or 0) + (record['output_tokens'] or 0))
+
+
+def map_stream(stream, transform):
+    """
+    Apply a transform to each item of a stream, preserving its return value
+
+    Args:
+        stream: Generator such as stream_text()
+        transform: Callable applied to every yielded item
+
+    Yields:
+        Transformed items
+
+    Returns:
+        The wrapped stream's return value
+    """
+    while True:
+        try:
+            item = next(stream)
+        except StopIteration as stop:
+            return stop.value
+        yield transform(item)
+
+
+async def _send_async(service, model, prompt, images, media, config, shared_prefix, record):
+    """
+    Send one request to the model (or the active batch backend)
+
+    Args:
+        See generate_text_async(); record is the caller's telemetry record
+
+    Returns:
+        str: Response text
+    """
+    provider = get_provider()
+    if provider.uses_api_keys:
+        # Fail fast (before the retry policy) when no key is configured
+        get_key_pool().choose()
+
+    async def prepare():
+        """Request contents and config for the leased key (uploads and context caches are per project)"""
+        # Reuse session file references when available (each photo uploads once)
+        if media is not None:
+            image_parts = await asyncio.to_thread(media.resolve, images)
+        else:
+            image_parts = list(images)
+        call_config = config
+        if shared_prefix:
+            call_config = await asyncio.to_thread(get_context_cache().apply, model, config)
+        return [prompt] + image_parts, call_config
+
+    batch = get_batch_backend()
+    if batch is not None:
+        print(f"[{service}] Queueing {len(images)} images for a batch job...")
+        record['batched'] = True
+        record['attempts'] = 1
+        with lease_api_key() as api_key:
+            contents, call_config = await prepare()
+            response = await batch.submit(service, model, contents, call_config)
+        record_usage(record, response)
+        _record_key_tokens(api_key, record)
+        return response.text
+
+    async def attempt():
+        # Each attempt leases a key, so a retry after a quota error uses another one
+        with lease_api_key() as api_key:
+            contents, call_config = await prepare()
+            response = await provider.generate(model, contents, call_config, api_key=api_key)
+        usage = response.usage_metadata
+        if api_key is not None and usage is not None:
+            get_key_pool().record_tokens(api_key, usage.total_token_count or 0)
+        return response
+
+    limiter = get_rate_limiter()
+    lease = await limiter.acquire_async(model, estimate_request_tokens(prompt, images))
+    record['queue_ms'] = lease['wait_ms']
+    try:
+        print(f"[{service}] Sending {len(images)} images to API...")
+        response = await call_with_resilience(service, model, attempt)
+        record_usage(record, response)
+    finally:
+        limiter.release(lease, record['prompt_tokens'], record['attempts'] + record['hedged'])
+
+    return response.text
+
+
+async def store_response_async(model, prompt, images, config, text, shared_prefix=False):
+    """
+    Store response text in the cache under a request's key
+
+    Used when a response was assembled locally (e.g. repaired fields merged
+    into a partial reply) so repeats of the original request hit the cache.
+
+    Args:
+        model: Model name
+        prompt: Fully rendered prompt text
+        images: List of PIL Image objects sent with the prompt
+        config: Generation config of the original request
+        text: Response text to store
+    """
+    key = _request_key(model, prompt, images, config, shared_prefix)
+    await asyncio.to_thread(get_response_cache().set, key, text, model)
+
+
+def _request_key(model, prompt, images, config, shared_prefix=False):
+    """Build the response cache key for a request"""
+    config_key = config.model_dump(mode='json', exclude_none=True) if config is not None else None
+    if shared_prefix:
+        # The prefix version, not the (rotating) provider cache name, identifies it
+        config_key = {'config': config_key, 'prefix': prefix_version()}
+    return build_cache_key(model, prompt, [image_content_hash(img) for img in images], extra=config_key)
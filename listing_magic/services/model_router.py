@@ -0,0 +1,290 @@
+"""
+Model Router Service
+
+Picks the model for each generation from a per-artifact policy instead of
+always using the flagship. Tiers, best first:
+
+    flagship  gemini-3-pro-preview    (LISTING_MAGIC_MODEL_FLAGSHIP)
+    balanced  gemini-2.5-flash        (LISTING_MAGIC_MODEL_BALANCED)
+    fast      gemini-2.5-flash-lite   (LISTING_MAGIC_MODEL_FAST)
+
+A policy names the best tier an artifact may use, latency and cost
+budgets, a deadline and a fallback tier. The router steps down from the
+policy's tier until expected latency (p95 from telemetry) and cost fit the
+budgets; a call that misses its deadline or hits an open circuit is
+repeated on the fallback tier. Policies are changed with
+configure_routing() or the environment, e.g.
+
+    LISTING_MAGIC_ROUTE_RESO="tier=fast,deadline=20,fallback=none"
+
+Routes are recorded in telemetry and in collect_routes() blocks.
+"""
+
+import os
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from .batch_backend import get_batch_backend
+from .rate_limiter import estimate_request_tokens
+from .resilience import CircuitOpenError
+from .telemetry import estimate_cost, get_ring_buffer, percentile
+
+
+TIERS = ('flagship', 'balanced', 'fast')
+
+MODEL_TIERS = {
+    'flagship': os.getenv("LISTING_MAGIC_MODEL_FLAGSHIP", "gemini-3-pro-preview"),
+    'balanced': os.getenv("LISTING_MAGIC_MODEL_BALANCED", "gemini-2.5-flash"),
+    'fast': os.getenv("LISTING_MAGIC_MODEL_FAST", "gemini-2.5-flash-lite")
+}
+
+# Expected p95 latency per tier until telemetry has enough samples, in seconds
+DEFAULT_TIER_LATENCY = {'flagship': 45.0, 'balanced': 15.0, 'fast': 8.0}
+MIN_LATENCY_SAMPLES = 5
+
+# Artifact -> policy. Budgets and deadlines in seconds / USD; None disables them.
+DEFAULT_POLICIES = {
+    # The photo facts feed every text artifact, so the vision pass gets the best model
+    'photos': {'tier': 'flagship', 'latency_budget': 90, 'cost_budget': None, 'deadline': 75, 'fallback': 'balanced', 'output_tokens': 2000},
+    'listing': {'tier': 'flagship', 'latency_budget': 90, 'cost_budget': None, 'deadline': 75, 'fallback': 'balanced', 'output_tokens': 1500},
+    'script': {'tier': 'flagship', 'latency_budget': 90, 'cost_budget': None, 'deadline': 75, 'fallback': 'balanced', 'output_tokens': 500},
+    'features': {'tier': 'balanced', 'latency_budget': 45, 'cost_budget': None, 'deadline': 40, 'fallback': 'fast', 'output_tokens': 1000},
+    'reso': {'tier': 'balanced', 'latency_budget': 45, 'cost_budget': None, 'deadline': 40, 'fallback': 'fast', 'output_tokens': 800}
+}
+
+_routes = contextvars.ContextVar('listing_magic_routes', default=None)
+_lock = threading.Lock()
+
+
+def _policies_from_env():
+    """Default policies with LISTING_MAGIC_ROUTE_<ARTIFACT> overrides applied"""
+    policies = {artifact: dict(policy) for artifact, policy in DEFAULT_POLICIES.items()}
+    for artifact, policy in policies.items():
+        spec = os.getenv(f"LISTING_MAGIC_ROUTE_{artifact.upper()}")
+        if not spec:
+            continue
+        for item in spec.split(','):
+            name, _, value = item.partition('=')
+            name, value = name.strip(), value.strip()
+            if name not in policy:
+                print(f"Warning: Ignoring unknown routing setting {name!r} for {artifact}")
+            elif name in ('tier', 'fallback'):
+                policy[name] = None if value.lower() in ('', 'none') else value
+            else:
+                policy[name] = None if value.lower() in ('', 'none') else float(value)
+    return policies
+
+
+_policies = _policies_from_env()
+
+
+def configure_routing(artifact, **settings):
+    """
+    Change an artifact's routing policy
+
+    Args:
+        artifact: 'photos', 'listing', 'script', 'features' or 'reso'
+        **settings: Any of tier, latency_budget, cost_budget, deadline,
+            fallback (a tier or None) and output_tokens
+
+    Raises:
+        ValueError: For an unknown artifact, setting or tier
+    """
+    if artifact not in _policies:
+        raise ValueError(f"Unknown artifact: {artifact}")
+    unknown = set(settings) - set(_policies[artifact])
+    if unknown:
+        raise ValueError(f"Unknown routing settings: {', '.join(sorted(unknown))}")
+    for name in ('tier', 'fallback'):
+        if settings.get(name) is not None and settings[name] not in TIERS:
+            raise ValueError(f"Unknown tier: {settings[name]}")
+    with _lock:
+        _policies[artifact].update(settings)
+
+
+def get_routing():
+    """
+    Current routing policies
+
+    Returns:
+        dict: Artifact -> policy dict (copies)
+    """
+    with _lock:
+        return {artifact: dict(policy) for artifact, policy in _policies.items()}
+
+
+def tier_of(model):
+    """
+    Tier a model belongs to
+
+    Returns:
+        str: Tier name, or None for a model outside the tiers
+    """
+    return next((tier for tier, name in MODEL_TIERS.items() if name == model), None)
+
+
+def expected_latency(tier):
+    """
+    Expected p95 latency of a tier's model
+
+    Returns:
+        float: Seconds, from recent successful calls in telemetry, or the
+            tier default while there are fewer than MIN_LATENCY_SAMPLES
+    """
+    model = MODEL_TIERS[tier]
+    samples = [
+        r['total_ms'] for r in get_ring_buffer().records()
+        if r['model'] == model and r['error'] is None and not r['cache_hit'] and not r['coalesced'] and not r['batched']
+    ]
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return DEFAULT_TIER_LATENCY[tier]
+    return percentile(samples, 95) / 1000
+
+
+def plan_route(artifacts, prompt, images):
+    """
+    Choose the tier for a call
+
+    Args:
+        artifacts: Artifact names the call produces
+        prompt: Prompt text (for the cost estimate)
+        images: List of PIL Image objects sent with it
+
+    Returns:
+        dict: 'artifacts', 'tier', 'model', 'deadline' and 'fallback' (a
+            tier below the chosen one, or None)
+    """
+    policy = _merged_policy(artifacts)
+    input_tokens = estimate_request_tokens(prompt, images)
+    start = TIERS.index(policy['tier'])
+
+    chosen = TIERS[-1]
+    for tier in TIERS[start:]:
+        model = MODEL_TIERS[tier]
+        fits_latency = policy['latency_budget'] is None or expected_latency(tier) <= policy['latency_budget']
+        cost = estimate_cost(model, input_tokens, policy['output_tokens'], 0)
+        fits_cost = policy['cost_budget'] is None or cost is None or cost <= policy['cost_budget']
+        if fits_latency and fits_cost:
+            chosen = tier
+            break
+
+    fallback = policy['fallback']
+    if fallback is not None and TIERS.index(fallback) <= TIERS.index(chosen):
+        # Only fall back to something faster than what was chosen
+        fallback = TIERS[TIERS.index(chosen) + 1] if chosen != TIERS[-1] else None
+
+    return {
+        'artifacts': list(artifacts),
+        'tier': chosen,
+        'model': MODEL_TIERS[chosen],
+        'deadline': policy['deadline'],
+        'fallback': fallback
+    }
+
+
+def route_model(artifacts, prompt, images):
+    """
+    Model for a call that can't fall back mid-way (e.g. a stream)
+
+    Args:
+        See plan_route()
+
+    Returns:
+        str: Model name of the planned tier
+    """
+    route = plan_route(artifacts, prompt, images)
+    _note_route(route, route['tier'], fell_back=False)
+    return route['model']
+
+
+async def generate_routed_async(artifacts, prompt, images, make_call):
+    """
+    Run a call on the planned tier, falling back to a faster tier on a missed deadline
+
+    Args:
+        artifacts: Artifact names the call produces
+        prompt: Prompt text (for the cost estimate)
+        images: List of PIL Image objects sent with it
+        make_call: Callable(model) returning the coroutine for one model
+
+    Returns:
+        The call's result
+    """
+    route = plan_route(artifacts, prompt, images)
+    # Batch jobs aren't interactive; their turnaround isn't a missed deadline
+    deadline = route['deadline'] if get_batch_backend() is None else None
+    try:
+        if deadline is None or route['fallback'] is None:
+            result = await make_call(route['model'])
+        else:
+            result = await asyncio.wait_for(make_call(route['model']), deadline)
+    except (asyncio.TimeoutError, CircuitOpenError) as e:
+        if route['fallback'] is None:
+            raise
+        reason = f"missed its {deadline:g}s deadline" if isinstance(e, asyncio.TimeoutError) else "circuit is open"
+        print(f"[router] {'/'.join(artifacts)}: {route['model']} {reason}; falling back to {MODEL_TIERS[route['fallback']]}")
+        result = await make_call(MODEL_TIERS[route['fallback']])
+        _note_route(route, route['fallback'], fell_back=True)
+        return result
+
+    _note_route(route, route['tier'], fell_back=False)
+    return result
+
+
+@contextmanager
+def collect_routes():
+    """
+    Collect the routes of calls made in this context
+
+    Yields:
+        list: Filled with one dict per routed call: artifacts, tier, model
+            and whether it fell back
+    """
+    routes = []
+    token = _routes.set(routes)
+    try:
+        yield routes
+    finally:
+        _routes.reset(token)
+
+
+def _merged_policy(artifacts):
+    """
+    Policy for a call producing several artifacts
+
+    The best tier wins, and its budgets, deadline and fallback come from
+    the policies asking for that tier: a cheaper artifact's tighter
+    deadline would otherwise cancel the better model before it can answer.
+    Expected output is summed across all artifacts.
+    """
+    policies = get_routing()
+    everything = [policies[artifact] for artifact in artifacts]
+    tier = min((p['tier'] for p in everything), key=TIERS.index)
+    selected = [p for p in everything if p['tier'] == tier]
+    fallbacks = [p['fallback'] for p in selected if p['fallback'] is not None]
+
+    def tightest(name):
+        values = [p[name] for p in selected if p[name] is not None]
+        return min(values) if values else None
+
+    return {
+        'tier': tier,
+        'latency_budget': tightest('latency_budget'),
+        'cost_budget': tightest('cost_budget'),
+        'deadline': tightest('deadline'),
+        'fallback': min(fallbacks, key=TIERS.index) if fallbacks else None,
+        'output_tokens': sum(p['output_tokens'] or 0 for p in everything)
+    }
+
+
+def _note_route(route, tier, fell_back):
+    routes = _routes.get()
+    if routes is not None:
+        routes.append({
+            'artifacts': route['artifacts'],
+            'tier': tier,
+            'model': MODEL_TIERS[tier],
+            'fell_back': fell_back
+        })
@@ -0,0 +1,157 @@
+"""
+Orchestrator Service
+
+Runs independent generation steps concurrently on the service event loop,
+with per-task timeouts and cancellation. For example, the features sheet
+and the RESO data only depend on the listing text and the photos, so once
+the listing exists both can be generated at the same time.
+"""
+
+import os
+import asyncio
+
+from .async_runtime import run_sync
+from .gemini_service import generate_features_sheet_async
+from .reso_service import generate_reso_data_async
+
+
+DEFAULT_TASK_TIMEOUT = float(os.getenv("LISTING_MAGIC_TASK_TIMEOUT_SECONDS", "180"))
+
+
+async def run_concurrently(tasks, timeout=DEFAULT_TASK_TIMEOUT, fail_fast=False):
+    """
+    Run named coroutines concurrently with per-task timeouts
+
+    Args:
+        tasks: Dict of name -> coroutine, or name -> (coroutine, timeout) to
+            override the timeout for one task
+        timeout: Default per-task timeout in seconds (None for no limit)
+        fail_fast: If True, cancel the remaining tasks as soon as one fails
+
+    Returns:
+        tuple: (results, errors) dicts keyed by task name. A task that timed
+            out has a TimeoutError in errors; one cancelled by fail_fast has
+            an asyncio.CancelledError.
+
+    Cancelling the caller cancels every task that is still running.
+    """
+    async def guarded(name, coro, task_timeout):
+        try:
+            return await asyncio.wait_for(coro, task_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{name} timed out after {task_timeout}s")
+
+    running = {}
+    for name, spec in tasks.items():
+        coro, task_timeout = spec if isinstance(spec, tuple) else (spec, timeout)
+        running[name] = asyncio.ensure_future(guarded(name, coro, task_timeout))
+
+    names = {task: name for name, task in running.items()}
+    results, errors = {}, {}
+
+    try:
+        pending = set(running.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    errors[names[task]] = asyncio.CancelledError()
+                elif task.exception() is not None:
+                    errors[names[task]] = task.exception()
+                else:
+                    results[names[task]] = task.result()
+
+            if fail_fast and errors and pending:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                for task in pending:
+                    errors[names[task]] = asyncio.CancelledError()
+                pending = set()
+    except asyncio.CancelledError:
+        for task in running.values():
+            task.cancel()
+        await asyncio.gather(*running.values(), return_exceptions=True)
+        raise
+
+    return results, errors
+
+
+async def generate_followups_async(images, addr, city, state, zip_code, price, beds_baths, sqft, property_type, additional_details, listing_description, use_cache=True, media=None, timeout=DEFAULT_TASK_TIMEOUT):
+    """
+    Generate the features sheet and RESO data concurrently
+
+    Both only depend on the photos, property details and the listing text,
+    so they run side by side once the listing exists.
+
+    Args:
+        images: List of PIL Image objects
+        addr: Street address
+        city: City
+        state: State
+        zip_code: ZIP code (may be empty)
+        price: Asking price string
+        beds_baths: Beds/baths string
+        sqft: Square footage string (may be empty)
+        property_type: Type of property (Single Family Home, Condo, etc.)
+        additional_details: Additional property details to highlight
+        listing_description: Previously generated listing text
+        use_cache: If False, bypass the response cache lookup
+        media: Optional MediaRegistry for reusing uploaded photo references
+        timeout: Per-task timeout in seconds
+
+    Returns:
+        tuple: (results, errors) keyed by 'features_sheet' and 'reso_data'
+    """
+    # Handle empty data gracefully
+    addr_display = addr if addr else 'Unknown Address'
+    price_display = price if price else 'Price Upon Request'
+    beds_display = beds_baths if beds_baths else 'Contact for Details'
+
+    return await run_concurrently({
+        'features_sheet': generate_features_sheet_async(
+            images, addr_display, price_display, beds_display, property_type,
+            additional_details, use_cache=use_cache, media=media
+        ),
+        'reso_data': generate_reso_data_async(
+            images, addr, city, state, zip_code, price, beds_baths, sqft,
+            additional_details, listing_description, property_type,
+            use_cache=use_cache, media=media
+        )
+    }, timeout=timeout)
+
+
+def generate_followups(images, addr, city, state, zip_code, price, beds_baths, sqft, property_type, additional_details, listing_description, use_cache=True, media=None, timeout=DEFAULT_TASK_TIMEOUT):
+    """
+    Blocking wrapper around generate_followups_async() (see its arguments)
+
+    Returns:
+        tuple: (results, errors) keyed by 'features_sheet' and 'reso_data'
+    """
+    return run_sync(generate_followups_async(
+        images, addr, city, state, zip_code, price, beds_baths, sqft,
+        property_type, additional_details, listing_description,
+        use_cache=use_cache, media=media, timeout=timeout
+    ))
+
+
+def run_in_parallel(tasks, timeout=DEFAULT_TASK_TIMEOUT, fail_fast=True):
+    """
+    Run blocking callables concurrently in worker threads
+
+    Convenience for CPU/IO-bound steps outside the model services (e.g. TTS
+    and frame preparation for a video).
+
+    Args:
+        tasks: Dict of name -> zero-argument callable
+        timeout: Per-task timeout in seconds (None for no limit)
+        fail_fast: If True, cancel the remaining tasks as soon as one fails
+
+    Returns:
+        tuple: (results, errors) keyed by task name
+    """
+    return run_sync(run_concurrently(
+        {name: asyncio.to_thread(fn) for name, fn in tasks.items()},
+        timeout=timeout,
+        fail_fast=fail_fast
+    ))
@@ -0,0 +1,187 @@
+"""
+Photo Facts Service
+
+Runs one vision-analysis pass over a property's photos and extracts
+structured facts per photo (room type, description, visible features,
+appliances, heating/cooling, style). The facts are cached per photo by image
+content hash, so each photo is analyzed once; a re-upload, a different
+selection of the same photos or a new session reuses them.
+
+The listing, features and RESO generations then send the facts as text
+instead of the photos, which turns each of them into a cheap text-only
+call; a new artifact type costs no extra multimodal round trip.
+
+Set LISTING_MAGIC_PHOTO_FACTS=0 to send the photos with every call
+instead. If the analysis fails, calls fall back to sending the photos.
+"""
+
+import os
+import json
+import asyncio
+
+from .async_runtime import run_sync
+from .model_router import generate_routed_async
+from .prompts import build_photos_suffix, build_photo_facts_block, prefix_version
+from .response_cache import build_cache_key, get_response_cache
+from .schemas import PHOTO_FACTS_SCHEMA
+from .structured_output import generate_structured_async
+
+# Import from our utils
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.image_processor import image_content_hash
+
+
+PHOTO_FACTS_ENABLED = os.getenv("LISTING_MAGIC_PHOTO_FACTS", "1").lower() not in ('0', 'false', 'no', 'off')
+# Photos analyzed per vision call; larger sets are split and analyzed concurrently
+MAX_PHOTOS_PER_CALL = int(os.getenv("LISTING_MAGIC_PHOTO_FACTS_BATCH", "16"))
+
+
+def photo_facts_key(content_hash):
+    """
+    Cache key for one photo's facts
+
+    Args:
+        content_hash: Image content hash from image_content_hash()
+
+    Returns:
+        str: Response cache key (changes with the prompt prefix and schema)
+    """
+    return build_cache_key('photo-facts', prefix_version(), [content_hash], extra=PHOTO_FACTS_SCHEMA.schema)
+
+
+async def analyze_photos_async(images, use_cache=True, media=None):
+    """
+    Get the facts for each photo, analyzing only photos not seen before
+
+    Args:
+        images: List of PIL Image objects
+        use_cache: If False, re-analyze every photo (fresh facts are still stored)
+        media: Optional MediaRegistry for reusing uploaded photo references
+
+    Returns:
+        list: One facts dict per image, in order (None for a photo the
+            model skipped)
+    """
+    cache = get_response_cache()
+    hashes = [image_content_hash(img) for img in images]
+
+    facts = {}
+    if use_cache:
+        for content_hash in dict.fromkeys(hashes):
+            cached = await asyncio.to_thread(cache.get, photo_facts_key(content_hash))
+            if cached is not None:
+                facts[content_hash] = json.loads(cached)
+
+    # Each distinct photo is analyzed once, even if it appears twice
+    pending = {}
+    for img, content_hash in zip(images, hashes):
+        if content_hash not in facts:
+            pending.setdefault(content_hash, img)
+
+    if facts:
+        print(f"[photos] Reusing facts for {len(facts)} of {len(set(hashes))} photos")
+
+    if pending:
+        chunks = [list(pending.items())[i:i + MAX_PHOTOS_PER_CALL] for i in range(0, len(pending), MAX_PHOTOS_PER_CALL)]
+        results = await asyncio.gather(*(_analyze_chunk(chunk, use_cache, media) for chunk in chunks))
+        for chunk_facts in results:
+            for content_hash, fact in chunk_facts.items():
+                facts[content_hash] = fact
+                await asyncio.to_thread(cache.set, photo_facts_key(content_hash), json.dumps(fact), 'photo-facts')
+
+    return [facts.get(content_hash) for content_hash in hashes]
+
+
+def analyze_photos(images, use_cache=True, media=None):
+    """
+    Blocking wrapper around analyze_photos_async() (see its arguments)
+
+    Returns:
+        list: One facts dict (or None) per image, in order
+    """
+    return run_sync(analyze_photos_async(images, use_cache=use_cache, media=media))
+
+
+async def _analyze_chunk(chunk, use_cache, media):
+    """
+    Analyze up to MAX_PHOTOS_PER_CALL photos in one vision call
+
+    Args:
+        chunk: List of (content_hash, image) pairs
+
+    Returns:
+        dict: content_hash -> facts for the photos the model described
+    """
+    images = [img for _, img in chunk]
+    prompt = build_photos_suffix(len(images))
+
+    data = await generate_routed_async(
+        ('photos',),
+        prompt,
+        images,
+        lambda model: generate_structured_async(
+            'photos',
+            prompt,
+            images,
+            PHOTO_FACTS_SCHEMA,
+            use_cache=use_cache,
+            media=media,
+            model=model,
+            shared_prefix=True
+        )
+    )
+
+    facts = {}
+    for entry in data['photos']:
+        index = entry.get('photo')
+        if isinstance(index, int) and 1 <= index <= len(chunk):
+            facts[chunk[index - 1][0]] = {key: value for key, value in entry.items() if key != 'photo'}
+
+    missing = len(chunk) - len(facts)
+    if missing:
+        print(f"Warning: Photo analysis skipped {missing} of {len(chunk)} photos")
+    return facts
+
+
+async def attach_photo_facts_async(prompt, images, selected=None, use_cache=True, media=None):
+    """
+    Turn a multimodal request into a text-only one carrying photo facts
+
+    The whole image set is analyzed (so every artifact shares one pass),
+    and the facts of the selected photos are appended to the prompt.
+
+    Args:
+        prompt: Per-property prompt suffix
+        images: Every photo of the property
+        selected: Photos the request is about, in order (default: images)
+        use_cache: If False, re-analyze the photos
+        media: Optional MediaRegistry for reusing uploaded photo references
+
+    Returns:
+        tuple: (prompt, images) to send: the prompt with a PHOTO FACTS
+            section and no images, or the unchanged prompt and the selected
+            photos when photo facts are disabled or the analysis failed
+    """
+    selected = images if selected is None else selected
+    if not PHOTO_FACTS_ENABLED or not selected:
+        return prompt, selected
+
+    try:
+        facts = await analyze_photos_async(images, use_cache=use_cache, media=media)
+    except Exception as e:
+        print(f"Warning: Photo analysis failed, sending photos instead: {e}")
+        return prompt, selected
+
+    # Selections are usually the same image objects; hash only the ones that aren't
+    by_image = {id(img): fact for img, fact in zip(images, facts)}
+    if any(id(img) not in by_image for img in selected):
+        by_hash = {image_content_hash(img): fact for img, fact in zip(images, facts)}
+        selected_facts = [by_image[id(img)] if id(img) in by_image else by_hash.get(image_content_hash(img)) for img in selected]
+    else:
+        selected_facts = [by_image[id(img)] for img in selected]
+    if all(fact is None for fact in selected_facts):
+        return prompt, selected
+
+    return prompt + "\n" + build_photo_facts_block(selected_facts), []
@@ -0,0 +1,217 @@
+"""
+Prompt Templates
+
+Every prompt is a static, versioned prefix shared by all services
+(persona, Fair Housing rules, formatting, RESO mapping and per-artifact
+instructions) plus a small per-property suffix with the task, the
+property details and, for text tasks, the PHOTO FACTS from the vision
+pass (see photo_facts). The prefix holds no per-property values, so it
+can be cached once with the provider (see context_cache).
+
+Bump PROMPT_PREFIX_VERSION whenever SHARED_PREFIX changes meaning.
+"""
+
+import hashlib
+
+
+PROMPT_PREFIX_VERSION = 'v2'
+
+SHARED_PREFIX = """
+You are a top-tier luxury real estate copywriter and MLS data analyst. Each request names one TASK, gives the property details and includes photos of the property, or PHOTO FACTS: notes taken from those photos, numbered in photo order. Follow the instructions for that task below.
+
+When PHOTO FACTS are given instead of photos, treat them as exactly what the photos show: "the photos" in the instructions below means the photo facts, and "Photo N" means photo N. Never describe anything the facts don't mention.
+
+CRITICAL LEGAL CONSTRAINT: You must strictly adhere to the U.S. Fair Housing Act.
+NEVER mention race, religion, gender, disability, or familial status.
+DO NOT use phrases like "perfect for families", "great for kids", "bachelor pad", "walking distance to church", or "gentlemen's farm".
+
+Focus strictly on the physical features, architectural style, and lifestyle amenities.
+
+FORMATTING RULES (all text outputs):
+- Plain text values, no HTML tags.
+- Clean Markdown with a double newline between every paragraph for proper spacing.
+- Use the provided address and price as given. Never use placeholders like [Address] or [Price].
+
+== TASK: PHOTOS ==
+Analyze each photo provided, in order, and output JSON with a "photos" array holding one entry per photo:
+- photo: the photo's number (starting at 1)
+- room_type: the room or area shown ("Kitchen", "Primary Bedroom", "Front Exterior", "Backyard", etc.)
+- description: one or two factual sentences on what the photo shows (layout, light, condition, views)
+- features: visible features and finishes (flooring type, countertops, built-ins, fireplaces, ceilings, windows, deck, patio, fencing, landscaping, garage, etc.)
+- appliances: appliances visible (dishwasher, refrigerator, range, microwave, washer, dryer, etc.), or an empty array
+- systems: visible heating/cooling equipment (radiators, vents, AC units, mini-splits, etc.), or an empty array
+- style: the architectural or design style shown, or null if unclear
+
+Record only what is visible. These notes stand in for the photos in every later task, so be specific and complete.
+
+== TASK: LISTING ==
+Provide the output in JSON format with two keys: "listing_description" and "video_script".
+
+Listing Description: Write an engaging, professional listing description of the requested word count, tailored for the property type. Use the provided address and price in the first paragraph. Highlight features appropriate for this property type as seen in the photos (e.g., natural light, flooring, appliances, common areas, etc.).
+
+Social Media Video Script: Create a structured script for a 60-second video tour (Instagram Reel/TikTok style) that emphasizes the unique selling points of the property type. Match specific voiceover lines to specific photos provided, and put every spoken voiceover line in double quotes.
+
+== TASK: FEATURES ==
+Create a comprehensive Property Features Sheet (300-500 words) for potential buyers, tailored for the property type, that includes:
+
+1. An engaging, descriptive title for the property (not just the address)
+2. Detailed descriptions of each room and living space appropriate for this property type
+3. Unique features, architectural details, and character elements
+4. Recent updates and improvements
+5. Outdoor spaces, parking, and storage areas (if applicable to this property type)
+6. Use descriptive, marketing-focused language that appeals to buyers interested in this property type
+
+Format the output with:
+- A compelling title on the first line
+- Well-structured paragraphs with double newlines between them
+- Descriptive, engaging language
+- 300-500 words total
+
+Output ONLY the features sheet text, no JSON or additional formatting.
+
+== TASK: RESO ==
+Create MLS-compliant RESO JSON data as a single JSON object.
+
+Map the user-selected property type to PropertySubType:
+- "Single Family Home" → "Single Family Residence"
+- "Condo/Townhouse" → "Condominium" or "Townhouse" (analyze photos to determine)
+- "Multi-Family (2-4 units)" → "Multi-Family"
+- "Apartment" → "Apartment"
+- "Land/Lot" → "Lots and Land"
+- "Commercial" → "Commercial"
+- "Other" → Analyze photos and infer appropriate subtype
+
+Analyze the provided photos to identify:
+1. Architectural style (Colonial, Ranch, Contemporary, Victorian, etc.)
+2. Interior features (flooring type, countertops, built-ins, fireplaces, etc.)
+3. Appliances visible in photos (dishwasher, refrigerator, range, microwave, etc.)
+4. Heating/cooling systems (if visible - radiators, vents, AC units)
+5. Exterior features (deck, patio, fencing, landscaping, garage, etc.)
+6. Year built (estimate from architectural style - use null if very uncertain)
+7. Living area square footage (estimate from room sizes - use null if uncertain)
+
+Fill in these RESO fields:
+- ListPrice: numeric value of the price
+- PropertySubType: from the mapping above
+- BedroomsTotal, BathroomsFull: parsed from the bedrooms/bathrooms
+- BathroomsHalf: parsed from the bedrooms/bathrooms, or 0
+- LivingArea: the square feet if provided, otherwise an estimate, or null
+- YearBuilt: estimate from architectural style, or null
+- Cooling: cooling systems seen ["Central Air", "Window Units", etc.], or empty array
+- Heating: heating systems seen ["Forced Air", "Radiators", "Natural Gas", etc.], or empty array
+- InteriorFeatures: features seen ["Hardwood Floors", "Granite Counters", "Recessed Lighting", "Crown Molding", "Fireplace", etc.]
+- Appliances: appliances visible ["Dishwasher", "Disposal", "Microwave", "Range", "Refrigerator", "Washer", "Dryer", etc.]
+- ExteriorFeatures: exterior features ["Deck", "Patio", "Fenced Yard", "Professional Landscaping", "Garage", etc.]
+- ArchitecturalStyle: identify from photos
+- Photos: one entry per photo provided, in order, with Order (starting at 1), MediaURL "placeholder" and a Description of what the photo shows (e.g., 'Front Exterior', 'Living Room', 'Kitchen')
+
+CRITICAL RULES:
+1. Use null for uncertain fields (do not guess wildly)
+2. Make reasonable inferences from photos
+3. Maintain Fair Housing Act compliance (no discriminatory language)
+
+== TASK: ALL ==
+Output a single JSON object with exactly four keys:
+1. "listing_description": as in TASK: LISTING
+2. "video_script": as in TASK: LISTING
+3. "features_sheet": as in TASK: FEATURES
+4. "reso": an object with the RESO fields of TASK: RESO
+"""
+
+
+def prefix_version():
+    """
+    Version tag of the shared prefix
+
+    Combines PROMPT_PREFIX_VERSION with a digest of the text, so an edit
+    that forgets the version bump still gets its own cache entries.
+
+    Returns:
+        str: e.g. 'v1-3fa2c9d1'
+    """
+    return f"{PROMPT_PREFIX_VERSION}-{hashlib.sha256(SHARED_PREFIX.encode()).hexdigest()[:8]}"
+
+
+def build_photos_suffix(photo_count):
+    """Render the per-request part of the photo analysis prompt"""
+    return f"""
+    TASK: PHOTOS
+
+    Photos provided: {photo_count}
+    """
+
+
+def build_photo_facts_block(facts):
+    """
+    Render photo facts for a text-only prompt
+
+    Args:
+        facts: One facts dict (PHOTO_FACTS_SCHEMA entry) or None per photo,
+            in photo order
+
+    Returns:
+        str: PHOTO FACTS section to append to a per-property suffix
+    """
+    lines = ["PHOTO FACTS:"]
+    for number, fact in enumerate(facts, start=1):
+        if fact is None:
+            lines.append(f"Photo {number}: no details available.")
+            continue
+        lines.append(f"Photo {number} - {fact['room_type']}: {fact['description']}")
+        for label, key in (('Features', 'features'), ('Appliances', 'appliances'), ('Heating/cooling', 'systems')):
+            if fact.get(key):
+                lines.append(f"  {label}: {', '.join(fact[key])}")
+        if fact.get('style'):
+            lines.append(f"  Style: {fact['style']}")
+    return '\n'.join(lines)
+
+
+def build_listing_suffix(addr_display, price_display, beds_display, property_type, additional_details, word_count):
+    """Render the per-property part of the listing/script prompt"""
+    return f"""
+    TASK: LISTING
+
+    Property: {addr_display}, a {property_type} listed for {price_display}. The property has {beds_display}.
+    Listing description length: {word_count} words.
+
+    {f"IMPORTANT DETAILS TO HIGHLIGHT: {additional_details}" if additional_details else ""}
+    """
+
+
+def build_features_suffix(addr_display, price_display, beds_display, property_type, additional_details):
+    """Render the per-property part of the features sheet prompt"""
+    return f"""
+    TASK: FEATURES
+
+    Property Type: {property_type}
+    Property: {addr_display}, listed for {price_display}, {beds_display}
+
+    {f"IMPORTANT DETAILS TO HIGHLIGHT: {additional_details}" if additional_details else ""}
+    """
+
+
+def build_reso_suffix(full_address, price, beds_baths, sqft, property_type, additional_details):
+    """Render the per-property part of the RESO field inference prompt"""
+    return f"""
+    TASK: RESO
+
+    Property: {full_address}
+    Price: {price}
+    Bedrooms/Bathrooms: {beds_baths}
+    Square Feet: {sqft if sqft else 'Not provided'}
+    Property Type (user selected): {property_type}
+    {f"Additional Details: {additional_details}" if additional_details else ""}
+    """
+
+
+def build_combined_suffix(full_address, price_display, beds_display, sqft, property_type, additional_details, word_count):
+    """Render the per-property part of the single-pass (all artifacts) prompt"""
+    return f"""
+    TASK: ALL
+
+    Property: {full_address}, a {property_type} listed for {price_display}. The property has {beds_display}.
+    Square Feet: {sqft if sqft else 'Not provided'}
+    Listing description length: {word_count} words.
+
+    {f"IMPORTANT DETAILS TO HIGHLIGHT: {additional_details}" if additional_details else ""}
+    """
@@ -0,0 +1,314 @@
+"""
+Model Providers Service
+
+The interface between the pipeline and an LLM backend. A provider offers:
+
+    await provider.generate(model, contents, config, api_key)  -> GenerateContentResponse
+    provider.stream(model, contents, config, api_key)          -> iterator of response chunks
+    await provider.count_tokens(model, contents, api_key)      -> int
+    provider.upload(data, mime_type, display_name, api_key)    -> (part, remote_name)
+    provider.delete_upload(remote_name, api_key)
+    provider.batches(api_key) / provider.caches(api_key)       -> batch and context cache APIs
+                                                                  (caches is None without supports_context_cache)
+
+Requests and responses use the google.genai types as the common format.
+
+GeminiProvider sends everything to Gemini through the shared client pool.
+LocalProvider answers in-process without network or API keys:
+deterministic, schema-valid placeholder (or templated) output after a
+configurable latency, so the rest of the pipeline (caching, rate limiting,
+orchestration, rendering) can be load-tested and benchmarked in isolation.
+For HTTP-level stand-ins see fake_server, which answers with the same
+placeholders.
+
+The active provider is chosen with LISTING_MAGIC_PROVIDER ('gemini' or
+'local') or configure_provider().
+"""
+
+import io
+import os
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from google.genai import errors, types
+
+from .client_pool import get_client
+from .key_pool import get_key_pool, current_api_key
+from .fake_server import local_response_text
+
+# Import from our utils
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.image_processor import estimate_image_tokens, IMAGE_TOKENS_PER_TILE
+
+
+DEFAULT_PROVIDER = os.getenv("LISTING_MAGIC_PROVIDER", "gemini")
+DEFAULT_LOCAL_LATENCY = float(os.getenv("LISTING_MAGIC_LOCAL_LATENCY_SECONDS", "0"))
+# Approximate characters per text token, for local token counts
+CHARS_PER_TOKEN = 4
+
+
+class GeminiProvider:
+    """Gemini API through the shared client pool"""
+
+    name = 'gemini'
+    uses_api_keys = True
+    supports_context_cache = True
+
+    async def generate(self, model, contents, config=None, api_key=None):
+        """
+        Generate a response
+
+        Args:
+            model: Model name
+            contents: Prompt text, images and parts
+            config: Optional types.GenerateContentConfig
+            api_key: Key to call with (default: see get_client())
+
+        Returns:
+            types.GenerateContentResponse
+        """
+        return await get_client(api_key).aio.models.generate_content(model=model, contents=contents, config=config)
+
+    def stream(self, model, contents, config=None, api_key=None):
+        """
+        Stream a response (blocking iterator of types.GenerateContentResponse chunks)
+        """
+        return get_client(api_key).models.generate_content_stream(model=model, contents=contents, config=config)
+
+    async def count_tokens(self, model, contents, api_key=None):
+        """
+        Count the input tokens of a request
+
+        Returns:
+            int: Total input tokens
+        """
+        response = await get_client(api_key).aio.models.count_tokens(model=model, contents=contents)
+        return response.total_tokens or 0
+
+    def upload(self, data, mime_type, display_name, api_key=None):
+        """
+        Upload bytes through the Files API
+
+        Returns:
+            tuple: (types.Part referencing the file, remote file name)
+        """
+        uploaded = get_client(api_key).files.upload(
+            file=io.BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=display_name)
+        )
+        part = types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type or mime_type)
+        return part, uploaded.name
+
+    def delete_upload(self, remote_name, api_key=None):
+        """Delete a previously uploaded file"""
+        get_client(api_key).files.delete(name=remote_name)
+
+    def batches(self, api_key=None):
+        """Batch jobs API (create/get/cancel)"""
+        return get_client(api_key).batches
+
+    def caches(self, api_key=None):
+        """Context cache API (create/update/delete)"""
+        return get_client(api_key).caches
+
+    def __repr__(self):
+        return "GeminiProvider()"
+
+
+class LocalProvider:
+    """Deterministic in-process backend: no network, no API keys"""
+
+    name = 'local'
+    uses_api_keys = False
+    supports_context_cache = False
+
+    def __init__(self, latency=DEFAULT_LOCAL_LATENCY, latency_jitter=0.0, error_rate=0.0, responder=None, chunks=4):
+        """
+        Args:
+            latency: Delay before each response, in seconds
+            latency_jitter: Extra delay up to this many seconds, derived from
+                the request so repeated runs take the same time
+            error_rate: Fraction of requests that fail with a 503, also
+                decided per request
+            responder: Optional callable(model, prompt, config) -> response
+                text (default: schema-valid placeholder JSON, or fixed text)
+            chunks: Number of chunks a streamed response is split into
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.responder = responder or _default_local_responder
+        self.chunks = chunks
+        self.calls = 0
+        self._batches = None
+        self._lock = threading.Lock()
+
+    async def generate(self, model, contents, config=None, api_key=None):
+        """See GeminiProvider.generate()"""
+        delay, text = self._answer(model, contents, config)
+        if delay:
+            await asyncio.sleep(delay)
+        return _response(text, self._count(contents), len(text) // CHARS_PER_TOKEN)
+
+    def stream(self, model, contents, config=None, api_key=None):
+        """See GeminiProvider.stream()"""
+        delay, text = self._answer(model, contents, config)
+        if delay:
+            time.sleep(delay)
+        size = max(1, -(-len(text) // self.chunks))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or ['']
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            # Usage is reported on the final chunk, as the API does
+            yield _response(piece, self._count(contents) if last else None, len(text) // CHARS_PER_TOKEN if last else None)
+
+    async def count_tokens(self, model, contents, api_key=None):
+        """See GeminiProvider.count_tokens() (estimated locally)"""
+        return self._count(contents)
+
+    def upload(self, data, mime_type, display_name, api_key=None):
+        """Keep the bytes inline (nothing leaves the process)"""
+        return types.Part.from_bytes(data=data, mime_type=mime_type), None
+
+    def delete_upload(self, remote_name, api_key=None):
+        """Nothing to delete for inline media"""
+        pass
+
+    def batches(self, api_key=None):
+        """Simulated batch jobs (see batch_backend.LocalBatchSimulator)"""
+        from .batch_backend import LocalBatchSimulator
+
+        with self._lock:
+            if self._batches is None:
+                self._batches = LocalBatchSimulator(queue_seconds=self.latency, run_seconds=self.latency)
+            return self._batches
+
+    def caches(self, api_key=None):
+        """No context cache (supports_context_cache is False)"""
+        return None
+
+    def _answer(self, model, contents, config):
+        """Delay and response text for a request; raises injected faults"""
+        with self._lock:
+            self.calls += 1
+        prompt = '\n'.join(item for item in _as_list(contents) if isinstance(item, str))
+        rng = random.Random(hashlib.sha256(f"{model}\n{prompt}".encode()).digest())
+        delay = self.latency + rng.uniform(0, self.latency_jitter)
+        if self.error_rate and rng.random() < self.error_rate:
+            raise errors.ServerError(503, {'error': {'code': 503, 'message': "Injected fault", 'status': 'UNAVAILABLE'}})
+        return delay, self.responder(model, prompt, config)
+
+    def _count(self, contents):
+        """Estimated input tokens: text length plus image tiles"""
+        total = 0
+        for item in _as_list(contents):
+            if isinstance(item, str):
+                total += len(item) // CHARS_PER_TOKEN
+            elif isinstance(item, types.Part):
+                total += len(item.text) // CHARS_PER_TOKEN if item.text else IMAGE_TOKENS_PER_TILE
+            elif hasattr(item, 'size'):
+                total += estimate_image_tokens(item)
+        return total
+
+    def __repr__(self):
+        return f"LocalProvider(latency={self.latency}, latency_jitter={self.latency_jitter}, error_rate={self.error_rate})"
+
+
+def _as_list(contents):
+    return contents if isinstance(contents, list) else [contents]
+
+
+def _default_local_responder(model, prompt, config):
+    schema = config.response_json_schema if config is not None else None
+    return local_response_text(schema, prompt)
+
+
+def _response(text, prompt_tokens, output_tokens):
+    """GenerateContentResponse carrying text (and usage, when given)"""
+    usage = None
+    if prompt_tokens is not None:
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + (output_tokens or 0)
+        )
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(
+            content=types.Content(role='model', parts=[types.Part(text=text)]),
+            finish_reason='STOP'
+        )],
+        usage_metadata=usage
+    )
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Get the active provider
+
+    Returns:
+        GeminiProvider or LocalProvider: Per LISTING_MAGIC_PROVIDER unless
+            replaced with configure_provider()
+    """
+    global _provider
+
+    with _provider_lock:
+        if _provider is None:
+            _provider = LocalProvider() if DEFAULT_PROVIDER == 'local' else GeminiProvider()
+        return _provider
+
+
+def configure_provider(provider):
+    """
+    Replace the active provider
+
+    Args:
+        provider: Provider instance, or 'gemini' / 'local'
+
+    Returns:
+        The active provider
+    """
+    global _provider
+
+    if isinstance(provider, str):
+        provider = LocalProvider() if provider == 'local' else GeminiProvider()
+    with _provider_lock:
+        _provider = provider
+        return _provider
+
+
+def resolve_api_key():
+    """
+    Key that provider resources (uploads, caches, batch jobs) belong to
+
+    Returns:
+        str: The key leased in this context, else the least-loaded key, or
+            None when the provider doesn't use keys
+    """
+    if not get_provider().uses_api_keys:
+        return None
+    return current_api_key() or get_key_pool().choose()
+
+
+@contextmanager
+def lease_api_key():
+    """
+    Lease a key for one call when the active provider uses keys
+
+    Yields:
+        str: The leased key, or None
+    """
+    if not get_provider().uses_api_keys:
+        yield None
+        return
+    with get_key_pool().lease() as api_key:
+        yield api_key
@@ -0,0 +1,486 @@
+"""
+Rate Limiter Service
+
+Global admission control for model calls, shared by every Streamlit session
+and batch worker. Each model has:
+
+- a requests-per-minute and a tokens-per-minute token bucket
+- a cap on concurrent in-flight calls
+- a fair queue: waiting calls are admitted round-robin across sessions, so
+  one session firing many calls can't starve the others
+
+Calls reserve an estimate of their input tokens up front; the estimate is
+corrected with the billed token count (and extra retry/hedge requests) on
+release.
+
+Bucket state lives in a store. MemoryStore covers one process (all sessions
+of one Streamlit server); SqliteStore keeps the buckets and in-flight leases
+in a SQLite file so several processes (Streamlit workers, batch runs) share
+one quota. Queue depth and wait times are exposed through stats().
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+import contextvars
+from pathlib import Path
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from .response_cache import DEFAULT_CACHE_DIR
+from .telemetry import percentile
+
+# Import from our utils
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from utils.image_processor import estimate_image_tokens
+
+
+# Per-model limits; 0 disables a limit
+DEFAULT_RPM = float(os.getenv("LISTING_MAGIC_RATE_LIMIT_RPM", "150"))
+DEFAULT_TPM = float(os.getenv("LISTING_MAGIC_RATE_LIMIT_TPM", "2000000"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LISTING_MAGIC_MODEL_CONCURRENCY", "16"))
+# 'memory' (this process) or 'sqlite' (shared between processes)
+DEFAULT_BACKEND = os.getenv("LISTING_MAGIC_RATE_LIMIT_BACKEND", "memory")
+DEFAULT_DB_PATH = os.getenv("LISTING_MAGIC_RATE_LIMIT_PATH", str(Path(DEFAULT_CACHE_DIR) / "rate_limits.sqlite3"))
+# Leases of crashed processes are reclaimed after this long
+LEASE_SECONDS = 600
+# How often queued calls re-check a store that other processes also release into
+POLL_SECONDS = 0.25
+# Approximate characters per text token
+CHARS_PER_TOKEN = 4
+WAIT_SAMPLES = 1000
+
+_current_session = contextvars.ContextVar('listing_magic_rate_limit_session', default='default')
+
+
+def estimate_request_tokens(prompt, images):
+    """
+    Estimate the input tokens of a request before sending it
+
+    Args:
+        prompt: Prompt text
+        images: List of PIL Image objects
+
+    Returns:
+        int: Estimated input tokens
+    """
+    return len(prompt) // CHARS_PER_TOKEN + sum(estimate_image_tokens(img) for img in images)
+
+
+def _take(bucket, limits, tokens, now):
+    """
+    Refill a bucket and take one request and `tokens` from it if possible
+
+    Args:
+        bucket: Dict with 'requests', 'tokens' and 'updated'; changed in place
+        limits: Dict with 'rpm' and 'tpm'
+        tokens: Tokens requested
+        now: Current time in seconds
+
+    Returns:
+        float: 0 if taken, otherwise seconds until enough has refilled
+    """
+    elapsed = max(0.0, now - bucket['updated'])
+    bucket['updated'] = now
+    wait = 0.0
+    if limits['rpm'] > 0:
+        bucket['requests'] = min(limits['rpm'], bucket['requests'] + elapsed * limits['rpm'] / 60)
+        if bucket['requests'] < 1:
+            wait = max(wait, (1 - bucket['requests']) * 60 / limits['rpm'])
+    if limits['tpm'] > 0:
+        # A request larger than the whole bucket waits for a full bucket
+        tokens = min(tokens, limits['tpm'])
+        bucket['tokens'] = min(limits['tpm'], bucket['tokens'] + elapsed * limits['tpm'] / 60)
+        if bucket['tokens'] < tokens:
+            wait = max(wait, (tokens - bucket['tokens']) * 60 / limits['tpm'])
+    if wait > 0:
+        return wait
+    bucket['requests'] -= 1
+    bucket['tokens'] -= tokens
+    return 0.0
+
+
+class MemoryStore:
+    """Bucket and concurrency state for a single process"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._buckets = {}
+        self._in_flight = {}
+
+    def try_acquire(self, model, tokens, limits, lease_id):
+        """
+        Try to admit one call
+
+        Returns:
+            float: 0 if admitted; otherwise seconds to wait before retrying,
+                or None to wait for a release
+        """
+        if limits['concurrency'] > 0 and self._in_flight.get(model, 0) >= limits['concurrency']:
+            return None
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(model, {'requests': limits['rpm'], 'tokens': limits['tpm'], 'updated': now})
+        wait = _take(bucket, limits, tokens, now)
+        if wait == 0:
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+        return wait
+
+    def release(self, model, lease_id, token_delta=0, extra_requests=0):
+        """
+        End a call, charging any tokens or requests beyond its reservation
+        """
+        self._in_flight[model] = max(0, self._in_flight.get(model, 0) - 1)
+        bucket = self._buckets.get(model)
+        if bucket is not None:
+            bucket['tokens'] -= token_delta
+            bucket['requests'] -= extra_requests
+
+
+class SqliteStore:
+    """Bucket and concurrency state shared between processes through SQLite"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=None, lease_seconds=LEASE_SECONDS):
+        """
+        Args:
+            path: Path to the SQLite file (default LISTING_MAGIC_RATE_LIMIT_PATH)
+            lease_seconds: In-flight leases older than this are dropped
+        """
+        self.path = Path(path or DEFAULT_DB_PATH)
+        self.lease_seconds = lease_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "model TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "id TEXT PRIMARY KEY, model TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        """Short-lived connection holding the write lock for one transaction"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def try_acquire(self, model, tokens, limits, lease_id):
+        """See MemoryStore.try_acquire(); releases from other processes aren't signalled, so this polls"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            if limits['concurrency'] > 0:
+                (in_flight,) = conn.execute("SELECT COUNT(*) FROM leases WHERE model = ?", (model,)).fetchone()
+                if in_flight >= limits['concurrency']:
+                    return POLL_SECONDS
+
+            row = conn.execute("SELECT requests, tokens, updated FROM buckets WHERE model = ?", (model,)).fetchone()
+            bucket = dict(zip(('requests', 'tokens', 'updated'), row)) if row else \
+                {'requests': limits['rpm'], 'tokens': limits['tpm'], 'updated': now}
+            wait = _take(bucket, limits, tokens, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (model, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                (model, bucket['requests'], bucket['tokens'], bucket['updated'])
+            )
+            if wait > 0:
+                return min(wait, POLL_SECONDS)
+            conn.execute("INSERT INTO leases (id, model, expires) VALUES (?, ?, ?)", (lease_id, model, now + self.lease_seconds))
+            return 0.0
+
+    def release(self, model, lease_id, token_delta=0, extra_requests=0):
+        """See MemoryStore.release()"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease_id,))
+            conn.execute(
+                "UPDATE buckets SET tokens = tokens - ?, requests = requests - ? WHERE model = ?",
+                (token_delta, extra_requests, model)
+            )
+
+
+class _Waiter:
+    """A queued call"""
+
+    def __init__(self, model, tokens, session, notify):
+        self.id = uuid.uuid4().hex
+        self.model = model
+        self.tokens = tokens
+        self.session = session
+        self.notify = notify
+        self.enqueued = time.monotonic()
+
+
+class RateLimiter:
+    """Per-model token buckets, concurrency caps and a fair queue across sessions"""
+
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrency=DEFAULT_MAX_CONCURRENCY, store=None):
+        """
+        Args:
+            rpm: Requests per minute per model (0 for no limit)
+            tpm: Input tokens per minute per model (0 for no limit)
+            max_concurrency: Concurrent calls per model (0 for no limit)
+            store: MemoryStore or SqliteStore (default per
+                LISTING_MAGIC_RATE_LIMIT_BACKEND)
+        """
+        self.limits = {'rpm': rpm, 'tpm': tpm, 'concurrency': max_concurrency}
+        if store is None:
+            store = SqliteStore() if DEFAULT_BACKEND == 'sqlite' else MemoryStore()
+        self.store = store
+        self._queues = {}
+        self._in_flight = {}
+        self._granted = {}
+        self._waits = {}
+        self._lock = threading.RLock()
+        self._timer = None
+        self._timer_due = None
+
+    def acquire(self, model, tokens, session=None, timeout=None):
+        """
+        Wait for a slot (blocking)
+
+        Args:
+            model: Model name
+            tokens: Estimated input tokens of the call
+            session: Session to queue under (default: the current session)
+            timeout: Optional seconds to wait before giving up
+
+        Returns:
+            dict: Lease to pass to release()
+
+        Raises:
+            TimeoutError: If no slot was granted within timeout
+        """
+        granted = threading.Event()
+        box = {}
+
+        def notify(lease):
+            box['lease'] = lease
+            granted.set()
+
+        waiter = self._enqueue(model, tokens, session, notify)
+        if not granted.wait(timeout):
+            if not self._cancel(waiter):
+                # Granted just as the wait timed out
+                granted.wait()
+                self.release(box['lease'])
+            raise TimeoutError(f"No {model} slot within {timeout}s")
+        return box['lease']
+
+    async def acquire_async(self, model, tokens, session=None):
+        """
+        Wait for a slot without blocking the event loop (see acquire())
+
+        Returns:
+            dict: Lease to pass to release()
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(lease):
+            if future.cancelled():
+                self.release(lease)
+            else:
+                future.set_result(lease)
+
+        waiter = self._enqueue(model, tokens, session, lambda lease: loop.call_soon_threadsafe(resolve, lease))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+
+    def release(self, lease, used_tokens=None, requests=1):
+        """
+        Return a slot
+
+        Args:
+            lease: Lease from acquire()
+            used_tokens: Billed input tokens, to correct the reservation
+            requests: Requests actually sent (retries and hedges count)
+        """
+        token_delta = used_tokens - lease['tokens'] if used_tokens is not None else 0
+        with self._lock:
+            self._in_flight[lease['model']] = max(0, self._in_flight.get(lease['model'], 0) - 1)
+            self.store.release(lease['model'], lease['id'], token_delta, max(0, requests - 1))
+        self._pump()
+
+    @contextmanager
+    def slot(self, model, tokens, session=None):
+        """
+        Hold a slot for the duration of a blocking call
+
+        Yields:
+            dict: The lease; set lease['used_tokens'] / lease['requests']
+                to correct the reservation on release
+        """
+        lease = self.acquire(model, tokens, session)
+        try:
+            yield lease
+        finally:
+            self.release(lease, lease.get('used_tokens'), lease.get('requests', 1))
+
+    def stats(self):
+        """
+        Queue and wait statistics per model
+
+        Returns:
+            dict: Backend, limits, and per model: queued calls, sessions
+                waiting, calls in flight (this process), calls granted and
+                wait time percentiles in ms
+        """
+        with self._lock:
+            models = {}
+            for model in set(self._queues) | set(self._granted):
+                sessions = self._queues.get(model, {})
+                waits = sorted(self._waits.get(model, []))
+                models[model] = {
+                    'queued': sum(len(queue) for queue in sessions.values()),
+                    'sessions_waiting': len(sessions),
+                    'in_flight': self._in_flight.get(model, 0),
+                    'granted': self._granted.get(model, 0),
+                    'wait_p50_ms': percentile(waits, 50),
+                    'wait_p95_ms': percentile(waits, 95),
+                    'wait_max_ms': waits[-1] if waits else None
+                }
+            return {'backend': self.store.name, 'limits': dict(self.limits), 'models': models}
+
+    def _enqueue(self, model, tokens, session, notify):
+        waiter = _Waiter(model, tokens, session or _current_session.get(), notify)
+        with self._lock:
+            sessions = self._queues.setdefault(model, OrderedDict())
+            sessions.setdefault(waiter.session, deque()).append(waiter)
+        self._pump()
+        return waiter
+
+    def _cancel(self, waiter):
+        """Drop a waiter that hasn't been granted. Returns False if it already was."""
+        with self._lock:
+            queue = self._queues.get(waiter.model, {}).get(waiter.session)
+            if queue is None or waiter not in queue:
+                return False
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.model][waiter.session]
+        self._pump()
+        return True
+
+    def _pump(self):
+        """Admit queued calls, round-robin across sessions, while the store allows"""
+        granted = []
+        next_check = None
+        with self._lock:
+            for model, sessions in self._queues.items():
+                while sessions:
+                    session, queue = next(iter(sessions.items()))
+                    waiter = queue[0]
+                    wait = self.store.try_acquire(model, waiter.tokens, self.limits, waiter.id)
+                    if wait != 0:
+                        if wait is not None:
+                            next_check = wait if next_check is None else min(next_check, wait)
+                        break
+                    queue.popleft()
+                    if queue:
+                        sessions.move_to_end(session)
+                    else:
+                        del sessions[session]
+                    waited_ms = round((time.monotonic() - waiter.enqueued) * 1000)
+                    self._in_flight[model] = self._in_flight.get(model, 0) + 1
+                    self._granted[model] = self._granted.get(model, 0) + 1
+                    self._waits.setdefault(model, deque(maxlen=WAIT_SAMPLES)).append(waited_ms)
+                    granted.append((waiter, {'id': waiter.id, 'model': model, 'tokens': waiter.tokens, 'wait_ms': waited_ms}))
+            if next_check is not None:
+                self._schedule_locked(next_check)
+
+        for waiter, lease in granted:
+            waiter.notify(lease)
+
+    def _schedule_locked(self, delay):
+        """Pump again after delay seconds (keeps the earliest pending check). Caller must hold _lock."""
+        due = time.monotonic() + delay
+        if self._timer is not None and self._timer_due <= due:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self._pump()
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Get the process-wide rate limiter
+
+    Returns:
+        RateLimiter: Shared instance
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+def configure_rate_limiter(rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrency=DEFAULT_MAX_CONCURRENCY, store=None):
+    """
+    Replace the process-wide rate limiter (see RateLimiter for the arguments)
+
+    Returns:
+        RateLimiter: The new instance
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency, store=store)
+        return _rate_limiter
+
+
+def set_session(session_id):
+    """
+    Set the session that model calls in the current context queue under
+
+    Args:
+        session_id: Session ID (e.g. the Streamlit session's ID)
+    """
+    _current_session.set(session_id)
+
+
+@contextmanager
+def session_scope(session_id):
+    """
+    Queue model calls made in this context under a session
+
+    Args:
+        session_id: Session ID
+    """
+    token = _current_session.set(session_id)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
@@ -0,0 +1,178 @@
+"""
+Render Cache Service
+
+Content-addressed on-disk cache of rendered media: encoded slideshow
+segments and voiceover tracks. A segment's key covers everything that
+affects its bytes (the content hash of its still(s), frame count, frame
+rate, resolution, effect parameters and encoder settings), so after a
+photo swap or reorder only segments whose inputs changed are rendered
+again; the rest are remuxed from the cache.
+
+Entries are plain files under <cache dir>/renders, shared by sessions and
+processes. Writes are atomic (temp file + rename) and the directory is
+kept under a size bound by evicting least-recently-used files.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+from .response_cache import DEFAULT_CACHE_DIR
+
+
+DEFAULT_RENDER_CACHE_MAX_BYTES = int(os.getenv("LISTING_MAGIC_RENDER_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Entries used this recently are never evicted (a render may be about to remux them)
+MIN_EVICTION_AGE_SECONDS = 300
+
+
+def build_render_key(kind, **params):
+    """
+    Build a cache key for a rendered artifact
+
+    Args:
+        kind: Artifact kind (e.g. 'hold', 'fade', 'voiceover')
+        **params: JSON-serializable values that determine the output
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    payload = json.dumps({'kind': kind, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RenderCache:
+    """Directory of rendered files keyed by content, with LRU eviction"""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_RENDER_CACHE_MAX_BYTES):
+        """
+        Initialize the cache, creating the directory if needed
+
+        Args:
+            path: Cache directory (default: <cache dir>/renders)
+            max_bytes: Total size bound for stored files
+        """
+        self.path = Path(path) if path else Path(DEFAULT_CACHE_DIR) / "renders"
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key, suffix='.mp4'):
+        """
+        Look up a cached file
+
+        Args:
+            key: Key from build_render_key()
+            suffix: File extension of the entry
+
+        Returns:
+            str or None: Path of the cached file, or None on a miss
+        """
+        entry = self.path / f"{key}{suffix}"
+        try:
+            # The modification time doubles as the LRU timestamp
+            os.utime(entry)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return str(entry)
+
+    def put(self, key, source_path, suffix='.mp4'):
+        """
+        Move a rendered file into the cache
+
+        Args:
+            key: Key from build_render_key()
+            source_path: Rendered file (moved, not copied)
+            suffix: File extension of the entry
+
+        Returns:
+            str: Path of the cached file
+        """
+        entry = self.path / f"{key}{suffix}"
+        staging = self.path / f".{key}.{os.getpid()}.{threading.get_ident()}{suffix}"
+        shutil.move(str(source_path), str(staging))
+        os.replace(staging, entry)
+        self._count('writes')
+        self._evict()
+        return str(entry)
+
+    def _evict(self):
+        """Delete least-recently-used entries until under max_bytes"""
+        entries = []
+        for entry in self.path.iterdir():
+            if entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+
+        cutoff = time.time() - MIN_EVICTION_AGE_SECONDS
+        evicted = 0
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_bytes or mtime > cutoff:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+
+    def clear(self):
+        """Remove all cached files"""
+        for entry in self.path.iterdir():
+            entry.unlink(missing_ok=True)
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Hit/miss counters for this process plus entry count and bytes on disk
+        """
+        sizes = [entry.stat().st_size for entry in self.path.iterdir() if not entry.name.startswith('.')]
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = len(sizes)
+        stats['bytes'] = sum(sizes)
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def __repr__(self):
+        return f"RenderCache(path='{self.path}', max_bytes={self.max_bytes})"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """
+    Get the process-wide render cache, creating it on first use
+
+    Returns:
+        RenderCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+        return _cache
@@ -0,0 +1,107 @@
+"""
+Render Profiles
+
+Named output formats for the video tour. Each profile fixes the aspect
+ratio, resolution, frame rate and a bitrate cap:
+
+    landscape  16:9  1920x1080  24fps  8 Mbit/s   (listing pages, YouTube)
+    reels      9:16  1080x1920  30fps  6 Mbit/s   (Instagram Reels, TikTok, Shorts)
+    square     1:1   1080x1080  30fps  5 Mbit/s   (Instagram/Facebook feed)
+
+Quality still comes from the CRF (LISTING_MAGIC_VIDEO_CRF); the bitrate
+caps peaks so files stay within what the platforms accept.
+
+Several profiles are rendered from one set of decoded photos:
+prepare_profile_frames() scales each photo once per distinct fitted size
+(vertical and square letterboxes of a landscape photo share one) and
+pastes the same scaled buffer into every canvas that uses it.
+
+LISTING_MAGIC_VIDEO_PROFILES sets the profiles rendered by default
+(comma-separated, default: landscape).
+"""
+
+import os
+import numpy as np
+from PIL import Image
+
+
+RENDER_PROFILES = {
+    'landscape': {'aspect': '16:9', 'size': (1920, 1080), 'fps': 24, 'bitrate': '8M'},
+    'reels': {'aspect': '9:16', 'size': (1080, 1920), 'fps': 30, 'bitrate': '6M'},
+    'square': {'aspect': '1:1', 'size': (1080, 1080), 'fps': 30, 'bitrate': '5M'}
+}
+
+
+def parse_profiles(spec):
+    """
+    Resolve profile names
+
+    Args:
+        spec: Comma-separated string or list of profile names
+
+    Returns:
+        list: Profile names in the given order, without duplicates
+
+    Raises:
+        ValueError: For an unknown profile or an empty selection
+    """
+    names = spec.split(',') if isinstance(spec, str) else list(spec)
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    unknown = [name for name in names if name not in RENDER_PROFILES]
+    if unknown:
+        raise ValueError(f"Unknown render profiles: {', '.join(unknown)} (choose from {', '.join(RENDER_PROFILES)})")
+    if not names:
+        raise ValueError("No render profiles selected")
+    return names
+
+
+DEFAULT_VIDEO_PROFILES = parse_profiles(os.getenv("LISTING_MAGIC_VIDEO_PROFILES", "landscape"))
+
+
+def prepare_profile_frames(images, profiles):
+    """
+    Letterbox photos for several profiles, resizing each photo once per fitted size
+
+    Args:
+        images: List of PIL Image objects (already EXIF-transposed)
+        profiles: Profile names
+
+    Returns:
+        dict: Profile name -> list of RGB uint8 arrays, one per image.
+            Profiles with the same resolution share the same arrays.
+    """
+    sizes = list(dict.fromkeys(RENDER_PROFILES[name]['size'] for name in profiles))
+    by_size = {size: [] for size in sizes}
+
+    for img in images:
+        rgb = img.convert('RGB')
+        scaled = {}
+        for size in sizes:
+            fitted = _fitted_size(rgb.size, size)
+            if fitted not in scaled:
+                scaled[fitted] = np.asarray(rgb.resize(fitted, Image.Resampling.LANCZOS))
+            by_size[size].append(_letterbox(scaled[fitted], size))
+
+    return {name: by_size[RENDER_PROFILES[name]['size']] for name in profiles}
+
+
+def _fitted_size(source_size, target_size):
+    """Largest size with the source's aspect ratio that fits the target (as resize_with_padding)"""
+    width, height = source_size
+    target_width, target_height = target_size
+    if width / height > target_width / target_height:
+        return target_width, int(target_width / (width / height))
+    return int(target_height * (width / height)), target_height
+
+
+def _letterbox(scaled, size):
+    """Center a scaled photo on a black canvas of the given (width, height)"""
+    target_width, target_height = size
+    height, width = scaled.shape[:2]
+    if (width, height) == (target_width, target_height):
+        return scaled
+    canvas = np.zeros((target_height, target_width, 3), dtype=np.uint8)
+    x_offset = (target_width - width) // 2
+    y_offset = (target_height - height) // 2
+    canvas[y_offset:y_offset + height, x_offset:x_offset + width] = scaled
+    return canvas
@@ -0,0 +1,375 @@
+"""
+Resilience Service
+
+Retry, timeout, hedging and circuit-breaker policy wrapped around every
+model call:
+
+- each attempt gets its own deadline
+- retryable failures (timeouts, connection errors, 408/429/5xx) are retried
+  with exponential backoff and full jitter
+- optionally, a duplicate (hedged) request is sent when the first one is
+  slower than a fixed delay or the observed p95 latency; whichever finishes
+  first wins and the other is cancelled
+- a circuit breaker per model fails fast while the upstream is degraded,
+  then lets a single trial request through after a cool-down
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+
+import httpx
+from google.genai import errors
+
+from .telemetry import current_record
+
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+_settings = {
+    'attempt_timeout': float(os.getenv("LISTING_MAGIC_ATTEMPT_TIMEOUT_SECONDS", "120")),
+    'max_attempts': int(os.getenv("LISTING_MAGIC_MAX_ATTEMPTS", "3")),
+    'backoff_base': float(os.getenv("LISTING_MAGIC_BACKOFF_BASE_SECONDS", "1")),
+    'backoff_max': float(os.getenv("LISTING_MAGIC_BACKOFF_MAX_SECONDS", "20")),
+    # 'off', 'p95' (hedge after the observed p95 latency) or a delay in seconds
+    'hedge': os.getenv("LISTING_MAGIC_HEDGE", "off"),
+    'hedge_min_samples': 20,
+    'breaker_threshold': int(os.getenv("LISTING_MAGIC_BREAKER_THRESHOLD", "5")),
+    'breaker_reset': float(os.getenv("LISTING_MAGIC_BREAKER_RESET_SECONDS", "30"))
+}
+
+_lock = threading.Lock()
+_breakers = {}
+_latencies = {}
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream is marked degraded; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)"""
+
+    def __init__(self, name, threshold, reset_seconds):
+        """
+        Args:
+            name: Breaker name (the model name)
+            threshold: Consecutive retryable failures that open the circuit
+            reset_seconds: Seconds to stay open before allowing a trial call
+        """
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            return self._state_locked()
+
+    def before_call(self):
+        """
+        Check whether a call may proceed
+
+        Returns:
+            bool: True if the call is the half-open trial
+
+        Raises:
+            CircuitOpenError: While open, or while a half-open trial is running
+        """
+        with self._lock:
+            state = self._state_locked()
+            if state == 'closed':
+                return False
+            if state == 'half-open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            retry_in = max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+            raise CircuitOpenError(
+                f"Model {self.name} is temporarily unavailable (circuit open, retry in {retry_in:.0f}s)"
+            )
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def record_abandoned(self, trial):
+        """Release the half-open trial of a call that was cancelled before it finished"""
+        if not trial:
+            return
+        with self._lock:
+            self.trial_in_flight = False
+
+    def _state_locked(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def __repr__(self):
+        return f"CircuitBreaker(name='{self.name}', state='{self.state}', failures={self.failures})"
+
+
+def configure_resilience(**settings):
+    """
+    Override resilience settings
+
+    Args:
+        **settings: Any of attempt_timeout, max_attempts, backoff_base,
+            backoff_max, hedge, hedge_min_samples, breaker_threshold and
+            breaker_reset. Existing breakers are reset.
+    """
+    unknown = set(settings) - set(_settings)
+    if unknown:
+        raise ValueError(f"Unknown resilience settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _settings.update(settings)
+        _breakers.clear()
+
+
+def get_circuit_breaker(model):
+    """
+    Get the circuit breaker for a model
+
+    Args:
+        model: Model name
+
+    Returns:
+        CircuitBreaker: Shared breaker for the model
+    """
+    with _lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model, _settings['breaker_threshold'], _settings['breaker_reset'])
+        return _breakers[model]
+
+
+def list_circuit_breakers():
+    """
+    Get every circuit breaker created so far
+
+    Returns:
+        list: CircuitBreaker objects
+    """
+    with _lock:
+        return list(_breakers.values())
+
+
+def is_retryable(error):
+    """
+    Decide whether a failed model call is worth retrying
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        bool: True for timeouts, connection errors and 408/429/5xx responses
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, httpx.TransportError, ConnectionError))
+
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Number of the attempt that just failed (1-based)
+
+    Returns:
+        float: Seconds to wait before the next attempt
+    """
+    ceiling = min(_settings['backoff_max'], _settings['backoff_base'] * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+def record_latency(service, seconds):
+    """Record a successful call's latency for p95-based hedging"""
+    with _lock:
+        _latencies.setdefault(service, deque(maxlen=200)).append(seconds)
+
+
+def latency_percentile(service, percentile=95):
+    """
+    Observed latency percentile for a service
+
+    Args:
+        service: Service name
+        percentile: Percentile in [0, 100]
+
+    Returns:
+        float: Latency in seconds, or None without enough samples
+    """
+    with _lock:
+        samples = sorted(_latencies.get(service, ()))
+    if len(samples) < _settings['hedge_min_samples']:
+        return None
+    index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def hedge_delay(service):
+    """Seconds to wait before sending a hedged duplicate, or None for no hedging"""
+    hedge = str(_settings['hedge']).lower()
+    if hedge in ('', 'off', 'none', '0'):
+        return None
+    if hedge == 'p95':
+        return latency_percentile(service, 95)
+    return float(hedge)
+
+
+async def call_with_resilience(service, model, make_call):
+    """
+    Run a model call under the retry, deadline, hedging and breaker policy
+
+    Args:
+        service: Name of the calling service (for logging and latency stats)
+        model: Model name (selects the circuit breaker)
+        make_call: Zero-argument callable returning a new coroutine for one
+            attempt (called again for every retry or hedge)
+
+    Returns:
+        The call's result
+
+    Raises:
+        CircuitOpenError: If the circuit for the model is open
+        Exception: The last error once attempts are exhausted, or the first
+            non-retryable error
+    """
+    breaker = get_circuit_breaker(model)
+    max_attempts = max(1, _settings['max_attempts'])
+    record = current_record()
+
+    for attempt in range(1, max_attempts + 1):
+        trial = breaker.before_call()
+        if record is not None:
+            record['attempts'] = attempt
+        started = time.monotonic()
+        try:
+            result = await _hedged_attempt(service, make_call)
+        except Exception as e:
+            if not is_retryable(e):
+                # The upstream answered; a bad request says nothing about its health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"[{service}] Attempt {attempt} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Cancelled (deadline, rerun): no verdict on the model, but free the trial
+            breaker.record_abandoned(trial)
+            raise
+
+        breaker.record_success()
+        record_latency(service, time.monotonic() - started)
+        return result
+
+
+def retry_stream(service, model, open_stream):
+    """
+    Iterate a streaming model call under the retry and breaker policy
+
+    A failure is retried only if nothing has been yielded yet; once text has
+    reached the caller, a failure is raised as is.
+
+    Args:
+        service: Name of the calling service (for logging)
+        model: Model name (selects the circuit breaker)
+        open_stream: Zero-argument callable returning a new chunk iterator
+
+    Yields:
+        Chunks from the stream
+    """
+    breaker = get_circuit_breaker(model)
+    max_attempts = max(1, _settings['max_attempts'])
+    record = current_record()
+
+    for attempt in range(1, max_attempts + 1):
+        trial = breaker.before_call()
+        if record is not None:
+            record['attempts'] = attempt
+        started = time.monotonic()
+        yielded = False
+        try:
+            for chunk in open_stream():
+                yielded = True
+                yield chunk
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if yielded or attempt == max_attempts:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"[{service}] Stream attempt {attempt} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # Closed early (GeneratorExit) or interrupted: free the trial
+            breaker.record_abandoned(trial)
+            raise
+
+        breaker.record_success()
+        record_latency(service, time.monotonic() - started)
+        return
+
+
+async def _hedged_attempt(service, make_call):
+    """One attempt with a deadline, plus a hedged duplicate if it runs slow"""
+    timeout = _settings['attempt_timeout']
+    delay = hedge_delay(service)
+
+    async def attempt():
+        try:
+            return await asyncio.wait_for(make_call(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{service} attempt timed out after {timeout}s")
+
+    primary = asyncio.ensure_future(attempt())
+    if delay is None or (timeout and delay >= timeout):
+        return await primary
+
+    running = {primary}
+    try:
+        done, _ = await asyncio.wait(running, timeout=delay)
+        if not done:
+            print(f"[{service}] No response after {delay:.1f}s; sending hedged request")
+            record = current_record()
+            if record is not None:
+                record['hedged'] = True
+            running.add(asyncio.ensure_future(attempt()))
+
+        # First successful attempt wins; fail only when every attempt failed
+        error = None
+        while running:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in running:
+            task.cancel()
@@ -5,11 +5,15 @@ Handles generation of RESO-compliant MLS data including listing IDs
 and complete property data structures.
 """
 
-import os
-import json
 import hashlib
 from datetime import datetime
-from google import genai
+
+from .async_runtime import run_sync
+from .model_router import generate_routed_async
+from .photo_facts import attach_photo_facts_async
+from .prompts import build_reso_suffix
+from .schemas import RESO_FIELDS_SCHEMA
+from .structured_output import generate_structured_async
 
 # Import from our utils
 import sys
@@ -18,6 +22,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from utils.address_parser import parse_street_address
 
 
+# Field order of a RESO record
+RESO_FIELD_ORDER = [
+    'ListingKey', 'ListingId', 'StandardStatus', 'ListPrice', 'PropertyType',
+    'PropertySubType', 'UnparsedAddress', 'StreetNumber', 'StreetName',
+    'StreetSuffix', 'City', 'StateOrProvince', 'PostalCode', 'Country',
+    'BedroomsTotal', 'BathroomsFull', 'BathroomsHalf', 'LivingArea',
+    'LivingAreaUnits', 'YearBuilt', 'Cooling', 'Heating', 'InteriorFeatures',
+    'Appliances', 'ExteriorFeatures', 'ArchitecturalStyle', 'Photos',
+    'PublicRemarks'
+]
+
+
 def generate_listing_ids(address):
     """
     Generate consistent, traceable listing IDs
@@ -38,130 +54,106 @@ def generate_listing_ids(address):
     return listing_key, listing_id
 
 
-def generate_reso_data(images, addr, city, state, zip_code, price, beds_baths, sqft, additional_details, listing_description, property_type):
+def generate_reso_data(images, addr, city, state, zip_code, price, beds_baths, sqft, additional_details, listing_description, property_type, use_cache=True, media=None):
     """Generate RESO-compliant JSON data using Gemini photo analysis"""
+    return run_sync(generate_reso_data_async(
+        images, addr, city, state, zip_code, price, beds_baths, sqft,
+        additional_details, listing_description, property_type,
+        use_cache=use_cache, media=media
+    ))
 
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment")
 
-    client = genai.Client(api_key=api_key)
-
-    # Generate consistent, traceable IDs
-    listing_key, listing_id = generate_listing_ids(addr)
+async def generate_reso_data_async(images, addr, city, state, zip_code, price, beds_baths, sqft, additional_details, listing_description, property_type, use_cache=True, media=None):
+    """
+    Generate RESO-compliant JSON data using Gemini photo analysis (async)
 
-    # Parse street address components
-    address_parts = parse_street_address(addr)
+    The model only infers the fields that need the photos (via their photo
+    facts) or free-text parsing, constrained by RESO_FIELDS_SCHEMA. IDs, address components and
+    fixed values are filled in locally by build_reso_record().
+    """
 
     # Construct full address
     full_address = f"{addr}, {city}, {state}"
     if zip_code and zip_code.strip():
         full_address += f" {zip_code}"
 
-    # Construct comprehensive RESO generation prompt
-    prompt = f"""
-    You are a real estate data analyst creating MLS-compliant RESO JSON data.
-
-    Property: {full_address}
-    Price: {price}
-    Bedrooms/Bathrooms: {beds_baths}
-    Square Feet: {sqft if sqft else 'Not provided'}
-    {f"Additional Details: {additional_details}" if additional_details else ""}
-
-    IMPORTANT - Property Type: The user selected property type: {property_type}
-    Use this for the PropertySubType field in the RESO JSON. Map it appropriately:
-    - "Single Family Home" → "Single Family Residence"
-    - "Condo/Townhouse" → "Condominium" or "Townhouse" (analyze photos to determine)
-    - "Multi-Family (2-4 units)" → "Multi-Family"
-    - "Apartment" → "Apartment"
-    - "Land/Lot" → "Lots and Land"
-    - "Commercial" → "Commercial"
-    - "Other" → Analyze photos and infer appropriate subtype
-
-    Analyze the provided photos to identify:
-    1. Architectural style (Colonial, Ranch, Contemporary, Victorian, etc.)
-    2. Interior features (flooring type, countertops, built-ins, fireplaces, etc.)
-    3. Appliances visible in photos (dishwasher, refrigerator, range, microwave, etc.)
-    4. Heating/cooling systems (if visible - radiators, vents, AC units)
-    5. Exterior features (deck, patio, fencing, landscaping, garage, etc.)
-    6. Year built (estimate from architectural style - use null if very uncertain)
-    7. Living area square footage (estimate from room sizes - use null if uncertain)
-
-    Generate a complete RESO-compliant JSON object with these exact fields:
-
-    CRITICAL: Use these EXACT values for address fields (do not parse differently):
-
-    {{
-      "ListingKey": "{listing_key}",
-      "ListingId": "{listing_id}",
-      "StandardStatus": "Active",
-      "ListPrice": Extract numeric value from {price},
-      "PropertyType": "Residential",
-      "PropertySubType": Use the mapping from user-selected property type "{property_type}" as instructed above,
-      "UnparsedAddress": "{full_address}",
-      "StreetNumber": "{address_parts['street_number']}",
-      "StreetName": "{address_parts['street_name']}",
-      "StreetSuffix": {f'"{address_parts["street_suffix"]}"' if address_parts['street_suffix'] else 'null'},
-      "City": "{city}",
-      "StateOrProvince": "{state}",
-      "PostalCode": {f'"{zip_code}"' if zip_code else 'null'},
-      "Country": "USA",
-      "BedroomsTotal": Parse from {beds_baths},
-      "BathroomsFull": Parse full baths from {beds_baths},
-      "BathroomsHalf": Parse half baths from {beds_baths} or use 0,
-      "LivingArea": {sqft if sqft else 'null'},
-      "LivingAreaUnits": "Square Feet",
-      "YearBuilt": Estimate from architectural style or use null,
-      "Cooling": Array of cooling systems seen in photos ["Central Air", "Window Units", etc.] or empty array,
-      "Heating": Array of heating systems seen ["Forced Air", "Radiators", "Natural Gas", etc.] or empty array,
-      "InteriorFeatures": Array of features seen ["Hardwood Floors", "Granite Counters", "Recessed Lighting", "Crown Molding", "Fireplace", etc.],
-      "Appliances": Array of appliances visible ["Dishwasher", "Disposal", "Microwave", "Range", "Refrigerator", "Washer", "Dryer", etc.],
-      "ExteriorFeatures": Array of exterior features ["Deck", "Patio", "Fenced Yard", "Professional Landscaping", "Garage", etc.],
-      "ArchitecturalStyle": Identify from photos,
-      "Photos": [
-        {{
-          "Order": 1,
-          "MediaURL": "placeholder",
-          "Description": "Describe what this photo shows (e.g., 'Front Exterior', 'Living Room', 'Kitchen')"
-        }},
-        ... one entry for each photo provided
-      ],
-      "PublicRemarks": "{listing_description[:500]}"
-    }}
-
-    CRITICAL RULES:
-    1. Output ONLY valid JSON, no markdown code blocks, no explanations
-    2. Use null for uncertain fields (do not guess wildly)
-    3. Make reasonable inferences from photos
-    4. Maintain Fair Housing Act compliance (no discriminatory language)
-    5. Use standard RESO field names exactly as shown
-    6. Ensure all arrays are properly formatted
-    7. Parse address components carefully
-
-    Output the complete JSON object now:
+    # Per-property suffix; the field mapping and rules come from the context cache
+    prompt = build_reso_suffix(full_address, price, beds_baths, sqft, property_type, additional_details)
+    # Every photo gets a Photos entry, so all of their facts are attached
+    prompt, call_images = await attach_photo_facts_async(prompt, images, use_cache=use_cache, media=media)
+
+    # Infer RESO fields (served from the response cache when possible) on the RESO tier
+    inferred = await generate_routed_async(
+        ('reso',),
+        prompt,
+        call_images,
+        lambda model: generate_structured_async(
+            'reso',
+            prompt,
+            call_images,
+            RESO_FIELDS_SCHEMA,
+            use_cache=use_cache,
+            media=media,
+            model=model,
+            shared_prefix=True
+        )
+    )
+
+    return build_reso_record(inferred, addr, city, state, zip_code, listing_description)
+
+
+def build_reso_record(inferred, addr, city, state, zip_code, listing_description):
     """
+    Merge model-inferred RESO fields with the fields known locally
 
-    # Prepare content for Gemini
-    contents = [prompt] + images
+    Address components, IDs and fixed values are computed here rather than
+    trusted to the model, so they're always exact.
 
-    # Generate RESO data
-    response = client.models.generate_content(
-        model='gemini-3-pro-preview',
-        contents=contents
-    )
+    Args:
+        inferred: Dict of fields inferred by the model (price, rooms, features, photos...)
+        addr: Street address
+        city: City
+        state: State
+        zip_code: ZIP code (may be empty)
+        listing_description: Listing text used for PublicRemarks
+
+    Returns:
+        dict: Complete RESO record in standard field order
+    """
+    listing_key, listing_id = generate_listing_ids(addr)
+    address_parts = parse_street_address(addr)
+
+    full_address = f"{addr}, {city}, {state}"
+    if zip_code and zip_code.strip():
+        full_address += f" {zip_code}"
 
-    # Parse JSON response
-    response_text = response.text.strip()
-
-    # Remove markdown code blocks if present
-    if "```json" in response_text:
-        response_text = response_text.split("```json")[1].split("```")[0]
-    elif "```" in response_text:
-        response_text = response_text.split("```")[1].split("```")[0]
-
-    # Parse and validate JSON
-    try:
-        reso_data = json.loads(response_text)
-        return reso_data
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse RESO JSON: {e}\n\nResponse: {response_text}")
+    known = {
+        'ListingKey': listing_key,
+        'ListingId': listing_id,
+        'StandardStatus': 'Active',
+        'PropertyType': 'Residential',
+        'UnparsedAddress': full_address,
+        'StreetNumber': address_parts['street_number'],
+        'StreetName': address_parts['street_name'],
+        'StreetSuffix': address_parts['street_suffix'],
+        'City': city,
+        'StateOrProvince': state,
+        'PostalCode': zip_code if zip_code else None,
+        'Country': 'USA',
+        'LivingAreaUnits': 'Square Feet',
+        'PublicRemarks': listing_description[:500]
+    }
+
+    record = {}
+    for field in RESO_FIELD_ORDER:
+        if field in known:
+            record[field] = known[field]
+        else:
+            record[field] = inferred.get(field)
+
+    # Keep any extra fields the model returned
+    for field, value in inferred.items():
+        if field not in record:
+            record[field] = value
+
+    return record
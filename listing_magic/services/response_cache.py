@@ -0,0 +1,212 @@
+"""
+Response Cache Service
+
+Persistent, content-addressed cache for model responses. Entries are keyed
+by the model name, a hash of the rendered prompt and hashes of the image
+content, so identical requests are served from disk across sessions,
+restarts and different agents uploading the same listing.
+
+Storage is a single SQLite file with size-bounded LRU eviction and a TTL.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+
+DEFAULT_CACHE_DIR = os.getenv("LISTING_MAGIC_CACHE_DIR", "cache")
+DEFAULT_MAX_BYTES = int(os.getenv("LISTING_MAGIC_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.getenv("LISTING_MAGIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+def build_cache_key(model, prompt, image_hashes, extra=None):
+    """
+    Build a content-addressed cache key for a model request
+
+    Args:
+        model: Model name (e.g. 'gemini-3-pro-preview')
+        prompt: Fully rendered prompt text
+        image_hashes: List of image content hashes, in request order
+        extra: Optional JSON-serializable value that also affects the output
+            (e.g. generation config)
+
+    Returns:
+        str: SHA-256 hex digest identifying the request
+    """
+    payload = {
+        'model': model,
+        'prompt': hashlib.sha256(prompt.encode()).hexdigest(),
+        'images': list(image_hashes),
+        'extra': extra
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU + TTL cache of model response text"""
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        """
+        Initialize the cache, creating the database if needed
+
+        Args:
+            path: Path to the SQLite file (default: <cache dir>/responses.sqlite3)
+            max_bytes: Total size bound for stored responses
+            ttl_seconds: Entries older than this are treated as misses
+        """
+        self.path = Path(path) if path else Path(DEFAULT_CACHE_DIR) / "responses.sqlite3"
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'writes': 0}
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection (one per operation keeps this thread/process safe)"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Create the cache directory and table if they don't exist"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key: Cache key from build_cache_key()
+
+        Returns:
+            str or None: Cached response text, or None on miss/expiry
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._count('misses')
+                return None
+
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count('expired')
+                self._count('misses')
+                return None
+
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+        self._count('hits')
+        return value
+
+    def set(self, key, value, model=None):
+        """
+        Store a response and evict least-recently-used entries over the size bound
+
+        Args:
+            key: Cache key from build_cache_key()
+            value: Response text to store
+            model: Optional model name (for inspection only)
+        """
+        now = time.time()
+        size = len(value.encode())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now)
+            )
+            self._evict(conn)
+        self._count('writes')
+
+    def _evict(self, conn):
+        """Drop expired entries, then LRU entries until under max_bytes"""
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._count('evictions', evicted)
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Hit/miss counters for this process plus entry count and bytes on disk
+        """
+        with self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['entries'] = entries
+        stats['bytes'] = total
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def __repr__(self):
+        return f"ResponseCache(path='{self.path}', max_bytes={self.max_bytes}, ttl_seconds={self.ttl_seconds})"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Get the process-wide response cache, creating it on first use
+
+    Returns:
+        ResponseCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,294 @@
+"""
+Response Schemas
+
+Typed JSON schemas for the structured model outputs: photo facts, the
+listing/script pair, RESO fields and the combined generation. Each is sent
+as the response schema and compiled into a local validator at import.
+"""
+
+import re
+
+
+# JSON schema type name -> Python types accepted for it
+_TYPE_CHECKS = {
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'array': lambda v: isinstance(v, list),
+    'object': lambda v: isinstance(v, dict),
+    'null': lambda v: v is None
+}
+
+
+def _compile(schema, path):
+    """
+    Compile a (subset of) JSON schema into a checker function
+
+    Supports type (single or list), properties, required and items, which is
+    everything the response schemas use.
+
+    Returns:
+        callable: check(value, errors) appending (path, message) tuples
+    """
+    types = schema.get('type')
+    types = [types] if isinstance(types, str) else (types or [])
+    type_checks = [_TYPE_CHECKS[t] for t in types]
+
+    property_checks = {
+        name: _compile(sub, f"{path}.{name}" if path else name)
+        for name, sub in schema.get('properties', {}).items()
+    }
+    required = schema.get('required', [])
+    item_check = _compile(schema['items'], f"{path}[]") if 'items' in schema else None
+    enum = schema.get('enum')
+
+    def check(value, errors):
+        if type_checks and not any(type_check(value) for type_check in type_checks):
+            errors.append((path, f"expected {' or '.join(types)}, got {type(value).__name__}"))
+            return
+        if enum is not None and value not in enum:
+            errors.append((path, f"expected one of {enum}"))
+        if isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    errors.append((f"{path}.{name}" if path else name, "missing"))
+            for name, property_check in property_checks.items():
+                if name in value:
+                    property_check(value[name], errors)
+        elif isinstance(value, list) and item_check is not None:
+            for item in value:
+                item_check(item, errors)
+
+    return check
+
+
+class ResponseSchema:
+    """A JSON response schema with a local validator compiled up front"""
+
+    def __init__(self, name, schema):
+        """
+        Compile the schema
+
+        Args:
+            name: Short schema name (for logging)
+            schema: JSON schema dict (object at the top level)
+        """
+        self.name = name
+        self.schema = schema
+        self._check = _compile(schema, '')
+
+    @property
+    def fields(self):
+        """Top-level property names, in schema order"""
+        return list(self.schema.get('properties', {}))
+
+    def validate(self, data):
+        """
+        Validate a decoded response
+
+        Args:
+            data: Decoded JSON value
+
+        Returns:
+            list: (path, message) tuples; empty when valid
+        """
+        errors = []
+        self._check(data, errors)
+        return errors
+
+    def invalid_fields(self, data):
+        """
+        Get the top-level fields that are missing or invalid
+
+        Args:
+            data: Decoded JSON object
+
+        Returns:
+            list: Top-level field names, in schema order
+        """
+        if not isinstance(data, dict):
+            return self.fields
+        bad = {re.split(r'[.\[]', path, 1)[0] for path, _ in self.validate(data)}
+        return [name for name in self.fields if name in bad]
+
+    def coerce(self, data):
+        """
+        Repair common type slips, in place
+
+        Numeric strings like "$500,000" become numbers, scalar values become
+        one-item arrays and numbers become strings where the schema says so,
+        at any depth (nested objects and array items included).
+
+        Args:
+            data: Decoded JSON object
+
+        Returns:
+            dict: The same object
+        """
+        if isinstance(data, dict):
+            _coerce_nested(data, self.schema)
+        return data
+
+    def subset(self, fields):
+        """
+        Build a schema restricted to some top-level fields
+
+        Used to re-request only the fields that were missing or invalid.
+
+        Args:
+            fields: Field names to keep
+
+        Returns:
+            ResponseSchema: Compiled sub-schema
+        """
+        properties = self.schema.get('properties', {})
+        return ResponseSchema(f"{self.name}-partial", {
+            'type': 'object',
+            'properties': {name: properties[name] for name in fields if name in properties},
+            'required': [name for name in self.schema.get('required', []) if name in fields]
+        })
+
+    def __repr__(self):
+        return f"ResponseSchema(name='{self.name}', fields={len(self.fields)})"
+
+
+def _coerce_value(value, schema):
+    """Best-effort conversion of one value to the schema's type, recursing into objects and arrays"""
+    value = _coerce_type(value, schema)
+    _coerce_nested(value, schema)
+    return value
+
+
+def _coerce_nested(value, schema):
+    """Coerce the properties of an object or the items of an array, in place"""
+    if isinstance(value, dict):
+        for name, sub in schema.get('properties', {}).items():
+            if name in value:
+                value[name] = _coerce_value(value[name], sub)
+    elif isinstance(value, list) and 'items' in schema:
+        value[:] = [_coerce_value(item, schema['items']) for item in value]
+
+
+def _coerce_type(value, schema):
+    """Convert a value whose own type doesn't match the schema"""
+    types = schema.get('type')
+    types = [types] if isinstance(types, str) else (types or [])
+
+    if any(_TYPE_CHECKS[t](value) for t in types):
+        return value
+
+    if isinstance(value, str) and ('number' in types or 'integer' in types):
+        cleaned = re.sub(r'[^\d.\-]', '', value)
+        try:
+            number = float(cleaned)
+            return int(number) if 'integer' in types or number.is_integer() else number
+        except ValueError:
+            return None if 'null' in types else value
+
+    if 'integer' in types and isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    if 'array' in types and value is not None and not isinstance(value, list):
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(',') if item.strip()]
+        return [value]
+
+    if 'string' in types and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+
+    return value
+
+
+def _nullable(type_name):
+    return {'type': [type_name, 'null']}
+
+
+def _string_array():
+    return {'type': 'array', 'items': {'type': 'string'}}
+
+
+# Facts extracted from the photos by the vision pass (see photo_facts)
+PHOTO_FACTS_SCHEMA = ResponseSchema('photos', {
+    'type': 'object',
+    'properties': {
+        'photos': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'photo': {'type': 'integer'},
+                    'room_type': {'type': 'string'},
+                    'description': {'type': 'string'},
+                    'features': _string_array(),
+                    'appliances': _string_array(),
+                    'systems': _string_array(),
+                    'style': _nullable('string')
+                },
+                'required': ['photo', 'room_type', 'description', 'features', 'appliances', 'systems', 'style']
+            }
+        }
+    },
+    'required': ['photos']
+})
+
+# Listing description + video script
+LISTING_SCHEMA = ResponseSchema('listing', {
+    'type': 'object',
+    'properties': {
+        'listing_description': {'type': 'string'},
+        'video_script': {'type': 'string'}
+    },
+    'required': ['listing_description', 'video_script']
+})
+
+# RESO fields inferred by the model. IDs, address components and fixed values
+# are filled in locally by reso_service.build_reso_record().
+RESO_FIELDS_SCHEMA = ResponseSchema('reso', {
+    'type': 'object',
+    'properties': {
+        'ListPrice': _nullable('number'),
+        'PropertySubType': _nullable('string'),
+        'BedroomsTotal': _nullable('integer'),
+        'BathroomsFull': _nullable('integer'),
+        'BathroomsHalf': _nullable('integer'),
+        'LivingArea': _nullable('number'),
+        'YearBuilt': _nullable('integer'),
+        'Cooling': _string_array(),
+        'Heating': _string_array(),
+        'InteriorFeatures': _string_array(),
+        'Appliances': _string_array(),
+        'ExteriorFeatures': _string_array(),
+        'ArchitecturalStyle': _nullable('string'),
+        'Photos': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'Order': {'type': 'integer'},
+                    'MediaURL': {'type': 'string'},
+                    'Description': {'type': 'string'}
+                },
+                'required': ['Order', 'Description']
+            }
+        }
+    },
+    'required': [
+        'ListPrice', 'PropertySubType', 'BedroomsTotal', 'BathroomsFull',
+        'BathroomsHalf', 'LivingArea', 'YearBuilt', 'Cooling', 'Heating',
+        'InteriorFeatures', 'Appliances', 'ExteriorFeatures',
+        'ArchitecturalStyle', 'Photos'
+    ]
+})
+
+# Everything from one call (see combined_service)
+COMBINED_SCHEMA = ResponseSchema('combined', {
+    'type': 'object',
+    'properties': {
+        'listing_description': {'type': 'string'},
+        'video_script': {'type': 'string'},
+        'features_sheet': {'type': 'string'},
+        'reso': RESO_FIELDS_SCHEMA.schema
+    },
+    'required': ['listing_description', 'video_script', 'features_sheet', 'reso']
+})
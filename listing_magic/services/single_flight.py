@@ -0,0 +1,155 @@
+"""
+Single-Flight Service
+
+Coalesces identical in-flight model requests. The first caller for a
+request key runs the call; callers arriving with the same key while it is in
+flight wait for that call and share its outcome (result or exception)
+instead of paying for a duplicate, e.g. two sessions generating a listing
+for the same photos and fields, or a double-clicked button.
+
+Cancelling one waiter doesn't affect the others. The shared call itself is
+cancelled only once every waiter has gone; a caller arriving after that
+starts a fresh call.
+
+Works for async callers on the service event loop and for blocking callers
+on other threads (streams), which share the same registry.
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request hash"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'calls': 0, 'coalesced': 0}
+
+    async def run(self, key, make_coro):
+        """
+        Run a call, or join the identical one already in flight
+
+        Args:
+            key: Request key (e.g. the response cache key)
+            make_coro: Callable returning the coroutine to run when this
+                caller is the first one for the key
+
+        Returns:
+            tuple: (result, coalesced) where coalesced is True if the result
+                came from another caller's call
+
+        Raises:
+            Whatever the shared call raised
+        """
+        call, leader = self.join(key)
+        if leader:
+            task = asyncio.ensure_future(make_coro())
+            call['task'] = task
+            task.add_done_callback(lambda done: self._settle(key, call, done))
+        try:
+            # The shield keeps one waiter's cancellation from cancelling the shared call
+            result = await asyncio.shield(asyncio.wrap_future(call['future']))
+        except asyncio.CancelledError:
+            self.leave(key, call)
+            raise
+        return result, not leader
+
+    def join(self, key):
+        """
+        Register as a waiter for a key
+
+        Returns:
+            tuple: (call, leader). A leader must run the request and report
+                it with finish(); others wait with wait() and then leave()
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call['waiters'] += 1
+                self._counters['coalesced'] += 1
+                return call, False
+            call = {'future': concurrent.futures.Future(), 'waiters': 1, 'task': None}
+            self._calls[key] = call
+            self._counters['calls'] += 1
+            return call, True
+
+    def wait(self, call, timeout=None):
+        """
+        Block until a joined call finishes
+
+        Returns:
+            The call's result
+
+        Raises:
+            Whatever the call raised
+        """
+        return call['future'].result(timeout)
+
+    def leave(self, key, call):
+        """
+        Stop waiting for a call; cancels it when no waiter is left
+        """
+        with self._lock:
+            call['waiters'] -= 1
+            abandoned = call['waiters'] <= 0 and not call['future'].done()
+            if abandoned and self._calls.get(key) is call:
+                # Later callers start a fresh call instead of joining a cancelled one
+                del self._calls[key]
+        if abandoned and call['task'] is not None:
+            call['task'].get_loop().call_soon_threadsafe(call['task'].cancel)
+
+    def finish(self, key, call, result=None, error=None):
+        """
+        Report a leader's outcome to every waiter
+
+        Args:
+            key: Request key
+            call: Call from join()
+            result: Result on success
+            error: Exception on failure
+        """
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        if call['future'].done():
+            return
+        if error is not None:
+            call['future'].set_exception(error)
+        else:
+            call['future'].set_result(result)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Calls run, calls coalesced into them, and calls in flight
+        """
+        with self._lock:
+            return {**self._counters, 'in_flight': len(self._calls)}
+
+    def _settle(self, key, call, task):
+        """Pass a finished leader task's outcome to the waiters"""
+        if task.cancelled():
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call['future'].cancel()
+        elif task.exception() is not None:
+            self.finish(key, call, error=task.exception())
+        else:
+            self.finish(key, call, result=task.result())
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """
+    Get the process-wide single-flight registry
+
+    Returns:
+        SingleFlight: Shared instance
+    """
+    return _single_flight
@@ -0,0 +1,525 @@
+"""
+Slideshow Renderer
+
+Purpose-built render engine for property tour slideshows. Instead of
+compositing one clip per photo for every frame, each output frame is
+computed directly with NumPy: a static frame is the letterboxed photo
+itself (no per-frame work), and only frames inside a crossfade are blended.
+Frames are encoded by ffmpeg (the binary bundled with imageio-ffmpeg)
+into H.264, with the voiceover muxed in as AAC.
+
+Timeline: slide i starts at i * (slide_duration - overlap) and fades in
+over the previous slide for `overlap` seconds, both rounded to whole
+frames so that every interior slide holds for the same number of frames
+wherever it appears.
+
+Two render modes (LISTING_MAGIC_VIDEO_RENDER_MODE):
+
+    segments  The timeline is split into hold segments (one still slide)
+              and transition segments (a crossfade). A hold is encoded
+              from a single frame looped inside ffmpeg with still-image
+              tuning; only transition frames are computed and piped. The
+              segments are joined with the concat demuxer without
+              re-encoding, so render cost scales with the number of
+              transitions rather than the video length. Encoded segments
+              are kept in the render cache, so re-rendering after a
+              photo swap or reorder only encodes the segments that
+              changed. (default)
+    pipe      Every output frame is streamed into one ffmpeg process.
+
+In segments mode, segments are further cut into GOP-aligned chunks (one
+keyframe interval each, LISTING_MAGIC_VIDEO_GOP_SECONDS), and the chunks
+are encoded in parallel: LISTING_MAGIC_VIDEO_WORKERS ffmpeg encoder
+processes at once, each with LISTING_MAGIC_VIDEO_THREADS encoder threads.
+Every chunk starts on a keyframe, so they are stitched without
+re-encoding. Identical chunks (e.g. the middle of a long hold) are
+encoded once. Codec, preset and CRF are set with LISTING_MAGIC_VIDEO_CODEC,
+LISTING_MAGIC_VIDEO_PRESET and LISTING_MAGIC_VIDEO_CRF.
+
+See benchmark_render.py for a comparison of the modes.
+"""
+
+import os
+import re
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import imageio_ffmpeg
+
+from .render_cache import build_render_key, get_render_cache
+
+
+DEFAULT_FPS = 24
+DEFAULT_CODEC = os.getenv("LISTING_MAGIC_VIDEO_CODEC", "libx264")
+DEFAULT_PRESET = os.getenv("LISTING_MAGIC_VIDEO_PRESET", "ultrafast")
+DEFAULT_CRF = int(os.getenv("LISTING_MAGIC_VIDEO_CRF", "23"))
+DEFAULT_RENDER_MODE = os.getenv("LISTING_MAGIC_VIDEO_RENDER_MODE", "segments")
+RENDER_MODES = ('segments', 'pipe')
+# Concurrent encoder processes in segments mode (default: one per core)
+DEFAULT_RENDER_WORKERS = int(os.getenv("LISTING_MAGIC_VIDEO_WORKERS", "0")) or os.cpu_count() or 1
+# Threads per encoder process (0: split the cores between the workers)
+DEFAULT_ENCODER_THREADS = int(os.getenv("LISTING_MAGIC_VIDEO_THREADS", "0"))
+# Keyframe interval, and the longest chunk encoded as one job (0: don't chunk)
+DEFAULT_GOP_SECONDS = float(os.getenv("LISTING_MAGIC_VIDEO_GOP_SECONDS", "2"))
+# Bump when the way segments are encoded changes (invalidates cached segments)
+SEGMENT_FORMAT_VERSION = 2
+
+
+def slide_starts(slide_count, slide_duration, overlap):
+    """
+    Start time of each slide
+
+    Args:
+        slide_count: Number of slides
+        slide_duration: Seconds each slide is on screen, including its fade-in
+        overlap: Crossfade length in seconds
+
+    Returns:
+        list: Start times in seconds
+    """
+    return [i * (slide_duration - overlap) for i in range(slide_count)]
+
+
+def slideshow_duration(slide_count, slide_duration, overlap):
+    """Total length in seconds of a slideshow timeline"""
+    if slide_count == 0:
+        return 0.0
+    return slide_starts(slide_count, slide_duration, overlap)[-1] + slide_duration
+
+
+def iter_slideshow_frames(frames, slide_duration, overlap, fps=DEFAULT_FPS):
+    """
+    Compute the output frames of a slideshow
+
+    Static frames are the slide arrays themselves (not copies); only frames
+    inside a crossfade are newly allocated.
+
+    Args:
+        frames: One RGB uint8 array per slide, all the same shape
+        slide_duration: Seconds each slide is on screen, including its fade-in
+        overlap: Crossfade length in seconds
+        fps: Frames per second
+
+    Yields:
+        numpy.ndarray: Output frames, in order
+    """
+    for slide, alpha in _frame_plan(len(frames), slide_duration, overlap, fps):
+        yield frames[slide] if alpha is None else blend(frames[slide - 1], frames[slide], alpha)
+
+
+def plan_segments(slide_count, slide_duration, overlap, fps=DEFAULT_FPS):
+    """
+    Split a slideshow timeline into hold and transition segments
+
+    Args:
+        slide_count: Number of slides
+        slide_duration: Seconds each slide is on screen, including its fade-in
+        overlap: Crossfade length in seconds
+        fps: Frames per second
+
+    Returns:
+        list: In timeline order, {'kind': 'hold', 'slide': i, 'frames': n}
+            for n frames of slide i alone, or {'kind': 'fade', 'slide': i,
+            'alphas': [...]} for slide i fading in over slide i - 1 (one
+            blend weight per frame)
+    """
+    segments = []
+    for slide, alpha in _frame_plan(slide_count, slide_duration, overlap, fps):
+        kind = 'hold' if alpha is None else 'fade'
+        last = segments[-1] if segments else None
+        if last is None or last['kind'] != kind or last['slide'] != slide:
+            last = {'kind': 'hold', 'slide': slide, 'frames': 0} if kind == 'hold' else {'kind': 'fade', 'slide': slide, 'alphas': []}
+            segments.append(last)
+        if kind == 'hold':
+            last['frames'] += 1
+        else:
+            last['alphas'].append(alpha)
+
+    # The first and last holds run longer than the others; split them into a
+    # standard-length hold plus a remainder so a slide's standard hold can be
+    # reused (see render_cache) wherever the slide moves to
+    step, fade = _timeline_frames(slide_duration, overlap, fps)
+    standard = step - fade
+    split = []
+    for segment in segments:
+        if segment['kind'] == 'hold' and standard > 0 and segment['frames'] > standard:
+            split.append({'kind': 'hold', 'slide': segment['slide'], 'frames': standard})
+            split.append({'kind': 'hold', 'slide': segment['slide'], 'frames': segment['frames'] - standard})
+        else:
+            split.append(segment)
+    return split
+
+
+def chunk_segments(segments, gop_frames):
+    """
+    Cut segments into chunks of at most one GOP
+
+    Args:
+        segments: Segments from plan_segments()
+        gop_frames: Keyframe interval in frames (0 or None: no chunking)
+
+    Returns:
+        list: Segments of the same shape, in timeline order
+    """
+    if not gop_frames:
+        return list(segments)
+    chunks = []
+    for segment in segments:
+        if segment['kind'] == 'hold':
+            for start in range(0, segment['frames'], gop_frames):
+                chunks.append({'kind': 'hold', 'slide': segment['slide'], 'frames': min(gop_frames, segment['frames'] - start)})
+        else:
+            for start in range(0, len(segment['alphas']), gop_frames):
+                chunks.append({'kind': 'fade', 'slide': segment['slide'], 'alphas': segment['alphas'][start:start + gop_frames]})
+    return chunks
+
+
+def encoder_settings(codec=None, preset=None, crf=None, threads=None, gop_seconds=None, fps=DEFAULT_FPS, workers=1, bitrate=None):
+    """
+    Resolve encoder settings, filling in the LISTING_MAGIC_VIDEO_* defaults
+
+    Args:
+        codec: ffmpeg video encoder
+        preset: Encoder preset
+        crf: Constant rate factor (quality; lower is better)
+        threads: Threads per encoder process (0: share the cores between workers)
+        gop_seconds: Keyframe interval in seconds (0: encoder default)
+        fps: Frames per second
+        workers: Encoder processes that will run at once
+        bitrate: Optional peak bitrate cap, e.g. '8M' (None: CRF only)
+
+    Returns:
+        dict: 'codec', 'preset', 'crf', 'threads', 'gop' (in frames, or 0)
+            and 'bitrate'
+    """
+    threads = DEFAULT_ENCODER_THREADS if threads is None else threads
+    gop_seconds = DEFAULT_GOP_SECONDS if gop_seconds is None else gop_seconds
+    return {
+        'codec': codec or DEFAULT_CODEC,
+        'preset': preset or DEFAULT_PRESET,
+        'crf': DEFAULT_CRF if crf is None else crf,
+        'threads': threads or max(1, (os.cpu_count() or 1) // max(1, workers)),
+        'gop': int(round(gop_seconds * fps)),
+        'bitrate': bitrate
+    }
+
+
+def _frame_plan(slide_count, slide_duration, overlap, fps):
+    """
+    What each output frame shows
+
+    Yields:
+        tuple: (slide, alpha) where alpha is None for a still frame of the
+            slide, or the slide's weight while it fades in over slide - 1
+    """
+    total = int(np.ceil(slideshow_duration(slide_count, slide_duration, overlap) * fps - 1e-9))
+    step, fade = _timeline_frames(slide_duration, overlap, fps)
+
+    for index in range(total):
+        slide = min(index // step, slide_count - 1)
+        into = index - slide * step
+        if slide > 0 and into < fade:
+            yield slide, into / fade
+        else:
+            yield slide, None
+
+
+def _timeline_frames(slide_duration, overlap, fps):
+    """
+    Whole-frame timeline steps
+
+    Returns:
+        tuple: (step, fade) in frames: the distance between slide starts
+            and the crossfade length. The last slide absorbs the rounding,
+            so the total length stays exact.
+    """
+    step = max(1, int(round((slide_duration - overlap) * fps)))
+    fade = min(step, int(round(overlap * fps)))
+    return step, fade
+
+
+def blend(previous, following, alpha):
+    """
+    Crossfade two frames
+
+    Args:
+        previous: Frame fading out (uint8 array)
+        following: Frame fading in (uint8 array of the same shape)
+        alpha: Weight of the following frame, 0 to 1
+
+    Returns:
+        numpy.ndarray: Blended uint8 frame
+    """
+    # Fixed-point weights keep the blend in 16-bit integer math
+    weight = int(round(alpha * 256))
+    mixed = previous.astype(np.uint16) * (256 - weight)
+    mixed += following.astype(np.uint16) * weight
+    mixed >>= 8
+    return mixed.astype(np.uint8)
+
+
+def render_slideshow(frames, output_path, slide_duration, overlap, audio_path=None, fps=DEFAULT_FPS, codec=None, preset=None, crf=None, threads=None, gop_seconds=None, bitrate=None, workers=None, mode=DEFAULT_RENDER_MODE, cache=None):
+    """
+    Encode a slideshow to an MP4 file
+
+    Args:
+        frames: One RGB uint8 array per slide, all the same shape
+        output_path: Path of the MP4 to write
+        slide_duration: Seconds each slide is on screen, including its fade-in
+        overlap: Crossfade length in seconds
+        audio_path: Optional audio file muxed in as AAC
+        fps: Frames per second
+        codec, preset, crf, threads, gop_seconds, bitrate: Encoder settings (see
+            encoder_settings(); None uses the LISTING_MAGIC_VIDEO_* defaults)
+        workers: Encoder processes at once in segments mode (default:
+            LISTING_MAGIC_VIDEO_WORKERS, one per core)
+        mode: 'segments' or 'pipe' (see module docstring)
+        cache: RenderCache for segments (default: the shared render cache)
+
+    Returns:
+        str: output_path
+
+    Raises:
+        ValueError: If there are no frames or the mode is unknown
+        RuntimeError: If ffmpeg fails
+    """
+    if not frames:
+        raise ValueError("No frames to render")
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {mode}")
+
+    if mode == 'pipe':
+        encoder = encoder_settings(codec, preset, crf, threads, gop_seconds, fps, bitrate=bitrate)
+        command = _input_args(frames[0], fps)
+        if audio_path:
+            command += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'aac']
+        command += _video_args(encoder) + ['-movflags', '+faststart', output_path]
+        _run_ffmpeg(command, iter_slideshow_frames(frames, slide_duration, overlap, fps))
+        return output_path
+
+    workers = workers or DEFAULT_RENDER_WORKERS
+    encoder = encoder_settings(codec, preset, crf, threads, gop_seconds, fps, workers, bitrate)
+    cache = cache or get_render_cache()
+    hashes = [frame_hash(frame) for frame in frames]
+    segments = chunk_segments(plan_segments(len(frames), slide_duration, overlap, fps), encoder['gop'])
+    keys = [segment_key(segment, hashes, fps, encoder) for segment in segments]
+
+    # Encode each distinct missing chunk once, several at a time
+    paths = {}
+    missing = {}
+    for key, segment in zip(keys, segments):
+        if key in paths or key in missing:
+            continue
+        path = cache.get(key)
+        if path is None:
+            missing[key] = segment
+        else:
+            paths[key] = path
+
+    with tempfile.TemporaryDirectory(prefix='segments-', dir=os.path.dirname(os.path.abspath(output_path))) as workdir:
+        def encode(key):
+            path = os.path.join(workdir, f"{key}.mp4")
+            encode_segment(missing[key], frames, path, fps, encoder)
+            return cache.put(key, path)
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing)) or 1) as pool:
+            # Longest chunks first, so the last job to finish is a short one
+            order = sorted(missing, key=lambda key: -_segment_frames(missing[key]))
+            for key, path in zip(order, pool.map(encode, order)):
+                paths[key] = path
+
+    print(f"[video] Encoded {len(missing)} of {len(segments)} chunks ({len(segments) - len(missing)} reused) with {workers} workers")
+    concat_segments([paths[key] for key in keys], output_path, audio_path=audio_path)
+
+    return output_path
+
+
+def _segment_frames(segment):
+    return segment['frames'] if segment['kind'] == 'hold' else len(segment['alphas'])
+
+
+def frame_hash(frame):
+    """
+    Content hash of a slide frame (pixels and shape)
+
+    Args:
+        frame: RGB uint8 array
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    digest = hashlib.sha256(f"{frame.shape}:".encode())
+    digest.update(np.ascontiguousarray(frame).data)
+    return digest.hexdigest()
+
+
+def segment_key(segment, hashes, fps, encoder):
+    """
+    Render cache key of a segment
+
+    Args:
+        segment: Segment dict from plan_segments() or chunk_segments()
+        hashes: frame_hash() of each slide
+        fps: Frames per second
+        encoder: Settings from encoder_settings()
+
+    Returns:
+        str: Key covering the stills, frame count, effect and encoder settings
+    """
+    # Thread count doesn't change what a chunk shows, so it isn't part of the key
+    settings = {
+        'fps': fps,
+        'args': _video_args(dict(encoder, threads=0), segment=True),
+        'version': SEGMENT_FORMAT_VERSION
+    }
+    if segment['kind'] == 'hold':
+        return build_render_key('hold', still=hashes[segment['slide']], frames=segment['frames'], encoder=settings)
+    return build_render_key(
+        'fade',
+        stills=[hashes[segment['slide'] - 1], hashes[segment['slide']]],
+        weights=[int(round(alpha * 256)) for alpha in segment['alphas']],
+        encoder=settings
+    )
+
+
+def encode_segment(segment, frames, output_path, fps, encoder):
+    """
+    Encode one hold or transition segment
+
+    Every segment is encoded with the same settings (still-image tuning
+    included) and starts on a keyframe, so the segments can be joined
+    without re-encoding.
+
+    Args:
+        segment: Segment dict from plan_segments() or chunk_segments()
+        frames: The slideshow's slide arrays
+        output_path: Path of the segment file to write
+        fps: Frames per second
+        encoder: Settings from encoder_settings()
+    """
+    slide = frames[segment['slide']]
+    if segment['kind'] == 'hold':
+        # One input frame, repeated by ffmpeg's loop filter; the encoder sees identical frames
+        command = _input_args(slide, fps) + [
+            '-vf', f"format=yuv420p,loop=loop={segment['frames'] - 1}:size=1:start=0",
+            '-frames:v', str(segment['frames'])
+        ]
+        _run_ffmpeg(command + _video_args(encoder, segment=True) + [output_path], [slide])
+    else:
+        previous = frames[segment['slide'] - 1]
+        blended = (blend(previous, slide, alpha) for alpha in segment['alphas'])
+        _run_ffmpeg(_input_args(slide, fps) + _video_args(encoder, segment=True) + [output_path], blended)
+
+
+def concat_segments(paths, output_path, audio_path=None):
+    """
+    Join encoded segments into one MP4 without re-encoding the video
+
+    Args:
+        paths: Segment files in timeline order, encoded with the same settings
+        output_path: Path of the MP4 to write
+        audio_path: Optional audio file muxed in as AAC
+    """
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, 'w') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    command = [imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-nostats', '-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        command += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'aac']
+    command += ['-c:v', 'copy', '-movflags', '+faststart', output_path]
+    try:
+        _run_ffmpeg(command)
+    finally:
+        os.remove(list_path)
+
+
+def _input_args(frame, fps):
+    """ffmpeg arguments reading raw RGB frames shaped like frame from stdin"""
+    height, width = frame.shape[:2]
+    return [
+        imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-loglevel', 'error', '-nostats',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}", '-r', str(fps), '-i', '-'
+    ]
+
+
+def _video_args(encoder, segment=False):
+    """Encoder arguments; segment adds x264's still-image tuning and headers that stay identical across segments"""
+    args = ['-c:v', encoder['codec'], '-preset', encoder['preset'], '-crf', str(encoder['crf']), '-pix_fmt', 'yuv420p']
+    if encoder['gop']:
+        args += ['-g', str(encoder['gop'])]
+    if encoder['bitrate']:
+        # Capped CRF: quality from the CRF, peaks limited to the bitrate
+        args += ['-maxrate', encoder['bitrate'], '-bufsize', _double_rate(encoder['bitrate'])]
+    if encoder['threads']:
+        args += ['-threads', str(encoder['threads'])]
+    if segment and encoder['codec'] == 'libx264':
+        args += ['-tune', 'stillimage', '-x264-params', 'stitchable=1']
+    return args
+
+
+def _double_rate(rate):
+    """Twice an ffmpeg rate string such as '8M' (the rate control buffer size)"""
+    match = re.fullmatch(r'([\d.]+)([kKmM]?)', str(rate))
+    if not match:
+        raise ValueError(f"Invalid bitrate: {rate}")
+    return f"{float(match.group(1)) * 2:g}{match.group(2)}"
+
+
+def _run_ffmpeg(command, frames=None):
+    """
+    Run ffmpeg, feeding raw frames to its stdin when given
+
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if frames is not None else subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    if frames is not None:
+        try:
+            for frame in frames:
+                process.stdin.write(np.ascontiguousarray(frame).data)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg exited early; its error output says why
+            pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+    stderr = process.stderr.read().decode(errors='replace')
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.strip()[-500:]}")
+
+
+def probe_duration(path):
+    """
+    Duration of a media file in seconds
+
+    Args:
+        path: Audio or video file
+
+    Returns:
+        float: Duration from the container header
+
+    Raises:
+        RuntimeError: If ffmpeg reports no duration
+    """
+    result = subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), '-hide_banner', '-i', path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr.decode(errors='replace'))
+    if not match:
+        raise RuntimeError(f"Could not read the duration of {path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
@@ -0,0 +1,197 @@
+"""
+Structured Output Service
+
+Requests JSON replies constrained by a response schema and validates them
+locally. Replies with small defects are repaired in place; if fields are
+still missing or invalid, only those fields are re-requested instead of
+failing the whole generation.
+"""
+
+import re
+import json
+
+from google.genai import types
+
+from .model_gateway import DEFAULT_MODEL, generate_text_async, store_response_async
+
+
+class IncompleteResponseError(ValueError):
+    """A structured reply is missing fields or has fields of the wrong type"""
+
+    def __init__(self, schema, data, fields):
+        """
+        Args:
+            schema: ResponseSchema the reply was validated against
+            data: Whatever could be decoded (dict, possibly empty)
+            fields: Top-level field names that are missing or invalid
+        """
+        self.schema = schema
+        self.data = data
+        self.fields = fields
+        super().__init__(f"{schema.name} response missing or invalid fields: {', '.join(fields)}")
+
+
+def structured_config(schema):
+    """
+    Build the generation config for a schema-constrained JSON reply
+
+    Args:
+        schema: ResponseSchema
+
+    Returns:
+        types.GenerateContentConfig: JSON mode with the response schema set
+    """
+    return types.GenerateContentConfig(
+        response_mime_type='application/json',
+        response_json_schema=schema.schema
+    )
+
+
+def load_json_lenient(text):
+    """
+    Decode a JSON object, tolerating fences, surrounding prose and trailing commas
+
+    Args:
+        text: Raw model response text
+
+    Returns:
+        dict: Decoded object
+
+    Raises:
+        ValueError: If no JSON object can be recovered
+    """
+    text = text.strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        start = text.find('{')
+        end = text.rfind('}')
+        if start == -1 or end <= start:
+            raise ValueError("No JSON object found in response")
+        candidate = re.sub(r',\s*([}\]])', r'\1', text[start:end + 1])
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Could not decode JSON response: {e}")
+
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return data
+
+
+def parse_structured(text, schema):
+    """
+    Decode, repair and validate a structured reply
+
+    Args:
+        text: Raw model response text
+        schema: ResponseSchema to validate against
+
+    Returns:
+        dict: Valid decoded object
+
+    Raises:
+        IncompleteResponseError: With the partial data and the fields to re-request
+    """
+    try:
+        data = load_json_lenient(text)
+    except ValueError:
+        raise IncompleteResponseError(schema, {}, schema.fields)
+
+    schema.coerce(data)
+    fields = schema.invalid_fields(data)
+    if fields:
+        raise IncompleteResponseError(schema, data, fields)
+    return data
+
+
+async def generate_structured_async(service, prompt, images, schema, use_cache=True, media=None, model=DEFAULT_MODEL, shared_prefix=False):
+    """
+    Generate a schema-valid JSON object, re-requesting only broken fields
+
+    Args:
+        service: Name of the calling service (for logging)
+        prompt: Fully rendered prompt text
+        images: List of PIL Image objects sent with the prompt
+        schema: ResponseSchema for the reply
+        use_cache: If False, bypass the response cache lookup
+        media: Optional MediaRegistry for reusing uploaded photo references
+        model: Model name
+        shared_prefix: If True, prompt is a suffix to the shared prompt prefix
+
+    Returns:
+        dict: Decoded object that passes schema validation
+
+    Raises:
+        IncompleteResponseError: If fields are still invalid after one re-request
+    """
+    try:
+        return await generate_text_async(
+            service,
+            prompt,
+            images,
+            parse=lambda text: parse_structured(text, schema),
+            model=model,
+            use_cache=use_cache,
+            media=media,
+            config=structured_config(schema),
+            shared_prefix=shared_prefix
+        )
+    except IncompleteResponseError as error:
+        return await complete_missing_fields_async(
+            service, prompt, images, error, media=media, model=model, shared_prefix=shared_prefix
+        )
+
+
+async def complete_missing_fields_async(service, prompt, images, error, media=None, model=DEFAULT_MODEL, shared_prefix=False):
+    """
+    Re-request only the fields a structured reply got wrong and merge them in
+
+    The merged result is stored in the response cache under the original
+    request, so a repeat of the same request is a plain cache hit.
+
+    Args:
+        service: Name of the calling service (for logging)
+        prompt: Original prompt text
+        images: Original images
+        error: IncompleteResponseError from the first attempt
+        media: Optional MediaRegistry for reusing uploaded photo references
+        model: Model name
+        shared_prefix: Whether the original request used the shared prompt prefix
+
+    Returns:
+        dict: Complete, valid object
+
+    Raises:
+        IncompleteResponseError: If the re-requested fields are still invalid
+    """
+    schema = error.schema
+    partial_schema = schema.subset(error.fields)
+    print(f"[{service}] Re-requesting fields: {', '.join(error.fields)}")
+
+    repair_prompt = prompt + f"""
+
+    Return ONLY a JSON object with these keys: {', '.join(error.fields)}.
+    """
+
+    patch = await generate_text_async(
+        f"{service}-repair",
+        repair_prompt,
+        images,
+        parse=lambda text: parse_structured(text, partial_schema),
+        model=model,
+        use_cache=False,
+        media=media,
+        config=structured_config(partial_schema),
+        shared_prefix=shared_prefix
+    )
+
+    data = dict(error.data)
+    data.update(patch)
+
+    fields = schema.invalid_fields(data)
+    if fields:
+        raise IncompleteResponseError(schema, data, fields)
+
+    await store_response_async(model, prompt, images, structured_config(schema), json.dumps(data), shared_prefix)
+    return data
@@ -0,0 +1,329 @@
+"""
+Telemetry Service
+
+Emits one structured record per model call: service, model and tier,
+image count, request payload bytes, prompt/output/cached tokens, estimated
+cost, time-to-first-byte, total time, attempts and whether the call was a
+retry, hedged, batched, coalesced into an identical call or a cache hit.
+Records go to pluggable sinks: an in-process ring buffer (always on,
+summarized on the admin page) and optionally a JSONL file
+(LISTING_MAGIC_TELEMETRY_PATH).
+
+Time-to-first-byte and payload size are measured by HTTP hooks on the shared
+connection pool (see client_pool), attributed to the current call through a
+context variable.
+"""
+
+import os
+import json
+import math
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+# USD per million tokens: (input, output, cached input)
+MODEL_PRICES = {
+    'gemini-3-pro-preview': (2.00, 12.00, 0.20),
+    'gemini-2.5-pro': (1.25, 10.00, 0.125),
+    'gemini-2.5-flash': (0.30, 2.50, 0.03),
+    'gemini-2.5-flash-lite': (0.10, 0.40, 0.01)
+}
+
+# Batch jobs are billed at half the interactive price
+BATCH_PRICE_FACTOR = 0.5
+
+_MODEL_ENDPOINTS = (':generateContent', ':streamGenerateContent')
+
+_current_record = contextvars.ContextVar('listing_magic_call_record', default=None)
+_sinks_lock = threading.Lock()
+_sinks = []
+_ring_buffer = None
+
+
+class RingBufferSink:
+    """Keeps the most recent records in memory and summarizes them"""
+
+    def __init__(self, size=1000):
+        """
+        Args:
+            size: Number of records to keep
+        """
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """
+        Get the buffered records
+
+        Returns:
+            list: Records, oldest first
+        """
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self):
+        """
+        Summarize buffered records per service
+
+        Returns:
+            list: One dict per service with call counts, cache hit and retry
+                rates, coalesced calls, p50/p95/p99 total time, p50/p95 time-to-first-byte,
+                p95 rate limiter queueing, token totals and estimated cost
+        """
+        by_service = {}
+        for record in self.records():
+            by_service.setdefault(record['service'], []).append(record)
+
+        rows = []
+        for service, records in sorted(by_service.items()):
+            calls = [r for r in records if not r['cache_hit'] and not r['coalesced']]
+            total_ms = [r['total_ms'] for r in calls if r['error'] is None]
+            ttfb_ms = [r['ttfb_ms'] for r in calls if r['ttfb_ms'] is not None]
+            queue_ms = [r['queue_ms'] for r in calls if r['queue_ms'] is not None]
+            rows.append({
+                'service': service,
+                'calls': len(records),
+                'cache_hit_rate': round(sum(r['cache_hit'] for r in records) / len(records), 3),
+                'coalesced': sum(r['coalesced'] for r in records),
+                'retry_rate': round(sum(r['retried'] for r in calls) / len(calls), 3) if calls else 0.0,
+                'errors': sum(r['error'] is not None for r in calls),
+                'p50_ms': percentile(total_ms, 50),
+                'p95_ms': percentile(total_ms, 95),
+                'p99_ms': percentile(total_ms, 99),
+                'ttfb_p50_ms': percentile(ttfb_ms, 50),
+                'ttfb_p95_ms': percentile(ttfb_ms, 95),
+                'queue_p95_ms': percentile(queue_ms, 95),
+                'prompt_tokens': sum(r['prompt_tokens'] or 0 for r in calls),
+                'output_tokens': sum(r['output_tokens'] or 0 for r in calls),
+                'cached_tokens': sum(r['cached_tokens'] or 0 for r in calls),
+                'cost_usd': round(sum(r['cost_usd'] or 0 for r in calls), 4)
+            })
+        return rows
+
+
+class JsonlSink:
+    """Appends records to a JSON Lines file"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: File to append to (parent directories are created)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def add_sink(sink):
+    """
+    Register a sink; any object with a write(record) method works
+
+    Args:
+        sink: Sink instance
+    """
+    with _sinks_lock:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    """Unregister a sink"""
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def get_ring_buffer():
+    """
+    Get the process-wide ring buffer sink
+
+    Returns:
+        RingBufferSink: Buffer read by the admin page
+    """
+    return _ring_buffer
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile
+
+    Args:
+        values: List of numbers
+        pct: Percentile in [0, 100]
+
+    Returns:
+        float: Percentile value, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def estimate_cost(model, prompt_tokens, output_tokens, cached_tokens):
+    """
+    Estimate the cost of a call from its token counts
+
+    Args:
+        model: Model name
+        prompt_tokens: Prompt tokens (including cached ones)
+        output_tokens: Output tokens
+        cached_tokens: Prompt tokens served from a context cache
+
+    Returns:
+        float: Estimated USD cost, or None for a model without known prices
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, output_price, cached_price = prices
+    prompt_tokens, output_tokens, cached_tokens = prompt_tokens or 0, output_tokens or 0, cached_tokens or 0
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+def current_record():
+    """
+    Get the record of the model call in progress (None outside a call)
+
+    Returns:
+        dict: Mutable record; other layers (e.g. resilience) annotate it
+    """
+    return _current_record.get()
+
+
+@contextmanager
+def track_call(service, model, images, streamed=False):
+    """
+    Measure one model call and emit its record when it finishes
+
+    Args:
+        service: Name of the calling service
+        model: Model name
+        images: List of images sent with the prompt
+        streamed: Whether this is a streaming call
+
+    Yields:
+        dict: The record; set 'cache_hit' and pass responses to
+            record_usage() inside the block
+    """
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'service': service,
+        'model': model,
+        'tier': None,
+        'images': len(images),
+        'payload_bytes': None,
+        'prompt_tokens': None,
+        'output_tokens': None,
+        'cached_tokens': None,
+        'cost_usd': None,
+        'queue_ms': None,
+        'ttfb_ms': None,
+        'total_ms': None,
+        'attempts': 0,
+        'retried': False,
+        'hedged': False,
+        'cache_hit': False,
+        'coalesced': False,
+        'batched': False,
+        'streamed': streamed,
+        'error': None,
+        '_started': time.perf_counter()
+    }
+    token = _current_record.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            _current_record.reset(token)
+        except ValueError:
+            # A stream closed from another context (e.g. garbage collected)
+            pass
+        record['total_ms'] = round((time.perf_counter() - record.pop('_started')) * 1000, 1)
+        record['retried'] = record['attempts'] > 1
+        emit(record)
+
+
+def record_usage(record, response):
+    """
+    Copy token usage from a response (or final stream chunk) into a record
+
+    Args:
+        record: Record from track_call()
+        response: GenerateContentResponse
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    record['prompt_tokens'] = usage.prompt_token_count
+    record['output_tokens'] = usage.candidates_token_count
+    record['cached_tokens'] = usage.cached_content_token_count
+    record['cost_usd'] = estimate_cost(
+        record['model'], usage.prompt_token_count, usage.candidates_token_count, usage.cached_content_token_count
+    )
+    if record['batched'] and record['cost_usd'] is not None:
+        record['cost_usd'] *= BATCH_PRICE_FACTOR
+
+
+def emit(record):
+    """Send a finished record to every sink (sink errors are logged, not raised)"""
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        try:
+            sink.write(record)
+        except Exception as e:
+            print(f"Warning: Telemetry sink {type(sink).__name__} failed: {e}")
+
+
+def on_request(request):
+    """HTTP request hook: record the payload size of model calls"""
+    record = _current_record.get()
+    if record is not None and request.url.path.endswith(_MODEL_ENDPOINTS):
+        length = request.headers.get('content-length')
+        if length is not None:
+            record['payload_bytes'] = int(length)
+
+
+def on_response(response):
+    """HTTP response hook: record time-to-first-byte (headers received) of model calls"""
+    record = _current_record.get()
+    if record is not None and '_started' in record and response.request.url.path.endswith(_MODEL_ENDPOINTS):
+        record['ttfb_ms'] = round((time.perf_counter() - record['_started']) * 1000, 1)
+
+
+async def on_request_async(request):
+    on_request(request)
+
+
+async def on_response_async(response):
+    on_response(response)
+
+
+_ring_buffer = RingBufferSink(int(os.getenv("LISTING_MAGIC_TELEMETRY_BUFFER_SIZE", "1000")))
+add_sink(_ring_buffer)
+if os.getenv("LISTING_MAGIC_TELEMETRY_PATH"):
+    add_sink(JsonlSink(os.getenv("LISTING_MAGIC_TELEMETRY_PATH")))
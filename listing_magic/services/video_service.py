@@ -2,15 +2,22 @@
 Video Service
 
 Handles all video generation functionality including basic video creation
-and voiceover generation using gTTS.
+and voiceover generation using gTTS. Videos are encoded by the slideshow
+renderer (see slideshow_renderer), in one or more output formats (see
+render_profiles).
 """
 
 import os
 import re
+import shutil
 import numpy as np
-from moviepy import ImageClip, CompositeVideoClip, AudioFileClip, vfx
 from gtts import gTTS
 
+from .orchestrator import run_in_parallel
+from .render_cache import build_render_key, get_render_cache
+from .render_profiles import RENDER_PROFILES, DEFAULT_VIDEO_PROFILES, parse_profiles, prepare_profile_frames
+from .slideshow_renderer import render_slideshow, probe_duration
+
 # Import from our utils
 import sys
 from pathlib import Path
@@ -29,35 +36,12 @@ def generate_video(images, file_manager):
     Returns:
         str: Path to the generated video file
     """
-    clips = []
-    for i, img in enumerate(images):
-        # Images are already EXIF-transposed from cache
-
-        # Resize with padding (Letterboxing)
-        img = resize_with_padding(img, (1920, 1080))
-
-        # Convert PIL Image to numpy array
-        img_array = np.array(img.convert('RGB'))
-
-        # Create ImageClip
-        clip = ImageClip(img_array).with_duration(3)
-
-        # Apply crossfade and positioning
-        if i > 0:
-            start_time = i * 2  # 3s duration - 1s overlap
-            clip = clip.with_start(start_time).with_effects([vfx.CrossFadeIn(1)])
-
-        clips.append(clip)
-
-    # Create composite video
-    video = CompositeVideoClip(clips)
+    # Images are already EXIF-transposed from cache; letterbox them to 1080p
+    frames = _prepare_frames(images, RENDER_PROFILES['landscape']['size'])
     output_path = file_manager.get_path("property_tour.mp4")
 
-    # Write video file
-    video.write_videofile(output_path, fps=24, codec='libx264', preset='ultrafast')
-
-    # Close video resource
-    video.close()
+    # 3s per photo with a 1s crossfade into the next
+    render_slideshow(frames, output_path, slide_duration=3, overlap=1)
 
     return output_path
 
@@ -153,6 +137,26 @@ def generate_video_with_voiceover(images, script_text, file_manager):
     Returns:
         str: Path to the generated video file with voiceover
     """
+    return generate_video_formats(images, script_text, file_manager, profiles=['landscape'])['landscape']
+
+
+def generate_video_formats(images, script_text, file_manager, profiles=None):
+    """
+    Generate the voiceover tour in several output formats at once
+
+    The photos are decoded and scaled once and the narration is
+    synthesized once; every format is rendered from those.
+
+    Args:
+        images: List of PIL Image objects
+        script_text: Video script text containing narration
+        file_manager: FileManager instance for temp file handling
+        profiles: Render profile names (default: LISTING_MAGIC_VIDEO_PROFILES)
+
+    Returns:
+        dict: Profile name -> path of the generated video, in profile order
+    """
+    profiles = parse_profiles(profiles or DEFAULT_VIDEO_PROFILES)
 
     # CRITICAL: Clean the script to extract only narration
     clean_narration = extract_narration_from_script(script_text)
@@ -166,50 +170,100 @@ def generate_video_with_voiceover(images, script_text, file_manager):
     print(f"DEBUG - Clean narration length: {len(clean_narration)} chars")
     print(f"DEBUG - Narration to speak: {clean_narration[:200]}...")  # First 200 chars
 
-    # Generate voiceover audio from cleaned narration
-    tts = gTTS(text=clean_narration, lang='en', slow=False)
+    # Generate voiceover audio and prepare video frames concurrently
     audio_path = file_manager.get_path("voiceover.mp3")
-    tts.save(audio_path)
-
-    # Load audio
-    audio = AudioFileClip(audio_path)
-    audio_duration = audio.duration
-
-    # Calculate image duration based on audio length
-    duration_per_image = audio_duration / len(images)
+    results, errors = run_in_parallel({
+        'voiceover': lambda: _synthesize_voiceover(clean_narration, audio_path),
+        'frames': lambda: prepare_profile_frames(images, profiles)
+    })
+    if errors:
+        raise next(iter(errors.values()))
+    frames = results['frames']
+
+    # Spread the photos over the whole narration, crossfades included
+    slide_duration, overlap = _fit_slides(probe_duration(audio_path), len(images))
+
+    # Formats are rendered one after another; each already keeps every core busy
+    paths = {}
+    try:
+        for name in profiles:
+            profile = RENDER_PROFILES[name]
+            output_path = file_manager.get_path(_video_filename(name))
+            print(f"[video] Rendering {name} ({profile['aspect']}, {profile['size'][0]}x{profile['size'][1]}, {profile['fps']}fps)")
+            render_slideshow(
+                frames[name],
+                output_path,
+                slide_duration,
+                overlap,
+                audio_path=audio_path,
+                fps=profile['fps'],
+                bitrate=profile['bitrate']
+            )
+            paths[name] = output_path
+    finally:
+        # Remove temporary audio file
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+
+    return paths
+
+
+def _video_filename(profile):
+    """Output file name of a profile; landscape keeps the original name"""
+    if profile == 'landscape':
+        return "property_tour_with_voice.mp4"
+    return f"property_tour_with_voice_{profile}.mp4"
+
+
+def _fit_slides(audio_duration, count):
+    """
+    Slide duration and crossfade length so the slideshow lasts as long as the audio
 
-    # Create video clips
-    clips = []
-    for i, img in enumerate(images):
-        # Images are already EXIF-transposed from cache
-        img = resize_with_padding(img, (1920, 1080))
-        img_array = np.array(img.convert('RGB'))
+    Args:
+        audio_duration: Narration length in seconds
+        count: Number of photos
 
-        clip = ImageClip(img_array).with_duration(duration_per_image)
+    Returns:
+        tuple: (slide_duration, overlap) in seconds
+    """
+    share = audio_duration / count
+    overlap = min(0.5, share * 0.2)  # 20% overlap or 0.5s max
+    # Crossfades overlap neighbouring slides, so each slide is on screen a little longer
+    return (audio_duration + (count - 1) * overlap) / count, overlap
 
-        # Add crossfade transitions
-        if i > 0:
-            overlap = min(0.5, duration_per_image * 0.2)  # 20% overlap or 0.5s max
-            start_time = i * (duration_per_image - overlap)
-            clip = clip.with_start(start_time).with_effects([vfx.CrossFadeIn(overlap)])
 
-        clips.append(clip)
+def _synthesize_voiceover(narration, audio_path):
+    """
+    Generate the voiceover MP3 with gTTS, reusing a cached track for the same narration
 
-    # Create composite video
-    video = CompositeVideoClip(clips)
+    An unchanged narration keeps the same length, and with it the same
+    slide timing, so a photo change only re-renders the affected segments.
 
-    # Add audio to video
-    final_video = video.with_audio(audio)
+    Args:
+        narration: Clean narration text
+        audio_path: Output path for the MP3
+    """
+    cache = get_render_cache()
+    key = build_render_key('voiceover', engine='gtts', lang='en', text=narration)
+    cached = cache.get(key, suffix='.mp3')
+    if cached is not None:
+        shutil.copyfile(cached, audio_path)
+        return
+
+    tts = gTTS(text=narration, lang='en', slow=False)
+    tts.save(audio_path)
+    cache.put(key, shutil.copy(audio_path, f"{audio_path}.cache"), suffix='.mp3')
 
-    output_path = file_manager.get_path("property_tour_with_voice.mp4")
-    final_video.write_videofile(output_path, fps=24, codec='libx264', preset='ultrafast', audio_codec='aac')
 
-    # Cleanup: Close resources first, then remove temporary files
-    audio.close()
-    video.close()
+def _prepare_frames(images, size):
+    """
+    Letterbox images to the output size and convert them to RGB arrays
 
-    # Remove temporary audio file after resources are closed
-    if os.path.exists(audio_path):
-        os.remove(audio_path)
+    Args:
+        images: List of PIL Image objects (already EXIF-transposed)
+        size: Tuple of (width, height)
 
-    return output_path
+    Returns:
+        list: numpy arrays, one per image
+    """
+    return [np.array(resize_with_padding(img, size).convert('RGB')) for img in images]
@@ -3,7 +3,9 @@
 from .address_parser import parse_street_address
 from .cache_manager import get_inputs_hash, inputs_changed
 from .file_manager import FileManager
-from .image_processor import image_to_base64, resize_with_padding
+from .image_processor import image_to_base64, resize_with_padding, image_content_hash, estimate_image_tokens
+from .photo_selector import select_diverse_photos
+from .renditions import get_renditions, decode_photo, make_model_rendition, make_video_rendition
 
 __all__ = [
     'parse_street_address',
@@ -11,5 +13,12 @@ __all__ = [
     'inputs_changed',
     'FileManager',
     'image_to_base64',
-    'resize_with_padding'
+    'resize_with_padding',
+    'image_content_hash',
+    'estimate_image_tokens',
+    'select_diverse_photos',
+    'get_renditions',
+    'decode_photo',
+    'make_model_rendition',
+    'make_video_rendition'
 ]
@@ -16,11 +16,16 @@ def get_inputs_hash(uploaded_files):
     Args:
         uploaded_files: List of uploaded file objects from Streamlit
 
+    Photos are identified by content hash (st.session_state.upload_hashes,
+    kept current by the upload area), so replacing a photo with a different
+    one of the same name counts as a change.
+
     Returns:
         str: MD5 hash of all inputs
     """
     inputs = {
-        'files': [f.name for f in uploaded_files] if uploaded_files else [],
+        'files': list(st.session_state.get('upload_hashes', [])) if uploaded_files else [],
+        'property_type': st.session_state.get('property_type_input', ''),
         'address': st.session_state.get('address_input', ''),
         'city': st.session_state.get('city_input', ''),
         'state': st.session_state.get('state_input', ''),
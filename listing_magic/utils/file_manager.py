@@ -14,15 +14,16 @@ from pathlib import Path
 class FileManager:
     """Manages temporary files for a session with unique IDs"""
 
-    def __init__(self, session_id=None):
+    def __init__(self, session_id=None, root="temp"):
         """
         Initialize FileManager with a session ID
 
         Args:
             session_id: Optional session ID. If not provided, generates a new UUID
+            root: Parent directory of the session directory (default "temp")
         """
         self.session_id = session_id or str(uuid.uuid4())
-        self.base_dir = Path("temp") / self.session_id
+        self.base_dir = Path(root) / self.session_id
         self._ensure_directory()
 
     def _ensure_directory(self):
@@ -1,14 +1,24 @@
 """
 Image Processor Utility
 
-Handles image processing tasks including resizing, padding, and base64 encoding.
+Handles image processing tasks including resizing, padding, hashing,
+and base64 encoding.
 """
 
+import math
 import base64
+import hashlib
 from io import BytesIO
 from PIL import Image
 
 
+# Gemini image billing: images up to 384px on both sides cost one tile;
+# larger images are tiled into 768x768 crops, each billed as one tile.
+IMAGE_SMALL_MAX_SIDE = 384
+IMAGE_TILE_SIZE = 768
+IMAGE_TOKENS_PER_TILE = 258
+
+
 def image_to_base64(img, max_width=150):
     """
     Convert PIL image to base64 string for HTML embedding
@@ -72,3 +82,39 @@ def resize_with_padding(image, target_size=(1920, 1080)):
     new_image.paste(resized_image, (x_offset, y_offset))
 
     return new_image
+
+
+def image_content_hash(img):
+    """
+    Compute a stable content hash for an image
+
+    Hashes the decoded pixel data (plus mode and size) so the same photo
+    produces the same hash regardless of file name or upload order.
+
+    Args:
+        img: PIL Image object
+
+    Returns:
+        str: SHA-256 hex digest of the image content
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def estimate_image_tokens(img):
+    """
+    Estimate the input tokens billed for an image
+
+    Args:
+        img: PIL Image object
+
+    Returns:
+        int: Estimated token count
+    """
+    width, height = img.size
+    if width <= IMAGE_SMALL_MAX_SIDE and height <= IMAGE_SMALL_MAX_SIDE:
+        return IMAGE_TOKENS_PER_TILE
+    tiles = math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+    return tiles * IMAGE_TOKENS_PER_TILE
@@ -0,0 +1,152 @@
+"""
+Photo Selector Utility
+
+Picks a small, diverse set of photos to send to the model. Each photo gets
+a cheap perceptual hash and color histogram (computed with NumPy and cached
+by image content hash); photos are clustered on those features and the most
+representative photo of each cluster is chosen. This avoids sending three
+near-identical exterior shots while missing the kitchen.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from .image_processor import image_content_hash, estimate_image_tokens
+
+
+DEFAULT_MAX_PHOTOS = int(os.getenv("LISTING_MAGIC_MAX_PHOTOS", "3"))
+DEFAULT_IMAGE_TOKEN_BUDGET = int(os.getenv("LISTING_MAGIC_IMAGE_TOKEN_BUDGET", "0")) or None
+
+# Weight of the perceptual hash vs. the color histogram in the distance
+HASH_WEIGHT = 0.5
+HISTOGRAM_BINS = 4  # per channel -> 64 bins
+FEATURE_CACHE_SIZE = 2048
+
+_feature_cache = OrderedDict()
+_feature_lock = threading.Lock()
+
+
+def compute_photo_features(img):
+    """
+    Compute (or fetch cached) selection features for a photo
+
+    Args:
+        img: PIL Image object
+
+    Returns:
+        tuple: (dhash bits as a bool array of 64, normalized color histogram)
+    """
+    key = image_content_hash(img)
+    with _feature_lock:
+        if key in _feature_cache:
+            _feature_cache.move_to_end(key)
+            return _feature_cache[key]
+
+    # Difference hash: compare horizontally adjacent pixels of a 9x8 grayscale
+    gray = np.asarray(img.convert('L').resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    dhash = (gray[:, 1:] > gray[:, :-1]).flatten()
+
+    # Coarse RGB histogram of a small thumbnail
+    thumb = np.asarray(img.convert('RGB').resize((64, 64), Image.Resampling.BILINEAR))
+    quantized = (thumb // (256 // HISTOGRAM_BINS)).reshape(-1, 3)
+    bins = quantized[:, 0] * HISTOGRAM_BINS * HISTOGRAM_BINS + quantized[:, 1] * HISTOGRAM_BINS + quantized[:, 2]
+    histogram = np.bincount(bins, minlength=HISTOGRAM_BINS ** 3).astype(np.float64)
+    histogram /= histogram.sum()
+
+    features = (dhash, histogram)
+    with _feature_lock:
+        _feature_cache[key] = features
+        while len(_feature_cache) > FEATURE_CACHE_SIZE:
+            _feature_cache.popitem(last=False)
+    return features
+
+
+def photo_distance_matrix(images):
+    """
+    Pairwise dissimilarity between photos, in [0, 1]
+
+    Args:
+        images: List of PIL Image objects
+
+    Returns:
+        np.ndarray: Symmetric (n, n) distance matrix
+    """
+    features = [compute_photo_features(img) for img in images]
+    hashes = np.array([f[0] for f in features])
+    histograms = np.array([f[1] for f in features])
+
+    hash_distance = (hashes[:, None, :] != hashes[None, :, :]).mean(axis=2)
+    histogram_distance = np.abs(histograms[:, None, :] - histograms[None, :, :]).sum(axis=2) / 2
+
+    return HASH_WEIGHT * hash_distance + (1 - HASH_WEIGHT) * histogram_distance
+
+
+def select_diverse_photos(images, max_photos=None, token_budget=None):
+    """
+    Select the most representative, mutually distinct photos
+
+    Photos are clustered into K groups (k-medoids seeded with farthest-point
+    selection from the first photo, which is usually the hero shot) and the
+    medoid of each group is kept. K is the smaller of max_photos and the
+    number of photos that fit in token_budget.
+
+    Args:
+        images: List of PIL Image objects (e.g. st.session_state.processed_images)
+        max_photos: Maximum number of photos (default LISTING_MAGIC_MAX_PHOTOS)
+        token_budget: Optional image token budget (default LISTING_MAGIC_IMAGE_TOKEN_BUDGET)
+
+    Returns:
+        list: Selected PIL Image objects, in original upload order
+    """
+    max_photos = max_photos or DEFAULT_MAX_PHOTOS
+    token_budget = token_budget or DEFAULT_IMAGE_TOKEN_BUDGET
+
+    k = min(max_photos, len(images))
+    if token_budget:
+        tokens_per_photo = max(estimate_image_tokens(img) for img in images) if images else 1
+        k = min(k, max(1, token_budget // tokens_per_photo))
+
+    if k >= len(images):
+        return list(images)
+
+    distances = photo_distance_matrix(images)
+    medoids = _farthest_point_seeds(distances, k)
+
+    # Refine with a few k-medoids (PAM-style) iterations
+    for _ in range(10):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        new_medoids = []
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members) == 0:
+                new_medoids.append(medoids[cluster])
+                continue
+            within = distances[np.ix_(members, members)].sum(axis=1)
+            new_medoids.append(int(members[np.argmin(within)]))
+        if sorted(new_medoids) == sorted(medoids):
+            break
+        medoids = new_medoids
+
+    selected = set(medoids)
+
+    # Identical photos can collapse onto one medoid; top up with the most distinct rest
+    while len(selected) < k:
+        rest = [i for i in range(len(images)) if i not in selected]
+        selected.add(max(rest, key=lambda i: distances[i, list(selected)].min()))
+
+    return [images[i] for i in sorted(selected)]
+
+
+def _farthest_point_seeds(distances, k):
+    """Greedy farthest-point seeding starting from the first photo"""
+    seeds = [0]
+    nearest = distances[0].copy()
+    while len(seeds) < k:
+        candidate = int(np.argmax(nearest))
+        seeds.append(candidate)
+        nearest = np.minimum(nearest, distances[candidate])
+    return seeds
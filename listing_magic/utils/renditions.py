@@ -0,0 +1,148 @@
+"""
+Image Renditions Utility
+
+Produces purpose-specific renditions of each uploaded photo:
+
+- model: downscaled to fill a whole number of model image tiles, so the
+  photo is as sharp as possible for the tokens it is billed
+- video: full-quality rendition capped at the video frame size, so the
+  slideshow is not upsampled from a small thumbnail
+
+Renditions are built once per photo and cached by the hash of the uploaded
+file bytes, so reruns and re-uploads skip decoding entirely.
+"""
+
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+from .image_processor import IMAGE_SMALL_MAX_SIDE, IMAGE_TILE_SIZE
+
+
+MODEL_RENDITION_MAX_TILES = int(os.getenv("LISTING_MAGIC_MODEL_IMAGE_TILES", "1"))
+VIDEO_RENDITION_MAX_SIDE = int(os.getenv("LISTING_MAGIC_VIDEO_IMAGE_MAX_SIDE", "1920"))
+RENDITION_CACHE_SIZE = int(os.getenv("LISTING_MAGIC_RENDITION_CACHE_SIZE", "256"))
+
+_rendition_cache = OrderedDict()
+_rendition_lock = threading.Lock()
+
+
+def file_content_hash(data):
+    """
+    Hash uploaded file bytes
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_model_rendition(img, max_tiles=None):
+    """
+    Downscale an image to the largest size billed as at most max_tiles tiles
+
+    Tries every tile grid (cols x rows) within the budget and keeps the one
+    that allows the largest scale. Images are never upscaled.
+
+    Args:
+        img: PIL Image object (EXIF-corrected)
+        max_tiles: Maximum number of image tiles (default LISTING_MAGIC_MODEL_IMAGE_TILES)
+
+    Returns:
+        PIL Image: RGB rendition for model input
+    """
+    max_tiles = max_tiles or MODEL_RENDITION_MAX_TILES
+    width, height = img.size
+
+    if max_tiles < 1:
+        # Single small image (384px box)
+        scale = min(IMAGE_SMALL_MAX_SIDE / width, IMAGE_SMALL_MAX_SIDE / height, 1.0)
+    else:
+        scale = max(
+            min(cols * IMAGE_TILE_SIZE / width, (max_tiles // cols) * IMAGE_TILE_SIZE / height, 1.0)
+            for cols in range(1, max_tiles + 1)
+        )
+
+    return _resize(img.convert('RGB'), scale)
+
+
+def make_video_rendition(img, max_side=None):
+    """
+    Downscale an image so its longest side fits the video frame
+
+    Args:
+        img: PIL Image object (EXIF-corrected)
+        max_side: Maximum longest side in pixels (default LISTING_MAGIC_VIDEO_IMAGE_MAX_SIDE)
+
+    Returns:
+        PIL Image: RGB rendition for video frames
+    """
+    max_side = max_side or VIDEO_RENDITION_MAX_SIDE
+    scale = min(max_side / max(img.size), 1.0)
+    return _resize(img.convert('RGB'), scale)
+
+
+def decode_photo(data):
+    """
+    Decode uploaded photo bytes, applying the EXIF orientation
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        PIL Image: Fully loaded image
+    """
+    img = Image.open(BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    img.load()
+    return img
+
+
+def get_renditions(data, video=True):
+    """
+    Get (or build and cache) the renditions of an uploaded photo
+
+    Args:
+        data: Raw file bytes of the uploaded photo
+        video: If False, only the model rendition is built (callers that
+            never render a video skip the large one)
+
+    Returns:
+        dict: 'hash' (file content hash), 'model' and 'video' PIL Images
+            ('video' is None when not built)
+    """
+    key = file_content_hash(data)
+    with _rendition_lock:
+        renditions = _rendition_cache.get(key)
+        if renditions is not None:
+            _rendition_cache.move_to_end(key)
+            if renditions['video'] is not None or not video:
+                return renditions
+
+    img = decode_photo(data)
+    renditions = {
+        'hash': key,
+        'model': renditions['model'] if renditions is not None else make_model_rendition(img),
+        'video': make_video_rendition(img) if video else None
+    }
+
+    with _rendition_lock:
+        _rendition_cache[key] = renditions
+        while len(_rendition_cache) > RENDITION_CACHE_SIZE:
+            _rendition_cache.popitem(last=False)
+    return renditions
+
+
+def _resize(img, scale):
+    """Resize by a scale factor (no-op at 1.0)"""
+    if scale >= 1.0:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.Resampling.LANCZOS)
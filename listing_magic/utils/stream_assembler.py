@@ -0,0 +1,195 @@
+"""
+Stream Assembler Utility
+
+Incrementally assembles a streamed JSON reply so partially generated string
+fields can be rendered while the model is still writing.
+"""
+
+import json
+
+
+# Single-character JSON escapes
+_SIMPLE_ESCAPES = {
+    '"': '"', '\\': '\\', '/': '/', 'b': '\b',
+    'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'
+}
+
+
+class IncrementalJSONAssembler:
+    """
+    Extracts top-level string fields from a JSON object as it streams in
+
+    Text before the opening brace (e.g. a ```json fence) is ignored, and
+    escape sequences split across chunks are held until complete. Only
+    top-level string values are exposed; nested objects, arrays and scalars
+    are skipped.
+
+    Example:
+        assembler = IncrementalJSONAssembler()
+        assembler.feed('{"listing_description": "Sunny ')   # {'listing_description': 'Sunny '}
+        assembler.feed('kitchen", "video_script": "Wel')  # {..., 'video_script': 'Wel'}
+    """
+
+    def __init__(self):
+        """Initialize an empty assembler"""
+        self.fields = {}
+        self.text = ''
+        self._state = 'start'
+        self._key = ''
+        self._escape = None
+        self._high_surrogate = None
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    @property
+    def done(self):
+        """True once the closing brace of the top-level object was seen"""
+        return self._state == 'done'
+
+    def feed(self, chunk):
+        """
+        Consume the next chunk of streamed text
+
+        Args:
+            chunk: Text delta from the model stream
+
+        Returns:
+            dict: Snapshot of all top-level string fields seen so far
+        """
+        self.text += chunk
+        for ch in chunk:
+            self._consume(ch)
+        return dict(self.fields)
+
+    def _consume(self, ch):
+        state = self._state
+
+        if state == 'start':
+            if ch == '{':
+                self._state = 'key_or_end'
+
+        elif state == 'key_or_end':
+            if ch == '"':
+                self._key = ''
+                self._state = 'key'
+            elif ch == '}':
+                self._state = 'done'
+
+        elif state == 'key':
+            decoded = self._read_string_char(ch)
+            if decoded is _END_OF_STRING:
+                self._state = 'colon'
+            elif decoded:
+                self._key += decoded
+
+        elif state == 'colon':
+            if ch == ':':
+                self._state = 'value_start'
+
+        elif state == 'value_start':
+            if ch == '"':
+                self.fields[self._key] = ''
+                self._state = 'string_value'
+            elif ch in '{[':
+                self._depth = 1
+                self._nested_in_string = False
+                self._nested_escape = False
+                self._state = 'nested_value'
+            elif not ch.isspace():
+                self._state = 'scalar_value'
+
+        elif state == 'string_value':
+            decoded = self._read_string_char(ch)
+            if decoded is _END_OF_STRING:
+                self._state = 'key_or_end'
+            elif decoded:
+                self.fields[self._key] += decoded
+
+        elif state == 'nested_value':
+            self._skip_nested_char(ch)
+
+        elif state == 'scalar_value':
+            if ch == ',':
+                self._state = 'key_or_end'
+            elif ch == '}':
+                self._state = 'done'
+
+    def _read_string_char(self, ch):
+        """
+        Decode one character of a JSON string body
+
+        Returns:
+            str: Decoded text to append ('' while an escape is incomplete),
+                or _END_OF_STRING on the closing quote
+        """
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[1] != 'u':
+                self._escape, seq = None, self._escape
+                return self._emit(_SIMPLE_ESCAPES.get(seq[1], seq[1]))
+            if len(self._escape) < 6:
+                return ''
+            self._escape, seq = None, self._escape
+            try:
+                return self._emit(chr(int(seq[2:], 16)))
+            except ValueError:
+                return self._emit(seq)
+
+        if ch == '\\':
+            self._escape = '\\'
+            return ''
+        if ch == '"':
+            return _END_OF_STRING
+        return self._emit(ch)
+
+    def _emit(self, text):
+        """Combine UTF-16 surrogate pairs from \\u escapes before emitting"""
+        if len(text) == 1 and 0xD800 <= ord(text) <= 0xDBFF:
+            self._high_surrogate = text
+            return ''
+        if self._high_surrogate is not None:
+            pending, self._high_surrogate = self._high_surrogate, None
+            if len(text) == 1 and 0xDC00 <= ord(text) <= 0xDFFF:
+                return (pending + text).encode('utf-16', 'surrogatepass').decode('utf-16')
+            # Lone high surrogate: drop it rather than emit invalid text
+            return text
+        return text
+
+    def _skip_nested_char(self, ch):
+        """Track depth through a nested object/array until it closes"""
+        if self._nested_in_string:
+            if self._nested_escape:
+                self._nested_escape = False
+            elif ch == '\\':
+                self._nested_escape = True
+            elif ch == '"':
+                self._nested_in_string = False
+            return
+
+        if ch == '"':
+            self._nested_in_string = True
+        elif ch in '{[':
+            self._depth += 1
+        elif ch in '}]':
+            self._depth -= 1
+            if self._depth == 0:
+                self._state = 'key_or_end'
+
+    def parse(self):
+        """
+        Parse the complete buffered text as JSON
+
+        Returns:
+            The decoded JSON value of the top-level object
+
+        Raises:
+            json.JSONDecodeError: If the buffered text is not complete JSON
+        """
+        start = self.text.find('{')
+        end = self.text.rfind('}')
+        return json.loads(self.text[start:end + 1] if start != -1 else self.text)
+
+
+# Sentinel returned by _read_string_char on an unescaped closing quote
+_END_OF_STRING = object()
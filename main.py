@@ -17,13 +17,27 @@ from listing_magic.components import (
     render_sidebar,
     render_upload_area,
     render_status_dashboard,
-    render_result_cards
+    render_result_cards,
+    render_streaming_card,
+    render_admin_panel
 )
 from listing_magic.services import (
-    generate_video_with_voiceover,
+    generate_video_formats,
+    RENDER_PROFILES,
+    DEFAULT_VIDEO_PROFILES,
     generate_reso_data,
-    generate_listing_content,
-    generate_features_sheet
+    stream_listing_content,
+    stream_features_sheet,
+    generate_all_content,
+    generate_followups,
+    MediaRegistry,
+    get_ring_buffer,
+    get_response_cache,
+    list_circuit_breakers,
+    get_rate_limiter,
+    set_session,
+    get_key_pool,
+    get_provider
 )
 from listing_magic.utils import (
     FileManager,
@@ -45,6 +59,11 @@ st.set_page_config(
 # Apply premium CSS styling
 st.markdown(get_premium_css(), unsafe_allow_html=True)
 
+# Hidden admin page (?admin=1): model call telemetry
+if st.query_params.get('admin') == '1':
+    render_admin_panel(get_ring_buffer(), get_response_cache().stats(), list_circuit_breakers(), get_rate_limiter().stats(), get_key_pool().stats())
+    st.stop()
+
 # Initialize session state
 if 'listing_text' not in st.session_state:
     st.session_state.listing_text = ""
@@ -52,16 +71,31 @@ if 'video_script' not in st.session_state:
     st.session_state.video_script = ""
 if 'generated_video_path' not in st.session_state:
     st.session_state.generated_video_path = None
+if 'generated_video_paths' not in st.session_state:
+    st.session_state.generated_video_paths = {}
 if 'processed_images' not in st.session_state:
     st.session_state.processed_images = []
+if 'video_images' not in st.session_state:
+    st.session_state.video_images = []
+if 'upload_hashes' not in st.session_state:
+    st.session_state.upload_hashes = []
 if 'cached_image_html' not in st.session_state:
     st.session_state.cached_image_html = ""
 if 'features_sheet' not in st.session_state:
     st.session_state.features_sheet = ""
+if 'reso_data' not in st.session_state:
+    st.session_state.reso_data = None
+if 'reso_inputs_hash' not in st.session_state:
+    st.session_state.reso_inputs_hash = ""
 if 'last_generated_hash' not in st.session_state:
     st.session_state.last_generated_hash = ""
 if 'file_manager' not in st.session_state:
     st.session_state.file_manager = FileManager()
+if 'media_registry' not in st.session_state:
+    st.session_state.media_registry = MediaRegistry()
+
+# Model calls from this session share the rate limiter's queue fairly with other sessions
+set_session(st.session_state.file_manager.session_id)
 
 # Render sidebar with property input forms
 render_sidebar()
@@ -110,6 +144,14 @@ st.markdown("""
 ">🎬 Generate Content</h3>
 """, unsafe_allow_html=True)
 
+# One-pass generation of every text artifact
+generate_all = st.button(
+    "✨ Generate All",
+    type="primary",
+    use_container_width=True,
+    help="Generate listing, script, features sheet and RESO data in a single pass"
+)
+
 # Primary action row
 col1, col2, col3 = st.columns(3)
 
@@ -142,6 +184,13 @@ generate_video = st.button(
     use_container_width=True,
     help="Create property tour video with AI narration"
 )
+video_profiles = st.multiselect(
+    "Video formats",
+    options=list(RENDER_PROFILES),
+    default=DEFAULT_VIDEO_PROFILES,
+    format_func=lambda name: f"{name.title()} ({RENDER_PROFILES[name]['aspect']})",
+    help="All selected formats are rendered from the same photos and voiceover"
+)
 
 # Force regenerate option (subtle, bottom)
 st.markdown("")
@@ -153,6 +202,19 @@ st.markdown("---")
 # BUTTON HANDLERS
 # ============================================================================
 
+# Every model-backed action needs an API key, unless the provider runs locally
+if (generate_listing or generate_all or generate_features or download_reso) and get_provider().uses_api_keys and not len(get_key_pool()):
+    st.error("⚠️ GOOGLE_API_KEY not found!")
+    st.info("""
+    **Setup Instructions:**
+    1. Create a `.env` file in your project root
+    2. Add: `GOOGLE_API_KEY=your_api_key_here` (or several keys: `GOOGLE_API_KEYS=key1,key2`)
+    3. Get your key from: https://makersuite.google.com/app/apikey
+    4. Restart the Streamlit app
+    (Or set `LISTING_MAGIC_PROVIDER=local` to run without a model)
+    """)
+    st.stop()
+
 # Generate Listing & Script Button Handler
 if generate_listing:
     if not uploaded_files:
@@ -181,56 +243,121 @@ if generate_listing:
         elif not state or state.strip() == '':
             st.error("⚠️ Error: State is required.")
         else:
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                st.error("⚠️ GOOGLE_API_KEY not found!")
-                st.info("""
-                **Setup Instructions:**
-                1. Create a `.env` file in your project root
-                2. Add: `GOOGLE_API_KEY=your_api_key_here`
-                3. Get your key from: https://makersuite.google.com/app/apikey
-                4. Restart the Streamlit app
-                """)
-                st.stop()
-            else:
-                with st.spinner("Analyzing property photos..."):
-                    try:
-                        # Handle empty data gracefully
-                        addr_display = addr if addr else 'Unknown Address'
-                        price_display = price if price else 'Price Upon Request'
-                        beds_display = beds if beds else 'Contact for Details'
-
-                        # Get additional details from user input
-                        additional_details = st.session_state.get('additional_details_input', '').strip()
-
-                        # Extract word count from listing length selection
-                        listing_length = st.session_state.get('listing_length_input', 'Standard (250 words)')
-                        word_count_match = re.search(r'\((\d+) words\)', listing_length)
-                        word_count = int(word_count_match.group(1)) if word_count_match else 250
-
-                        # Generate listing content using service
-                        listing_desc, video_script = generate_listing_content(
-                            st.session_state.processed_images,
-                            addr_display,
-                            price_display,
-                            beds_display,
-                            property_type,
-                            additional_details,
-                            word_count
-                        )
+            with st.spinner("Analyzing property photos..."):
+                try:
+                    # Handle empty data gracefully
+                    addr_display = addr if addr else 'Unknown Address'
+                    price_display = price if price else 'Price Upon Request'
+                    beds_display = beds if beds else 'Contact for Details'
+
+                    # Get additional details from user input
+                    additional_details = st.session_state.get('additional_details_input', '').strip()
+
+                    # Extract word count from listing length selection
+                    listing_length = st.session_state.get('listing_length_input', 'Standard (250 words)')
+                    word_count_match = re.search(r'\((\d+) words\)', listing_length)
+                    word_count = int(word_count_match.group(1)) if word_count_match else 250
+
+                    # Stream listing content into live preview cards
+                    listing_preview = st.empty()
+                    script_preview = st.empty()
+                    for update in stream_listing_content(
+                        st.session_state.processed_images,
+                        addr_display,
+                        price_display,
+                        beds_display,
+                        property_type,
+                        additional_details,
+                        word_count,
+                        use_cache=not force_regen,
+                        media=st.session_state.media_registry
+                    ):
+                        if update['done']:
+                            listing_desc = update['listing_description']
+                            video_script = update['video_script']
+                        else:
+                            render_streaming_card(listing_preview, "Listing Description", update['listing_description'])
+                            if update['video_script']:
+                                render_streaming_card(script_preview, "Video Script", update['video_script'])
+
+                    # Store in session state (cached RESO remarks are now stale)
+                    st.session_state.listing_text = listing_desc
+                    st.session_state.video_script = video_script
+                    st.session_state.reso_data = None
+
+                    # Update hash after successful generation
+                    st.session_state.last_generated_hash = get_inputs_hash(uploaded_files)
+
+                    st.success("✅ Listing and script generated successfully!")
+                    st.rerun()
 
-                        # Store in session state
-                        st.session_state.listing_text = listing_desc
-                        st.session_state.video_script = video_script
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
 
-                        # Update hash after successful generation
-                        st.session_state.last_generated_hash = get_inputs_hash(uploaded_files)
+# Generate All Button Handler
+if generate_all:
+    if not uploaded_files:
+        st.error("Please upload photos first.")
+    elif not force_regen and not inputs_changed(uploaded_files) and st.session_state.listing_text and st.session_state.features_sheet and st.session_state.reso_data:
+        st.info("ℹ️ Content is up to date. No changes detected since last generation.")
+    else:
+        # Read values from session state
+        addr = st.session_state.get('address_input', '')
+        city = st.session_state.get('city_input', '')
+        state = st.session_state.get('state_input', '')
+        zip_code = st.session_state.get('zip_input', '')
+        property_type = st.session_state.get('property_type_input', 'Single Family Home')
+        price = st.session_state.get('price_input', '')
+        beds_baths = st.session_state.get('bed_bath_input', '')
+        sqft = st.session_state.get('sqft_input', '')
+        additional_details = st.session_state.get('additional_details_input', '').strip()
 
-                        st.success("✅ Listing and script generated successfully!")
-                        st.rerun()
+        # Validation - Stop if critical fields are empty
+        if not addr or addr.strip() == '':
+            st.error("⚠️ Error: Street address is required.")
+        elif not city or city.strip() == '':
+            st.error("⚠️ Error: City is required.")
+        elif not state or state.strip() == '':
+            st.error("⚠️ Error: State is required.")
+        else:
+            with st.spinner("Generating listing, script, features sheet and RESO data..."):
+                try:
+                    # Extract word count from listing length selection
+                    listing_length = st.session_state.get('listing_length_input', 'Standard (250 words)')
+                    word_count_match = re.search(r'\((\d+) words\)', listing_length)
+                    word_count = int(word_count_match.group(1)) if word_count_match else 250
+
+                    results = generate_all_content(
+                        st.session_state.processed_images,
+                        addr,
+                        city,
+                        state,
+                        zip_code,
+                        price,
+                        beds_baths,
+                        sqft,
+                        property_type,
+                        additional_details,
+                        word_count,
+                        use_cache=not force_regen,
+                        media=st.session_state.media_registry
+                    )
+
+                    # Store in session state
+                    st.session_state.listing_text = results['listing_description']
+                    st.session_state.video_script = results['video_script']
+                    st.session_state.features_sheet = results['features_sheet']
+                    st.session_state.reso_data = results['reso_data']
+                    st.session_state.reso_inputs_hash = get_inputs_hash(uploaded_files)
+
+                    # Update hash after successful generation
+                    st.session_state.last_generated_hash = get_inputs_hash(uploaded_files)
 
-                    except Exception as e:
-                        st.error(f"An error occurred: {e}")
+                    st.success("✅ All content generated successfully!")
+                    st.rerun()
+
+                except Exception as e:
+                    st.error(f"An error occurred: {e}")
 
 # Generate Video Button Handler
 if generate_video:
@@ -239,27 +366,36 @@ if generate_video:
     elif not uploaded_files:
         st.error("Please upload photos first.")
     else:
-        # Clean up old video if exists
-        if st.session_state.generated_video_path and os.path.exists(st.session_state.generated_video_path):
-            os.remove(st.session_state.generated_video_path)
+        # Clean up old videos if they exist
+        old_paths = set(st.session_state.generated_video_paths.values())
+        if st.session_state.generated_video_path:
+            old_paths.add(st.session_state.generated_video_path)
+        for old_path in old_paths:
+            if os.path.exists(old_path):
+                os.remove(old_path)
 
-        # Load images from cache
-        images = st.session_state.processed_images
+        # Load full-quality video renditions from cache
+        images = st.session_state.video_images
 
         if len(images) < 2:
             st.warning("Please upload at least 2 photos for a video tour.")
+        elif not video_profiles:
+            st.warning("Please select at least one video format.")
         else:
             # Generate video with voiceover
             with st.spinner("Generating voiceover..."):
                 try:
                     with st.spinner("Creating video with voiceover..."):
-                        video_path = generate_video_with_voiceover(
+                        video_paths = generate_video_formats(
                             images,
                             st.session_state.video_script,
-                            st.session_state.file_manager
+                            st.session_state.file_manager,
+                            profiles=video_profiles
                         )
 
-                        st.session_state.generated_video_path = video_path
+                        # The first format is the one shown in the results
+                        st.session_state.generated_video_path = next(iter(video_paths.values()))
+                        st.session_state.generated_video_paths = video_paths
                         st.success("✅ Video with voiceover generated successfully!")
                         st.rerun()
 
@@ -287,33 +423,28 @@ if generate_features:
 
         with st.spinner("Generating detailed features sheet..."):
             try:
-                api_key = os.getenv("GOOGLE_API_KEY")
-                if not api_key:
-                    st.error("⚠️ GOOGLE_API_KEY not found!")
-                    st.info("""
-                    **Setup Instructions:**
-                    1. Create a `.env` file in your project root
-                    2. Add: `GOOGLE_API_KEY=your_api_key_here`
-                    3. Get your key from: https://makersuite.google.com/app/apikey
-                    4. Restart the Streamlit app
-                    """)
-                    st.stop()
-                else:
-                    # Generate features sheet using service
-                    features_text = generate_features_sheet(
-                        st.session_state.processed_images,
-                        addr_display,
-                        price_display,
-                        beds_display,
-                        property_type,
-                        additional_details
-                    )
+                # Stream features sheet into a live preview card
+                features_preview = st.empty()
+                for update in stream_features_sheet(
+                    st.session_state.processed_images,
+                    addr_display,
+                    price_display,
+                    beds_display,
+                    property_type,
+                    additional_details,
+                    use_cache=not force_regen,
+                    media=st.session_state.media_registry
+                ):
+                    if update['done']:
+                        features_text = update['features_sheet']
+                    else:
+                        render_streaming_card(features_preview, "Property Features Sheet", update['features_sheet'])
 
-                    # Store in session state
-                    st.session_state.features_sheet = features_text
+                # Store in session state
+                st.session_state.features_sheet = features_text
 
-                    st.success("✅ Features sheet generated successfully!")
-                    st.rerun()
+                st.success("✅ Features sheet generated successfully!")
+                st.rerun()
 
             except Exception as e:
                 st.error(f"An error occurred: {e}")
@@ -338,20 +469,52 @@ if download_reso:
 
         with st.spinner("Generating RESO-compliant JSON data..."):
             try:
-                # Generate RESO data using service
-                reso_json = generate_reso_data(
-                    st.session_state.processed_images,
-                    addr,
-                    city,
-                    state,
-                    zip_code,
-                    price,
-                    beds_baths,
-                    sqft,
-                    additional_details,
-                    st.session_state.listing_text,
-                    property_type
-                )
+                # Reuse RESO data when it was generated from the current inputs
+                if st.session_state.reso_data and not force_regen and st.session_state.reso_inputs_hash == get_inputs_hash(uploaded_files):
+                    reso_json = st.session_state.reso_data
+                elif not st.session_state.features_sheet:
+                    # The features sheet depends on the same inputs; generate both side by side
+                    results, errors = generate_followups(
+                        st.session_state.processed_images,
+                        addr,
+                        city,
+                        state,
+                        zip_code,
+                        price,
+                        beds_baths,
+                        sqft,
+                        property_type,
+                        additional_details,
+                        st.session_state.listing_text,
+                        use_cache=not force_regen,
+                        media=st.session_state.media_registry
+                    )
+                    if 'features_sheet' in results:
+                        st.session_state.features_sheet = results['features_sheet']
+                    if 'reso_data' not in results:
+                        raise errors['reso_data']
+                    reso_json = results['reso_data']
+                    st.session_state.reso_data = reso_json
+                    st.session_state.reso_inputs_hash = get_inputs_hash(uploaded_files)
+                else:
+                    # Generate RESO data using service
+                    reso_json = generate_reso_data(
+                        st.session_state.processed_images,
+                        addr,
+                        city,
+                        state,
+                        zip_code,
+                        price,
+                        beds_baths,
+                        sqft,
+                        additional_details,
+                        st.session_state.listing_text,
+                        property_type,
+                        use_cache=not force_regen,
+                        media=st.session_state.media_registry
+                    )
+                    st.session_state.reso_data = reso_json
+                    st.session_state.reso_inputs_hash = get_inputs_hash(uploaded_files)
 
                 # Create filename
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")